@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+
+import discord
+
+from telemetry import metrics
+
+# Discord exige un acquittement en 3 s ; au-delà de ce budget, on diffère nous-mêmes.
+ACK_BUDGET = float(os.getenv("DUEL_ACK_BUDGET", "2.0"))
+
+log = logging.getLogger(__name__)
+
+
+class GuardedResponse:
+    """``response`` d'une :class:`GuardedInteraction`, qui surveille le délai d'acquittement.
+
+    Si le handler n'a pas répondu quand le budget est écoulé, l'interaction
+    est différée à sa place (``defer()`` : édition différée du message du
+    composant). Ses réponses suivantes sont alors converties :
+    ``send_message`` part en followup et ``edit_message`` édite la réponse
+    originale. Le handler n'a donc rien à savoir du différé.
+    """
+
+    __slots__ = ("_response", "_interaction", "handler", "_timer", "_auto_defer", "acked")
+
+    def __init__(self, interaction: discord.Interaction, handler: str, budget: float):
+        self._response = interaction.response
+        self._interaction = interaction
+        self.handler = handler
+        self._auto_defer = None
+        self.acked = False
+        self._timer = asyncio.get_running_loop().call_later(max(0.0, budget), self._expire)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def _age(self) -> float:
+        return (discord.utils.utcnow() - self._interaction.created_at).total_seconds()
+
+    def _expire(self):
+        self._timer = None
+        if self.acked or self._response.is_done():
+            return
+        self.acked = True
+        self._auto_defer = asyncio.get_running_loop().create_task(self._defer_for_handler())
+
+    async def _defer_for_handler(self):
+        age = self._age()
+        try:
+            await self._response.defer()
+        except discord.HTTPException as e:  # jeton déjà expiré : le handler répondra (en vain) lui-même
+            log.warning("auto-defer failed", extra={"handler": self.handler, "error": repr(e)})
+            return
+        metrics.observe("interaction_ack_seconds", self._age(), handler=self.handler)
+        metrics.inc("interaction_auto_deferred_total", handler=self.handler)
+        log.warning("interaction auto-deferred", extra={"handler": self.handler, "age": round(age, 3)})
+
+    async def _claim(self) -> bool:
+        """Réserve l'acquittement au handler ; ``True`` si l'interaction a déjà été différée pour lui."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._auto_defer is not None:
+            await self._auto_defer
+            return self._response.is_done()
+        self.acked = True
+        return False
+
+    def _acked(self):
+        latency = self._age()
+        metrics.observe("interaction_ack_seconds", latency, handler=self.handler)
+        if latency > ACK_BUDGET:
+            log.warning("slow interaction ack", extra={"handler": self.handler, "latency": round(latency, 3)})
+
+    async def send_message(self, content=None, **kwargs):
+        if await self._claim():
+            kwargs.pop("delete_after", None)
+            if kwargs.get("view", discord.utils.MISSING) is None:
+                del kwargs["view"]
+            return await self._interaction.followup.send(content, **kwargs)
+        result = await self._response.send_message(content, **kwargs)
+        self._acked()
+        return result
+
+    async def edit_message(self, **kwargs):
+        if await self._claim():
+            kwargs.pop("delete_after", None)
+            return await self._interaction.edit_original_response(**kwargs)
+        result = await self._response.edit_message(**kwargs)
+        self._acked()
+        return result
+
+    async def defer(self, **kwargs):
+        if await self._claim():
+            return None
+        result = await self._response.defer(**kwargs)
+        self._acked()
+        return result
+
+    async def send_modal(self, modal):
+        if await self._claim():
+            log.error("modal after auto-defer", extra={"handler": self.handler})
+        result = await self._response.send_modal(modal)  # lève InteractionResponded si déjà différé
+        self._acked()
+        return result
+
+
+class GuardedInteraction:
+    """L'interaction vue par le handler : ``response`` est la garde, le reste est délégué."""
+
+    __slots__ = ("_interaction", "response")
+
+    def __init__(self, interaction: discord.Interaction, response: GuardedResponse):
+        self._interaction = interaction
+        self.response = response
+
+    def __getattr__(self, name):
+        return getattr(self._interaction, name)
+
+
+def guard_ack(interaction: discord.Interaction, handler: str, budget: float = ACK_BUDGET) -> GuardedInteraction:
+    """Arme la garde sur ``interaction`` et renvoie l'interaction à passer au handler.
+
+    ``handler`` nomme le callback dans les logs et métriques.
+    """
+    if isinstance(interaction, GuardedInteraction):
+        return interaction
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    return GuardedInteraction(interaction, GuardedResponse(interaction, handler, budget - max(0.0, elapsed)))
+
+
+def callback_name(callback) -> str:
+    """Nom lisible d'un callback de composant (méthode décorée, ``partial``, fonction)."""
+    callback = getattr(callback, "callback", callback)  # items décorés : _ItemCallback
+    callback = getattr(callback, "func", callback)  # functools.partial
+    return getattr(callback, "__qualname__", type(callback).__name__)
+
+
+def guarded(callback, handler: str):
+    """``callback(interaction)`` appelé avec l'interaction gardée."""
+    if getattr(callback, "guarded", False):
+        return callback
+
+    async def wrapper(interaction):
+        return await callback(guard_ack(interaction, handler))
+
+    wrapper.guarded = True
+    return wrapper
+
+
+class GuardedView(discord.ui.View):
+    """``View`` dont tous les callbacks passent par :func:`guard_ack`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for item in self.children:  # items décorés, créés par View.__init__
+            item.callback = guarded(item.callback, callback_name(item.callback))
+
+    def add_item(self, item):
+        item.callback = guarded(item.callback, callback_name(item.callback))
+        return super().add_item(item)
+
+
+class GuardedModal(discord.ui.Modal):
+    """``Modal`` dont ``on_submit`` passe par :func:`guard_ack`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_submit = guarded(self.on_submit, f"{type(self).__qualname__}.on_submit")
@@ -0,0 +1,275 @@
+"""Benchmarks des chemins chauds et budgets d'appels REST par partie, comparés à ``bench_baseline.json``.
+
+    python bench.py            # compare à la référence, code de sortie 1 en cas de régression
+    python bench.py --update   # réécrit la référence (à faire sur la machine de référence)
+
+Deux familles de mesures :
+
+- micro : coût d'un appel (ns) des fonctions appelées à chaque clic ou à
+  chaque message — ``determine_winner``, voisinages du démineur,
+  construction de la grille 5×5 et traitement d'un coup, barillet de la
+  roulette, vues du menu ``/duel``, des setups et des duels. Régression
+  au-delà de ``time_ratio`` fois la référence.
+- flows : appels REST d'une partie complète, scriptée et déterministe, à
+  travers les doublures de ``loadsim`` (PPC BO3 avec égalités, roulette à
+  6 joueurs, démineur jusqu'à la dernière case sûre). Régression dès que
+  le total dépasse la référence de plus de ``rest_calls`` appels.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import timeit
+
+from loadsim import POLL, FakeChannel, LoadSim  # règle l'environnement avant d'importer le bot
+
+import bot
+import game_registry
+from minesweeper_board import MinesweeperBoard, neighbor_masks
+from punishments import punishments
+from rest_scheduler import outbound
+from rps_engine import BEATS, CHOICES, determine_winner
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_THRESHOLDS = {
+    "time_ratio": 1.5,  # un chemin chaud 50 % plus lent que la référence est une régression
+    "rest_calls": 0,  # aucun appel REST de plus par partie
+}
+REPEAT = 5
+SEED = 1234
+
+# Grille 5×5 fixe : les mesures ne dépendent pas du tirage des mines.
+MINES_5X5 = sum(1 << i for i in random.Random(SEED).sample(range(25), 5))
+
+
+# -- micro -----------------------------------------------------------------------
+
+
+def _bare(cls, **fields):
+    """Partie sans interaction ni réservation : juste ce qu'il faut pour construire ses vues."""
+    game = cls.__new__(cls)
+    game.game_id = "0badcafe"
+    for name, value in fields.items():
+        setattr(game, name, value)
+    return game
+
+
+def micro_cases() -> dict:
+    """Nom -> ``(fonction sans argument, opérations par appel)``."""
+    sim = LoadSim()
+    user = sim.member()
+    minesweeper = game_registry.load_game(game_registry.games["minesweeper"])
+    roulette = game_registry.load_game(game_registry.games["roulette"])
+    rps = game_registry.load_game(game_registry.games["rps"])
+    pairs = [(a, b) for a in CHOICES for b in CHOICES]
+
+    def rps_round():
+        for a, b in pairs:
+            determine_winner(a, b)
+
+    def cylinder():
+        for shots in range(roulette.CHAMBERS):
+            roulette._cylinder_display(shots)
+
+    def new_mine_match():
+        board = MinesweeperBoard.from_masks(5, 5, MINES_5X5)
+        engine = minesweeper.MinesweeperEngine(1, 2, 5, 5, 5, board=board)
+        return _bare(minesweeper.MinesweeperMatch, rules=minesweeper.MinesweeperRules(), engine=engine)
+
+    mine_match = new_mine_match()
+    safe_cells = [i for i in range(25) if not MINES_5X5 >> i & 1]
+
+    def minesweeper_clicks():
+        # Le travail de MinesweeperMatch.play hors REST : coup du moteur, puis grille reconstruite.
+        game = new_mine_match()
+        engine = game.engine
+        for index in safe_cells:
+            engine.play(engine.current, index)
+            game.view(*game._grid_items())
+
+    rps_match = _bare(rps.RPSMatch)
+    duel_match = _bare(rps.RPSMatch)
+
+    cases = {
+        "determine_winner": (rps_round, len(pairs)),
+        "adjacency_masks_5x5": (lambda: neighbor_masks.__wrapped__(5, 5), 1),
+        "adjacency_masks_16x16": (lambda: neighbor_masks.__wrapped__(16, 16), 1),
+        "board_index_5x5": (lambda: MinesweeperBoard.from_masks(5, 5, MINES_5X5), 1),
+        "board_new_16x16": (lambda: MinesweeperBoard(16, 16, 40), 1),
+        "minesweeper_view_5x5": (lambda: mine_match.view(*mine_match._grid_items()), 1),
+        "minesweeper_click_5x5": (minesweeper_clicks, len(safe_cells)),
+        "cylinder_display": (cylinder, roulette.CHAMBERS),
+        "game_select_view": (lambda: bot.GameSelectView(user), 1),
+        "rps_round_view": (rps_match._round_view, 1),
+        "duel_offer_view": (lambda: duel_match.view(*duel_match._offer_buttons()), 1),
+    }
+    for key in game_registry.games:
+        cases[f"setup_view_{key}"] = (lambda key=key: game_registry.setup_view(key, user), 1)
+    return cases
+
+
+def measure(fn, ops: int) -> float:
+    """Meilleur temps par opération (ns) sur ``REPEAT`` séries calibrées par ``autorange``."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(REPEAT, number))
+    return round(best / number / ops * 1e9, 1)
+
+
+async def run_micro(only=None) -> dict:
+    # Les vues discord.py se construisent dans une boucle qui tourne, comme dans le bot.
+    return {name: measure(fn, ops) for name, (fn, ops) in micro_cases().items() if only is None or name in only}
+
+
+# -- flows -----------------------------------------------------------------------
+
+
+def _by_arg(arg: str):
+    return lambda found: next(f for f in found if f[1].custom_id.endswith(f":{arg}"))
+
+
+async def flow_rps_bo3_ties(sim: LoadSim):
+    """BO3 de PPC avec deux égalités, perdu par l'invité qui abandonne : timeout appliqué."""
+    channel = FakeChannel(sim, sim.guild)
+    host, guest = sim.member(), sim.member()
+    game = await sim.setup("rps", host, channel, [guest], 5)
+    await sim.press(guest, channel, game, "accept")
+    for host_choice, guest_choice in (
+        ("Pierre", "Pierre"), ("Papier", BEATS["Papier"]), ("Ciseaux", "Ciseaux"), ("Pierre", BEATS["Pierre"]),
+    ):
+        await sim.press(host, channel, game, "choose", pick=_by_arg(host_choice))
+        await sim.press(guest, channel, game, "choose", pick=_by_arg(guest_choice))
+    await sim.press(game.loser, channel, game, "abandon")
+    return game
+
+
+async def flow_roulette_6(sim: LoadSim):
+    """Organisateur et 5 invités qui rejoignent tous, chacun se tire dessus jusqu'au mort."""
+    channel = FakeChannel(sim, sim.guild)
+    host = sim.member()
+    invited = [sim.member() for _ in range(5)]
+    game = await sim.setup("roulette", host, channel, invited, 5)
+    for player in invited:
+        await sim.press(player, channel, game, "join")
+    while game.phase != "done":
+        # Le message du tour suit le changement de phase : rien à cliquer tant qu'il n'est pas là.
+        if game.phase != "turn" or not await sim.press(game.current_player, channel, game, "shoot_self"):
+            await asyncio.sleep(POLL)
+    return game
+
+
+async def flow_minesweeper_full(sim: LoadSim):
+    """Démineur 5×5 joué jusqu'au bout : les joueurs ne touchent que des cases sûres (match nul)."""
+    channel = FakeChannel(sim, sim.guild)
+    host, guest = sim.member(), sim.member()
+    game = await sim.setup("minesweeper", host, channel, [guest], 5)
+    await sim.press(guest, channel, game, "accept")
+    while game.phase == "playing":
+        board = game.board
+        index = next(i for i in range(board.rows * board.cols) if not board.is_mine(i) and not board.is_revealed(i))
+        await sim.press(game.current_player, channel, game, "cell", pick=_by_arg(str(index)))
+    return game
+
+
+FLOWS = {
+    "rps_bo3_ties": flow_rps_bo3_ties,
+    "roulette_6_players": flow_roulette_6,
+    "minesweeper_full": flow_minesweeper_full,
+}
+
+
+async def run_flows(only=None) -> dict:
+    roulette = game_registry.load_game(game_registry.games["roulette"])
+    roulette.INTRO_DELAY = roulette.SUSPENSE_DELAY = POLL  # pas de mise en scène pendant une mesure
+    results = {}
+    for name, flow in FLOWS.items():
+        if only is not None and name not in only:
+            continue
+        random.seed(SEED)  # même barillet, même premier joueur à chaque run
+        sim = LoadSim()
+        game = await flow(sim)
+        if game.phase != "done":
+            raise RuntimeError(f"{name}: partie pas terminée (phase {game.phase})")
+        # Sanctions et envois en file partent en arrière-plan : on les attend avant de compter.
+        while punishments.metrics()["inflight"] or outbound.metrics()["queued"]:
+            await asyncio.sleep(POLL)
+        results[name] = {"total": sum(sim.rest_calls.values()), **dict(sorted(sim.rest_calls.items()))}
+    return results
+
+
+# -- comparaison -----------------------------------------------------------------
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """Régressions de ``report`` par rapport à ``baseline``, une ligne lisible chacune."""
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})}
+    regressions = []
+    for name, ns in report.get("micro", {}).items():
+        reference = baseline.get("micro", {}).get(name)
+        if reference and ns > reference * thresholds["time_ratio"]:
+            regressions.append(f"micro {name}: {ns} ns > {reference} ns × {thresholds['time_ratio']}")
+    for name, calls in report.get("flows", {}).items():
+        reference = baseline.get("flows", {}).get(name)
+        if reference and calls["total"] > reference["total"] + thresholds["rest_calls"]:
+            added = {k: v - reference.get(k, 0) for k, v in calls.items() if k != "total" and v > reference.get(k, 0)}
+            regressions.append(f"flow {name}: {calls['total']} appels REST > {reference['total']} ({added})")
+    return regressions
+
+
+def load_baseline() -> dict:
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds et des appels REST par partie.")
+    parser.add_argument("--only", default="", help="mesures à lancer, séparées par des virgules (par défaut : toutes)")
+    parser.add_argument("--update", action="store_true", help="enregistre les mesures comme nouvelle référence")
+    parser.add_argument("--json", action="store_true", help="rapport en JSON")
+    args = parser.parse_args()
+
+    only = {name.strip() for name in args.only.split(",") if name.strip()} or None
+
+    async def measure_all():
+        return {"micro": await run_micro(only), "flows": await run_flows(only)}
+
+    report = asyncio.run(measure_all())
+    baseline = load_baseline()
+
+    if args.update:
+        updated = {
+            "thresholds": {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})},
+            "micro": {**baseline.get("micro", {}), **report["micro"]},
+            "flows": {**baseline.get("flows", {}), **report["flows"]},
+        }
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(updated, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"référence écrite dans {BASELINE_PATH}")
+        return
+
+    regressions = compare(report, baseline)
+    report["regressions"] = regressions
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, ns in report["micro"].items():
+            reference = baseline.get("micro", {}).get(name)
+            print(f"{name:>28}: {ns:>10} ns" + (f"  (réf. {reference})" if reference else ""))
+        for name, calls in report["flows"].items():
+            reference = baseline.get("flows", {}).get(name, {}).get("total")
+            print(f"{name:>28}: {calls}" + (f"  (réf. {reference})" if reference is not None else ""))
+        for line in regressions:
+            print(f"RÉGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
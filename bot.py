@@ -1,75 +1,210 @@
+import time
+
+STARTED_AT = time.monotonic()  # avant discord.py, le plus gros import du budget de démarrage
+
 import discord
 from discord import app_commands
 from discord.ext import commands
+import functools
+import logging
 import os
+import tracemalloc
+import yarl
 from dotenv import load_dotenv
 
-from state import active_duels
-from rps_game import RPSSetupView
-from roulette_game import RouletteSetupView
-from minesweeper_game import MinesweeperSetupView
+try:
+    import resource
+except ImportError:  # module Unix : sous Windows, le rapport mémoire se passe du pic de RSS
+    resource = None
+
+load_dotenv()  # avant les imports locaux, qui lisent leur config dans l'environnement
+
+from telemetry import metrics, setup_logging, start_metrics_server
+
+setup_logging()
+log = logging.getLogger("bot")
+
+from state import duel_locks, game_journal
+from game_flow import GameComponent, active_games, restore_games
+from command_sync import CommandSyncer, DEV_GUILD_ID
+from member_cache import member_cache
+from punishments import punishments
+from rest_scheduler import outbound
+from transport import transport_stats
+from ack_guard import GuardedView
+import game_registry
+
+import_time = time.monotonic() - STARTED_AT
+if import_time > game_registry.COLD_START_BUDGET:
+    log.warning(
+        "cold start over budget",
+        extra={"import_seconds": round(import_time, 2), "budget": game_registry.COLD_START_BUDGET},
+    )
 
-load_dotenv()
+# Statistiques déjà tenues par chaque module, lues à chaque scrape de /metrics.
+metrics.gauge("active_games", lambda: len(active_games))
+metrics.gauge("outbound", outbound.metrics)
+metrics.gauge("punishments", punishments.metrics)
+metrics.gauge("transport", lambda: dict(transport_stats))
+metrics.gauge("member_cache", lambda: {"size": len(member_cache), **member_cache.stats})
+metrics.gauge("duel_locks", lambda: {"held": len(duel_locks), **duel_locks.stats})
+metrics.gauge("game_journal", lambda: dict(game_journal.stats))
+
+# Autre Discord que le vrai (stand-in local de wiresim.py) : REST et webhooks
+# passent par Route.BASE, le websocket par DEFAULT_GATEWAY.
+API_BASE = os.getenv("DUEL_API_BASE")
+GATEWAY_URL = os.getenv("DUEL_GATEWAY_URL")
+if API_BASE:
+    discord.http.Route.BASE = API_BASE.rstrip("/")
+if GATEWAY_URL:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(GATEWAY_URL)
+
+# Mode léger (par défaut) : ni intent members ni message_content, aucun membre
+# mis en cache ni chunké au démarrage. Les membres viennent des interactions et
+# de member_cache (LRU + fetch_member à la demande).
+LEAN_MODE = os.getenv("DUEL_LEAN_MODE", "1") != "0"
+MEMBER_SAMPLE = 1000  # membres fictifs construits pour estimer la taille d'un membre en cache
 
 intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+if LEAN_MODE:
+    bot = commands.Bot(
+        command_prefix="!",
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False,
+    )
+else:
+    intents.message_content = True
+    intents.members = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+command_syncer = CommandSyncer()
+time_to_ready = None  # secondes entre le lancement du process et le premier on_ready
 
 
-class GameSelectView(discord.ui.View):
+class GameSelectView(GuardedView):
+    """Un bouton par jeu du registre ; le module du jeu n'est importé qu'une fois choisi."""
+
     def __init__(self, user):
         super().__init__(timeout=30)
         self.user = user
-
-    @discord.ui.button(label="Pierre-Papier-Ciseaux", style=discord.ButtonStyle.primary, emoji="🪨")
-    async def rps_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        for entry in game_registry.games.values():
+            button = discord.ui.Button(label=entry.label, style=entry.style, emoji=entry.emoji)
+            button.callback = functools.partial(self.pick_game, entry.key)
+            self.add_item(button)
+        cancel = discord.ui.Button(label="Annuler", style=discord.ButtonStyle.secondary, emoji="🚫")
+        cancel.callback = self.cancel
+        self.add_item(cancel)
+
+    async def pick_game(self, key, interaction: discord.Interaction):
         if interaction.user.id != self.user.id:
             await interaction.response.send_message("C'est pas ton /duel !", ephemeral=True)
             return
         self.stop()
         await interaction.response.edit_message(
-            content="**⚔️ Pierre-Papier-Ciseaux**\nChoisis ton adversaire :",
-            view=RPSSetupView(interaction.user),
+            content=game_registry.games[key].prompt,
+            view=game_registry.setup_view(key, interaction.user),
         )
 
-    @discord.ui.button(label="Roulette Russe", style=discord.ButtonStyle.danger, emoji="🔫")
-    async def roulette_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def cancel(self, interaction: discord.Interaction):
         if interaction.user.id != self.user.id:
             await interaction.response.send_message("C'est pas ton /duel !", ephemeral=True)
             return
         self.stop()
-        await interaction.response.edit_message(
-            content="**🔫 Roulette Russe**\nSélectionne les joueurs :",
-            view=RouletteSetupView(interaction.user),
-        )
+        await interaction.response.edit_message(content="*Duel annulé.*", view=None)
 
-    @discord.ui.button(label="Démineur", style=discord.ButtonStyle.success, emoji="💣")
-    async def minesweeper_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.user.id:
-            await interaction.response.send_message("C'est pas ton /duel !", ephemeral=True)
-            return
-        self.stop()
-        await interaction.response.edit_message(
-            content="**💣 Démineur**\nChoisis ton adversaire :",
-            view=MinesweeperSetupView(interaction.user),
-        )
 
-    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.secondary, emoji="🚫")
-    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.user.id:
-            await interaction.response.send_message("C'est pas ton /duel !", ephemeral=True)
-            return
-        self.stop()
-        await interaction.response.edit_message(content="*Duel annulé.*", view=None)
+@bot.event
+async def setup_hook():
+    duel_locks.start_reaper()
+    await start_metrics_server()
+    bot.add_dynamic_items(GameComponent)
+    # Jeux supplémentaires chargés comme extensions : register_game dans setup(), unregister_game
+    # dans teardown(), pour que /duel-reload puisse les recharger.
+    for extension in filter(None, os.getenv("DUEL_EXTENSIONS", "").split(",")):
+        await bot.load_extension(extension.strip())
+    bot.loop.create_task(resume_games())
+    # Une seule fois par process (pas à chaque reconnexion), et seulement si les commandes ont changé.
+    if os.getenv("DUEL_FORCE_SYNC"):
+        command_syncer.forget()
+    await command_syncer.sync(bot.tree, int(DEV_GUILD_ID) if DEV_GUILD_ID else None)
+
+
+async def resume_games():
+    # Les salons et membres ne sont en cache qu'une fois connecté.
+    await bot.wait_until_ready()
+    try:
+        await punishments.resume(bot)
+        await restore_games(bot)
+    finally:
+        # Même si la reprise échoue, les parties lancées ensuite doivent être journalisées.
+        game_journal.start()
 
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
-    print(f'{bot.user} is ready to duel!')
-    print(f'Logged in as {bot.user.name} (ID: {bot.user.id})')
-    print('------')
+    global time_to_ready
+    if time_to_ready is None:
+        time_to_ready = time.monotonic() - STARTED_AT
+        metrics.gauge("time_to_ready_seconds", lambda: time_to_ready)
+        log.info("time to ready", extra={"seconds": round(time_to_ready, 2)})
+        report_member_memory()
+    log.info(f"{bot.user} is ready to duel!", extra={"user_id": bot.user.id, "guilds": len(bot.guilds)})
+
+
+@functools.cache
+def member_bytes() -> int:
+    """Octets par membre dans le cache de discord.py, mesurés une fois avec tracemalloc.
+
+    Les membres fictifs ont des ids hors des snowflakes réels, un nom, un nom
+    global et un avatar ; le dict qui les range compte comme ``guild.members``.
+    """
+    def payload(i):
+        user = {
+            "id": str(i), "username": f"member{i}", "discriminator": "0",
+            "global_name": f"Member {i}", "avatar": "0" * 32,
+        }
+        return {
+            "user": user, "roles": [], "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0,
+        }
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        sample = {
+            i: discord.Member(data=payload(i), guild=bot.guilds[0], state=bot._connection)
+            for i in range(1, MEMBER_SAMPLE + 1)
+        }
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    del sample
+    return round(used / MEMBER_SAMPLE)
+
+
+def report_member_memory():
+    cached = sum(len(guild.members) for guild in bot.guilds)
+    total = sum(guild.member_count or 0 for guild in bot.guilds)
+    mode = "lean" if LEAN_MODE else "full member cache"
+    extra = {
+        "mode": mode, "members_cached": cached, "members_total": total,
+        "lru": len(member_cache), "lru_max": member_cache.maxsize,
+    }
+    if resource is not None:
+        extra["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    if bot.guilds:
+        # Ce que coûterait le cache complet en plus de ce qui est déjà en mémoire.
+        try:
+            per_member = member_bytes()
+        except Exception as e:  # forme du payload changée par une autre version de discord.py
+            log.warning("member size estimate failed", extra={"error": repr(e)})
+        else:
+            extra["member_bytes"] = per_member
+            extra["saved_mb_est"] = round(max(0, total - cached) * per_member / 2**20, 1)
+    log.info("member memory", extra=extra)
 
 
 @bot.tree.command(name="duel", description="Lance un duel : PPC, Roulette Russe ou Démineur !")
@@ -81,9 +216,34 @@ async def duel(interaction: discord.Interaction):
     )
 
 
-TOKEN = os.getenv('DISCORD_BOT_TOKEN')
+@bot.tree.command(name="duel-reload", description="Recharge le code d'un jeu ou d'une extension (propriétaire du bot).")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(jeu="Clé du jeu (rps, roulette...) ou nom d'une extension de DUEL_EXTENSIONS")
+async def duel_reload(interaction: discord.Interaction, jeu: str):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Réservé au propriétaire du bot.", ephemeral=True)
+        return
+    try:
+        if jeu in bot.extensions:
+            await bot.reload_extension(jeu)  # teardown/setup : désinscrit puis réinscrit ses jeux
+        elif jeu in game_registry.games:
+            game_registry.reload_game(jeu)
+        else:
+            await interaction.response.send_message(f"Jeu ou extension inconnu : `{jeu}`", ephemeral=True)
+            return
+    except Exception as e:
+        log.exception("game reload failed", extra={"target": jeu})
+        await interaction.response.send_message(f"⚠️ Rechargement de `{jeu}` raté : {e!r}", ephemeral=True)
+        return
+    await interaction.response.send_message(
+        f"♻️ `{jeu}` rechargé. Les parties en cours finissent avec l'ancien code.", ephemeral=True
+    )
+
+
+if __name__ == "__main__":  # importable sans se connecter (simulateur de charge)
+    TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 
-if not TOKEN:
-    raise ValueError("DISCORD_BOT_TOKEN not found in environment variables. Please check your .env file.")
+    if not TOKEN:
+        raise ValueError("DISCORD_BOT_TOKEN not found in environment variables. Please check your .env file.")
 
-bot.run(TOKEN)
+    bot.run(TOKEN, log_handler=None)  # les logs de discord.py passent par setup_logging()
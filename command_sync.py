@@ -0,0 +1,71 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+import discord
+
+from state import DB_PATH
+
+log = logging.getLogger(__name__)
+
+# Serveur de dev : les commandes y sont copiées et synchronisées (visibles tout de suite)
+DEV_GUILD_ID = os.getenv("DUEL_DEV_GUILD_ID")
+
+
+def command_fingerprint(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake = None) -> str:
+    """Empreinte stable des commandes telles qu'elles seraient envoyées à Discord."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CommandSyncer:
+    """N'appelle ``tree.sync()`` que si les commandes ont changé depuis la dernière fois.
+
+    L'empreinte de chaque cible (``global`` ou id du serveur de dev) est
+    gardée dans SQLite : un redémarrage ou une reconnexion sans changement
+    de commandes ne coûte aucun appel à l'API.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS command_sync ("
+            " target TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL)"
+        )
+
+    def _stored(self, target: str):
+        row = self._db.execute("SELECT fingerprint FROM command_sync WHERE target = ?", (target,)).fetchone()
+        return row[0] if row else None
+
+    async def sync(self, tree: discord.app_commands.CommandTree, guild_id: int = None) -> bool:
+        """Synchronise si besoin ; renvoie ``True`` si un appel à l'API a été fait."""
+        guild = None
+        target = "global"
+        if guild_id is not None:
+            guild = discord.Object(id=guild_id)
+            target = str(guild_id)
+            tree.copy_global_to(guild=guild)
+
+        fingerprint = command_fingerprint(tree, guild)
+        if self._stored(target) == fingerprint:
+            log.debug("commands unchanged, sync skipped", extra={"target": target})
+            return False
+
+        synced = await tree.sync(guild=guild)
+        self._db.execute(
+            "INSERT OR REPLACE INTO command_sync (target, fingerprint) VALUES (?, ?)", (target, fingerprint)
+        )
+        log.info("commands synced", extra={"target": target, "count": len(synced)})
+        return True
+
+    def forget(self):
+        """Force la prochaine synchronisation (commandes supprimées à la main, par exemple)."""
+        self._db.execute("DELETE FROM command_sync")
@@ -0,0 +1,337 @@
+import logging
+
+import discord
+
+from game_flow import GameMachine, ActionButton, id_of
+from punishments import FAILED, FORBIDDEN, punish
+from rest_scheduler import CRITICAL, COSMETIC
+
+log = logging.getLogger(__name__)
+
+CHALLENGE_TIMEOUT = 300
+CONFIRM_TIMEOUT = 30
+REVENGE_TIMEOUT = 30
+HIGH_STAKES_MINUTES = 120
+MAX_TIMEOUT_MINUTES = 10080
+
+
+class DuelMatch(GameMachine):
+    """Défi 1v1 → partie → revanche → sanction, commun au PPC et au Démineur.
+
+    Les sous-classes fournissent la phase ``playing`` (``start_game`` puis
+    leurs propres actions) et appellent :meth:`conclude` une fois le perdant
+    connu. La revanche rejoue dans le même enregistrement : pas de partie
+    imbriquée dans le callback d'un bouton.
+    """
+
+    __slots__ = (
+        "challenger", "challenged", "timeout_minutes", "player1", "player2",
+        "is_revenge", "original_loser", "winner", "loser", "revenge_message",
+    )
+
+    ACTIONS = {
+        "challenge": {"accept", "refuse", "cancel", "challenge_timeout"},
+        "confirm": {"confirm", "unconfirm", "confirm_timeout"},
+        "revenge_offer": {"revenge", "abandon", "offer_timeout"},
+        "revenge_pending": {"accept_revenge", "refuse_revenge", "revenge_timeout"},
+    }
+
+    EMOJI = "🏆"
+    WIN_TITLE = "GAGNE LE DUEL!"
+    NO_ANSWER_TEXT = "{opponent} n'a pas répondu au duel, bébé cadum !"
+    NO_PERMS_TEXT = "⚠️ Mais je peux pas le ban, oupsi {loser}. Faut me mettre les perms"
+    FAILED_TEXT = "⚠️ Discord a refusé le timeout de {loser}, il s'en sort pour cette fois."
+    REASON = "A perdu contre {winner}"
+    REVENGE_REASON = "A perdu la revanche contre {winner}"
+
+    def __init__(self, interaction, challenger, challenged, timeout_minutes: int, reservation):
+        super().__init__(interaction, reservation)
+        self.challenger = challenger
+        self.challenged = challenged
+        self.timeout_minutes = timeout_minutes
+        self.player1 = challenger
+        self.player2 = challenged
+        self.is_revenge = False
+        self.original_loser = None
+        self.winner = None
+        self.loser = None
+        self.revenge_message = None
+
+    def snapshot(self) -> dict:
+        state = super().snapshot()
+        state.update(
+            challenger=self.challenger.id,
+            challenged=self.challenged.id,
+            timeout_minutes=self.timeout_minutes,
+            player1=self.player1.id,
+            player2=self.player2.id,
+            is_revenge=self.is_revenge,
+            original_loser=id_of(self.original_loser),
+            winner=id_of(self.winner),
+            loser=id_of(self.loser),
+            revenge_message=id_of(self.revenge_message),
+        )
+        return state
+
+    async def load(self, state: dict, member):
+        self.challenger = await member(state["challenger"])
+        self.challenged = await member(state["challenged"])
+        self.timeout_minutes = state["timeout_minutes"]
+        self.player1 = await member(state["player1"])
+        self.player2 = await member(state["player2"])
+        self.is_revenge = state["is_revenge"]
+        self.original_loser = await member(state["original_loser"])
+        self.winner = await member(state["winner"])
+        self.loser = await member(state["loser"])
+        self.revenge_message = self.partial_message(state["revenge_message"])
+
+    def player(self, user_id):
+        """Le membre qui joue sous ``user_id`` (les moteurs de jeu ne connaissent que les ids)."""
+        return self.player1 if user_id == self.player1.id else self.player2
+
+    # -- à fournir par le jeu ------------------------------------------------
+
+    def challenge_text(self) -> str:
+        raise NotImplementedError
+
+    async def start_game(self):
+        raise NotImplementedError
+
+    async def show_verdict(self, content: str, view):
+        """Affiche le verdict (et éventuellement les boutons de revanche)."""
+        await self.send(content, CRITICAL, view=view)
+
+    # -- défi ------------------------------------------------------------------
+
+    async def open(self):
+        self.enter("challenge", CHALLENGE_TIMEOUT, "challenge_timeout")
+        self.message = await self.send(
+            self.challenge_text(),
+            view=self.view(
+                ActionButton("accept", label="Accepter le duel", style=discord.ButtonStyle.danger, emoji="⚔️"),
+                ActionButton("refuse", label="Refuser", style=discord.ButtonStyle.secondary, emoji="❌"),
+                ActionButton("cancel", label="Annuler", style=discord.ButtonStyle.secondary, emoji="🚫"),
+            ),
+        )
+
+    async def on_accept(self, interaction, arg):
+        if interaction.user.id != self.challenged.id:
+            await interaction.response.send_message("C'est pas ton moment gamin", ephemeral=True)
+            return
+
+        minutes = self.timeout_minutes
+        if minutes > HIGH_STAKES_MINUTES:
+            self.enter("confirm", CONFIRM_TIMEOUT, "confirm_timeout")
+            await interaction.response.send_message(
+                f"⚠️ **ATTENTION {self.challenged.mention} !**\n"
+                f"Le timeout est de **{minutes} minutes** ({minutes // 60}h{minutes % 60}min) !\n"
+                f"Es-tu SÛR d'accepter ??",
+                view=self.view(
+                    ActionButton("confirm", label="OUI, je confirme !", style=discord.ButtonStyle.danger, emoji="⚠️"),
+                    ActionButton("unconfirm", label="Non, annuler", style=discord.ButtonStyle.secondary, emoji="❌"),
+                ),
+            )
+            return
+
+        self.enter("starting")
+        await interaction.response.send_message(f"**DU-DU-DU-DUEL!** {self.challenged.mention} a accepté!")
+        await self.begin_play()
+
+    async def on_refuse(self, interaction, arg):
+        if interaction.user.id != self.challenged.id:
+            await interaction.response.send_message("Seul le challengé peut refuser !", ephemeral=True)
+            return
+        self.finish()
+        log.debug("duel refused", extra={"game_id": self.game_id})
+        await interaction.response.send_message(f"❌ {self.challenged.mention} a refusé le duel, bébé cadum ! 🐔")
+
+    async def on_cancel(self, interaction, arg):
+        if interaction.user.id != self.challenger.id:
+            await interaction.response.send_message("Seul le lanceur peut annuler !", ephemeral=True)
+            return
+        self.finish()
+        log.debug("duel cancelled", extra={"game_id": self.game_id})
+        await interaction.response.send_message(f"🚫 {self.challenger.mention} a annulé le duel.")
+
+    async def on_challenge_timeout(self, interaction, arg):
+        self.finish()
+        log.debug("duel not accepted in time", extra={"game_id": self.game_id})
+        await self.send(self.NO_ANSWER_TEXT.format(opponent=self.challenged.mention))
+
+    async def on_confirm(self, interaction, arg):
+        if interaction.user.id != self.challenged.id:
+            await interaction.response.send_message("C'est pas ton moment gamin", ephemeral=True)
+            return
+        self.enter("starting")
+        await interaction.response.send_message(f"✅ {self.challenged.mention} a confirmé ! Le duel va commencer...")
+        await self.begin_play()
+        self.in_background(self.send(f"**DU-DU-DU-DUEL!** {self.challenged.mention} a accepté!", COSMETIC))
+
+    async def on_unconfirm(self, interaction, arg):
+        if interaction.user.id != self.challenged.id:
+            await interaction.response.send_message("Seul le challengé peut annuler !", ephemeral=True)
+            return
+        self.finish()
+        await interaction.response.send_message(f"❌ {self.challenged.mention} a annulé le duel.")
+
+    async def on_confirm_timeout(self, interaction, arg):
+        self.finish()
+
+    # -- partie ------------------------------------------------------------------
+
+    async def begin_play(self):
+        self.reservation.commit()
+        self.enter("playing")
+        log.info(
+            "game started",
+            extra={"game_id": self.game_id, "game": type(self).__name__, "revenge": self.is_revenge},
+        )
+        await self.start_game()
+
+    def banner(self, title: str) -> str:
+        return f"{self.EMOJI} **{self.winner.mention} {title}** {self.EMOJI}"
+
+    async def conclude(self, winner, loser):
+        """Fin de partie : offre de revanche, ou sanction si c'était déjà la revanche."""
+        self.winner = winner
+        self.loser = loser
+        log.info("game won", extra={"game_id": self.game_id, "winner_id": winner.id, "loser_id": loser.id})
+
+        if not self.is_revenge:
+            self.enter("revenge_offer", REVENGE_TIMEOUT, "offer_timeout")
+            await self.show_verdict(
+                f"{self.banner(self.WIN_TITLE)}\n\n"
+                f"💀 {loser.mention} va être timeout pour **{self.timeout_minutes} minute(s)**!\n"
+                f"Dernière chance... 🔥",
+                self.view(*self._offer_buttons()),
+            )
+            return
+
+        self.finish()
+        if winner.id == self.original_loser.id:
+            await self.show_verdict(
+                f"{self.banner('GAGNE LA REVANCHE!')}\n\n"
+                f"🎉 {winner.mention} s'est racheté ! Personne n'est timeout !\n"
+                f"Respect ! 💪",
+                None,
+            )
+            return
+
+        await self.show_verdict(
+            f"{self.banner('GAGNE LA REVANCHE!')}\n\n"
+            f"💀 {loser.mention} est timeout pour **{self.timeout_minutes} minute(s)**!\n"
+            f"Pas de seconde chance cette fois ! 👋",
+            None,
+        )
+        await self.sentence(loser, self.timeout_minutes, self.REVENGE_REASON.format(winner=winner.display_name))
+
+    async def sentence(self, loser, minutes: int, reason: str, announce: str = None):
+        """Annonce la sanction (si ``announce``) puis l'applique.
+
+        Le timeout peut attendre plusieurs essais de l'exécuteur : le verdict
+        est affiché d'abord, et un message suit seulement si le bot n'a pas
+        pu l'appliquer, avec la raison : permissions ou erreur de Discord.
+        """
+        if announce is not None:
+            await self.send(announce)
+        outcome = await punish(loser, minutes, reason)
+        if outcome == FORBIDDEN:
+            await self.send(self.NO_PERMS_TEXT.format(loser=loser.mention))
+        elif outcome == FAILED:
+            await self.send(self.FAILED_TEXT.format(loser=loser.mention))
+
+    # -- revanche ----------------------------------------------------------------
+
+    def _offer_buttons(self, disabled: bool = False):
+        return (
+            ActionButton("revenge", label="Revanche ! (Quitte ou double)",
+                         style=discord.ButtonStyle.danger, emoji="🔥", disabled=disabled),
+            ActionButton("abandon", label="Abandonner",
+                         style=discord.ButtonStyle.secondary, emoji="🏳️", disabled=disabled),
+        )
+
+    async def on_revenge(self, interaction, arg):
+        if interaction.user.id != self.loser.id:
+            await interaction.response.send_message("Seul le perdant peut demander une revanche !", ephemeral=True)
+            return
+
+        self.enter("revenge_pending", REVENGE_TIMEOUT, "revenge_timeout")
+        doubled_timeout = min(self.timeout_minutes * 2, MAX_TIMEOUT_MINUTES)
+        await interaction.response.edit_message(view=self.view(*self._offer_buttons(disabled=True)))
+
+        loser, winner = self.loser.mention, self.winner.mention
+        self.revenge_message = await self.send(
+            f"💀 **{loser} demande une REVANCHE !**\n"
+            f"🔥 **Quitte ou Double** :\n"
+            f"• Si {loser} **perd** → timeout de **{doubled_timeout} minutes** !\n"
+            f"• Si {loser} **gagne** → il est libéré, aucune sanction !\n"
+            f"• {winner} ne risque **RIEN** !\n\n"
+            f"{winner}, acceptes-tu ?",
+            view=self.view(
+                ActionButton("accept_revenge", label="Accepter la revanche",
+                             style=discord.ButtonStyle.success, emoji="✅"),
+                ActionButton("refuse_revenge", label="Refuser",
+                             style=discord.ButtonStyle.secondary, emoji="❌"),
+            ),
+        )
+
+    async def on_abandon(self, interaction, arg):
+        if interaction.user.id != self.loser.id:
+            await interaction.response.send_message("Seul le perdant peut abandonner !", ephemeral=True)
+            return
+
+        self.finish()
+        await interaction.response.edit_message(view=self.view(*self._offer_buttons(disabled=True)))
+        log.debug("defeat accepted", extra={"game_id": self.game_id, "loser_id": self.loser.id})
+        minutes = self.timeout_minutes
+        await self.sentence(
+            self.loser, minutes, self.REASON.format(winner=self.winner.display_name),
+            f"{self.loser.mention} accepte sa défaite. Timeout de {minutes} minute(s). 👋",
+        )
+
+    async def on_offer_timeout(self, interaction, arg):
+        self.finish()
+        await self.sentence(
+            self.loser, self.timeout_minutes, self.REASON.format(winner=self.winner.display_name),
+            f"C'est ciao {self.loser.mention}! 👋",
+        )
+
+    async def on_accept_revenge(self, interaction, arg):
+        if interaction.user.id != self.winner.id:
+            await interaction.response.send_message("Seul le gagnant peut accepter la revanche !", ephemeral=True)
+            return
+
+        self.enter("starting")
+        await interaction.response.defer()
+        offer, self.revenge_message = self.revenge_message, None
+        announce = f"✅ **{self.winner.mention} accepte la revanche !**\n🔥 **NOUVEAU DUEL !**"
+
+        self.is_revenge = True
+        self.original_loser = self.loser
+        self.player1, self.player2 = self.loser, self.winner
+        self.timeout_minutes = min(self.timeout_minutes * 2, MAX_TIMEOUT_MINUTES)
+        self.winner = self.loser = None
+        # La partie démarre d'abord ; annonce et ménage partent ensuite, en basse priorité.
+        await self.begin_play()
+        self.in_background(self.send(announce, COSMETIC))
+        if offer is not None:
+            self.in_background(self.delete(offer))
+
+    async def on_refuse_revenge(self, interaction, arg):
+        if interaction.user.id != self.winner.id:
+            await interaction.response.send_message("Seul le gagnant peut refuser la revanche !", ephemeral=True)
+            return
+        self.finish()
+        await interaction.response.send_message(f"❌ {self.winner.mention} refuse la revanche.")
+        await self._keep_original_timeout()
+
+    async def on_revenge_timeout(self, interaction, arg):
+        self.finish()
+        await self._keep_original_timeout()
+
+    async def _keep_original_timeout(self):
+        minutes = self.timeout_minutes
+        await self.sentence(
+            self.loser, minutes, self.REASON.format(winner=self.winner.display_name),
+            f"{self.loser.mention} reste timeout pour {minutes} minute(s). 👋",
+        )
@@ -0,0 +1,348 @@
+"""Simulateur Monte Carlo d'équité de la Roulette Russe et du Démineur, vectorisé avec NumPy.
+
+    python fairsim.py --games 1000000 --players 2,3,6 --strategies self,other,mix:0.5
+    python fairsim.py --only minesweeper --grids 5x5:5,5x5:8 --variants plain,safe_first --check 20000
+
+Chaque jeu de règles est joué des millions de fois, toutes les parties
+d'un lot avançant ensemble d'un coup (ou d'un tir) par itération. Les
+joueurs sont numérotés par ordre de passage : la place 0 joue en premier.
+
+- Démineur : deux joueurs en alternance, chacun révèle une case non
+  révélée au hasard ; toucher une mine fait perdre, tout révéler donne un
+  match nul. Variantes : cascade des zones de zéros, premier coup sûr.
+- Roulette : une balle, ``chambres`` chambres, chaque tir a une chance sur
+  les chambres restantes. Survivre à son propre tir garde la main ; rater
+  sa cible la lui donne. Stratégies : ``self`` (toujours soi), ``other``
+  (toujours un autre au hasard), ``mix:P`` (un autre avec la probabilité
+  P), ``late:K`` (un autre dès qu'il reste K chambres ou moins).
+
+Les voisinages viennent de :mod:`minesweeper_board`. ``--check N`` rejoue
+N parties de chaque jeu de règles avec les vrais moteurs
+(:class:`roulette_engine.RouletteEngine`,
+:class:`minesweeper_engine.MinesweeperEngine`) et signale tout écart
+au-delà de l'erreur d'échantillonnage.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel : seul ce script en a besoin
+    np = None
+
+from minesweeper_board import MinesweeperBoard, neighbor_masks
+from minesweeper_engine import MinesweeperEngine, MINE, CLEARED
+from roulette_engine import CHAMBERS, RouletteEngine
+
+# Mêmes grilles que minesweeper_game.BOARD_SIZES (sans importer le bot).
+DEFAULT_GRIDS = "5x5:5,10x10:15,16x16:40"
+CHUNK = 200_000  # parties simulées ensemble ; borne la mémoire des grands plateaux
+DRAW = -1
+CHECK_SIGMAS = 4  # écart toléré entre simulateur et moteurs, en erreurs standard
+
+
+# -- stratégies de la roulette -------------------------------------------------------
+
+
+class Strategy:
+    """Quand viser quelqu'un d'autre plutôt que soi : ``self``, ``other``, ``mix:P``, ``late:K``."""
+
+    __slots__ = ("name", "kind", "value")
+
+    def __init__(self, name: str):
+        kind, _, value = name.partition(":")
+        if kind not in ("self", "other", "mix", "late") or bool(value) != (kind in ("mix", "late")):
+            raise ValueError(f"stratégie inconnue : {name!r}")
+        self.name = name
+        self.kind = kind
+        self.value = float(value) if value else None
+
+    def aims_other(self, remaining: int, draws):
+        """Pour chaque tirage uniforme de ``draws``, vise-t-on un autre joueur ? (scalaire ou tableau)"""
+        if self.kind == "self":
+            return draws < 0
+        if self.kind == "other":
+            return draws >= 0
+        if self.kind == "mix":
+            return draws < self.value
+        return draws >= 0 if remaining <= self.value else draws < 0
+
+
+# -- simulation vectorisée -------------------------------------------------------------
+
+
+def simulate_roulette(players: int, chambers: int, strategy: Strategy, n: int, rng) -> dict:
+    victims = np.empty(n, dtype=np.int64)
+    lengths = np.empty(n, dtype=np.int64)
+    for start in range(0, n, CHUNK):
+        size = min(CHUNK, n - start)
+        current = np.zeros(size, dtype=np.int64)  # la place 0 tire la première
+        victim = np.full(size, -1, dtype=np.int64)
+        length = np.zeros(size, dtype=np.int64)
+        for shot in range(chambers):  # la dernière chambre tue à coup sûr
+            active = victim < 0
+            remaining = chambers - shot
+            other = strategy.aims_other(remaining, rng.random(size))
+            target = np.where(other, (current + rng.integers(1, players, size)) % players, current)
+            hit = active & (rng.integers(0, remaining, size) == 0)
+            victim[hit] = target[hit]
+            length[hit] = shot + 1
+            current = np.where(active & ~hit & other, target, current)
+        victims[start:start + size] = victim
+        lengths[start:start + size] = length
+    return _roulette_report(players, victims, lengths)
+
+
+def _neighbors(rows: int, cols: int):
+    """Matrice ``cases × cases`` des voisinages de :func:`minesweeper_board.neighbor_masks`."""
+    cells = rows * cols
+    masks = neighbor_masks(rows, cols)
+    return np.array([[mask >> j & 1 for j in range(cells)] for mask in masks], dtype=np.float32)
+
+
+def simulate_minesweeper(rows: int, cols: int, mines: int, cascade: bool, safe_first: bool, n: int, rng) -> dict:
+    cells = rows * cols
+    safe_count = cells - mines
+    neighbors = _neighbors(rows, cols)
+    losers = np.empty(n, dtype=np.int64)
+    lengths = np.empty(n, dtype=np.int64)
+    for start in range(0, n, CHUNK):
+        size = min(CHUNK, n - start)
+        games = np.arange(size)
+        first = rng.integers(0, cells, size)
+        keys = rng.random((size, cells))
+        if safe_first:
+            keys[games, first] = 2.0  # la case du premier coup n'est jamais tirée comme mine
+        is_mine = np.zeros((size, cells), dtype=bool)
+        np.put_along_axis(is_mine, np.argpartition(keys, mines - 1, axis=1)[:, :mines], True, axis=1)
+        zero = ~is_mine & (is_mine.astype(np.float32) @ neighbors == 0)
+
+        revealed = np.zeros((size, cells), dtype=bool)
+        loser = np.full(size, DRAW, dtype=np.int64)
+        length = np.zeros(size, dtype=np.int64)
+        live = games
+        turn = 0
+        while live.size:
+            if turn == 0:
+                cell = first[live]
+            else:
+                draws = rng.random((live.size, cells))
+                draws[revealed[live]] = -1.0
+                cell = draws.argmax(axis=1)
+            hit = is_mine[live, cell]
+            loser[live[hit]] = turn % 2
+            length[live[hit]] = turn + 1
+
+            live, cell = live[~hit], cell[~hit]
+            revealed[live, cell] = True
+            if cascade:
+                spread = zero[live, cell]
+                _cascade(revealed, zero, neighbors, live[spread], cell[spread])
+            cleared = revealed[live].sum(axis=1) == safe_count
+            length[live[cleared]] = turn + 1
+            live = live[~cleared]
+            turn += 1
+        losers[start:start + size] = loser
+        lengths[start:start + size] = length
+    return _minesweeper_report(losers, lengths)
+
+
+def _cascade(revealed, zero, neighbors, games, cells):
+    """Découvre la zone de zéros de chaque case jouée, bordure comprise (comme ``reveal_cascade``)."""
+    if not games.size:
+        return
+    region = np.zeros((games.size, neighbors.shape[0]), dtype=bool)
+    region[np.arange(games.size), cells] = True
+    zero = zero[games]
+    while True:
+        grown = region | ((region & zero).astype(np.float32) @ neighbors > 0)
+        if (grown == region).all():
+            break
+        region = grown
+    revealed[games] |= region
+
+
+# -- rapports --------------------------------------------------------------------------
+
+
+def _mean_sd(lengths) -> tuple:
+    return float(np.mean(lengths)), float(np.std(lengths))
+
+
+def _roulette_report(players: int, victims, lengths) -> dict:
+    deaths = np.bincount(victims, minlength=players) / len(victims)
+    mean, sd = _mean_sd(lengths)
+    return {
+        "games": len(victims),
+        "survival_by_seat": [round(1 - float(d), 4) for d in deaths],
+        "shots": {"mean": round(mean, 3), "sd": round(sd, 3)},
+    }
+
+
+def _minesweeper_report(losers, lengths) -> dict:
+    n = len(losers)
+    wins = [float(np.sum(losers == 1 - seat)) / n for seat in (0, 1)]
+    mean, sd = _mean_sd(lengths)
+    return {
+        "games": n,
+        "win_by_seat": [round(w, 4) for w in wins],
+        "draw": round(float(np.sum(losers == DRAW)) / n, 4),
+        "moves": {"mean": round(mean, 3), "sd": round(sd, 3)},
+    }
+
+
+# -- vérification avec les vrais moteurs ---------------------------------------------
+
+
+def engine_roulette(players: int, chambers: int, strategy: Strategy, n: int, rng: random.Random) -> dict:
+    victims, lengths = [], []
+    for _ in range(n):
+        engine = RouletteEngine(range(players), rng, first=0, chambers=chambers)
+        while not engine.over:
+            if strategy.aims_other(engine.remaining, rng.random()):
+                engine.aim((engine.current + rng.randrange(1, players)) % players)
+            engine.fire()
+        victims.append(engine.victim)
+        lengths.append(engine.shots_fired)
+    return _roulette_report(players, np.array(victims), np.array(lengths))
+
+
+def engine_minesweeper(rows: int, cols: int, mines: int, cascade: bool, safe_first: bool, n: int, rng) -> dict:
+    def new_board(rows, cols, mine_count, safe_cell=None):
+        return MinesweeperBoard(rows, cols, mine_count, rng, safe_cell)
+
+    losers, lengths = [], []
+    for _ in range(n):
+        engine = MinesweeperEngine(
+            0, 1, rows, cols, mines, cascade=cascade, safe_first=safe_first, rng=rng, new_board=new_board,
+        )
+        engine.current = 0
+        moves, result = 0, None
+        while result not in (MINE, CLEARED):
+            board = engine.board
+            hidden = [i for i in range(rows * cols) if not board.is_revealed(i)]
+            result = engine.play(engine.current, rng.choice(hidden))
+            moves += 1
+        losers.append(engine.current if result == MINE else DRAW)
+        lengths.append(moves)
+    return _minesweeper_report(np.array(losers), np.array(lengths))
+
+
+def divergences(simulated: dict, played: dict) -> list:
+    """Écarts entre simulateur et moteurs au-delà de ``CHECK_SIGMAS`` erreurs standard."""
+    found = []
+    n = played["games"]
+    for key in ("survival_by_seat", "win_by_seat"):
+        for seat, (p, q) in enumerate(zip(simulated.get(key, ()), played.get(key, ()))):
+            if abs(p - q) > CHECK_SIGMAS * math.sqrt(max(q * (1 - q), 1 / n) / n):
+                found.append(f"{key}[{seat}] : {p} simulé, {q} joué")
+    for key in ("shots", "moves"):
+        if key in played:
+            p, q = simulated[key]["mean"], played[key]["mean"]
+            if abs(p - q) > CHECK_SIGMAS * max(played[key]["sd"], 1e-9) / math.sqrt(n):
+                found.append(f"{key} moyen : {p} simulé, {q} joué")
+    return found
+
+
+# -- jeux de règles --------------------------------------------------------------------
+
+
+def _grids(text: str):
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        size, _, mines = part.partition(":")
+        rows, _, cols = size.partition("x")
+        yield int(rows), int(cols), int(mines)
+
+
+def rule_sets(args):
+    """``(jeu, libellé, simulation(n, rng), moteurs(n, rng))`` pour chaque combinaison demandée."""
+    if "minesweeper" in args.only:
+        for rows, cols, mines in _grids(args.grids):
+            if not 0 < mines < rows * cols:
+                raise ValueError(f"{rows}x{cols} : mines entre 1 et {rows * cols - 1}")
+            for variant in args.variants:
+                cascade, safe_first = variant in ("cascade", "both"), variant in ("safe_first", "both")
+                rules = (rows, cols, mines, cascade, safe_first)
+                yield (
+                    "minesweeper", f"{rows}x{cols} {mines} mines {variant}",
+                    lambda n, rng, rules=rules: simulate_minesweeper(*rules, n, rng),
+                    lambda n, rng, rules=rules: engine_minesweeper(*rules, n, rng),
+                )
+    if "roulette" in args.only:
+        for chambers in args.chambers:
+            for players in args.players:
+                for strategy in args.strategies:
+                    rules = (players, chambers, strategy)
+                    yield (
+                        "roulette", f"{players} joueurs {chambers} chambres {strategy.name}",
+                        lambda n, rng, rules=rules: simulate_roulette(*rules, n, rng),
+                        lambda n, rng, rules=rules: engine_roulette(*rules, n, rng),
+                    )
+
+
+def _ints(text: str) -> list:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Équité de la Roulette et du Démineur, par Monte Carlo.")
+    parser.add_argument("--only", default="minesweeper,roulette", help="jeux à simuler, séparés par des virgules")
+    parser.add_argument("--games", type=int, default=1_000_000, help="parties par jeu de règles")
+    parser.add_argument("--grids", default=DEFAULT_GRIDS, help="grilles du démineur LIGNESxCOLONNES:MINES")
+    parser.add_argument("--variants", default="plain,cascade,safe_first",
+                        help="variantes du démineur : plain, cascade, safe_first, both")
+    parser.add_argument("--players", default="2,3,4,6", help="nombres de joueurs de la roulette")
+    parser.add_argument("--chambers", default=str(CHAMBERS), help="nombres de chambres du barillet")
+    parser.add_argument("--strategies", default="self,other,mix:0.5,late:2",
+                        help="stratégies de tir : self, other, mix:P, late:K")
+    parser.add_argument("--check", type=int, default=0, help="rejoue N parties avec les vrais moteurs et compare")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="rapport en JSON")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("NumPy est requis : pip install numpy")
+    args.only = {key.strip() for key in args.only.split(",") if key.strip()}
+    args.variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    try:
+        unknown = (args.only - {"minesweeper", "roulette"}) | (set(args.variants) - {"plain", "cascade", "safe_first", "both"})
+        if unknown:
+            raise ValueError(f"inconnus : {', '.join(sorted(unknown))}")
+        args.players = _ints(args.players)
+        args.chambers = _ints(args.chambers)
+        if min(args.players, default=2) < 2 or min(args.chambers, default=1) < 1:
+            raise ValueError("au moins 2 joueurs et 1 chambre")
+        args.strategies = [Strategy(s.strip()) for s in args.strategies.split(",") if s.strip()]
+        sets = list(rule_sets(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    rng = np.random.default_rng(args.seed)
+    check_rng = random.Random(args.seed)
+    report = []
+    failed = False
+    for game, label, simulate, play in sets:
+        started = time.perf_counter()
+        result = simulate(args.games, rng)
+        elapsed = time.perf_counter() - started
+        entry = {"game": game, "rules": label, **result, "games_per_second": round(args.games / elapsed)}
+        if args.check:
+            entry["check"] = divergences(result, play(args.check, check_rng))
+            failed = failed or bool(entry["check"])
+        report.append(entry)
+        if not args.json:
+            print(f"{game:>11} {label:<32} " + " ".join(f"{k}={v}" for k, v in entry.items() if k not in ("game", "rules")))
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import re
+import secrets
+import time
+
+import discord
+
+from state import Reservation, duel_locks, game_journal
+from member_cache import member_cache
+from rest_scheduler import CRITICAL, NORMAL, COSMETIC, outbound
+from transport import MessageTransport
+from telemetry import DURATION_BUCKETS, metrics
+from ack_guard import guard_ack
+import game_registry
+
+log = logging.getLogger(__name__)
+
+# game_id -> partie en cours. C'est la seule référence durable vers une partie :
+# aucune coroutine n'attend la fin d'un jeu, ce sont les interactions et les
+# timers qui font avancer chaque machine.
+active_games = {}
+
+# nom de classe -> classe, pour recréer les parties depuis le journal
+game_types = {}
+
+_timer_tasks = set()
+_background_tasks = set()
+
+
+def new_game_id() -> str:
+    """Id de partie libre : 64 bits tirés au hasard, retirés s'ils désignent déjà une partie en cours."""
+    while True:
+        game_id = secrets.token_hex(8)
+        if game_id not in active_games:
+            return game_id
+
+
+def id_of(obj):
+    """``obj.id``, ou ``None`` : pour les membres et messages optionnels des instantanés."""
+    return None if obj is None else obj.id
+
+
+class GameMachine:
+    """Une partie = un enregistrement compact, avancé par des événements.
+
+    ``ACTIONS`` associe chaque phase aux actions qu'elle accepte ; une action
+    ``foo`` est traitée par ``on_foo(interaction, arg)``. Les actions de timer
+    arrivent avec ``interaction=None``. Un clic hors phase (bouton d'un message
+    périmé, double clic...) reçoit un simple « Trop tard ! ».
+
+    Les handlers changent de phase *avant* leur premier ``await`` : deux
+    interactions concurrentes ne peuvent donc pas déclencher la même
+    transition.
+
+    Un handler qui lève (jeton expiré, 403, 5xx...) termine la partie : elle
+    ne reste pas coincée dans une phase sans timer avec ses joueurs
+    verrouillés.
+
+    Chaque changement de phase et chaque action traitée marquent la partie
+    dans :data:`state.game_journal` ; :meth:`snapshot` et :meth:`load`
+    permettent de la reprendre après un redémarrage.
+    """
+
+    __slots__ = (
+        "game_id", "phase", "guild_id", "channel", "transport", "message", "reservation",
+        "started_at", "_timer", "_deadline", "_timeout_action",
+    )
+
+    ACTIONS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        game_types[cls.__name__] = cls
+
+    def __init__(self, interaction: discord.Interaction, reservation):
+        self.game_id = new_game_id()
+        self.phase = None
+        self.guild_id = interaction.guild_id
+        self.channel = interaction.channel
+        self.transport = MessageTransport(interaction.channel, interaction)
+        self.message = None
+        self.reservation = reservation
+        self.started_at = time.time()
+        self._timer = None
+        self._deadline = None
+        self._timeout_action = None
+        active_games[self.game_id] = self
+        metrics.inc("games_started_total", game=type(self).__name__)
+
+    # -- transitions -----------------------------------------------------
+
+    async def dispatch(self, interaction, action: str, arg=None):
+        if action not in self.ACTIONS.get(self.phase, ()):
+            if interaction is not None:
+                await interaction.response.send_message("Trop tard !", ephemeral=True)
+            return
+        if interaction is not None:
+            self.transport.use(interaction)
+        try:
+            await getattr(self, "on_" + action)(interaction, arg)
+        except Exception:
+            # Le handler a déjà changé de phase : sans timer, rien ne l'en ferait
+            # sortir et les joueurs resteraient verrouillés. On arrête la partie.
+            log.exception("game handler failed", extra={"game_id": self.game_id, "action": action, "phase": self.phase})
+            metrics.inc("game_handler_errors_total", game=type(self).__name__)
+            self.finish()
+            return
+        game_journal.mark(self)
+
+    def enter(self, phase: str, timeout: float = None, timeout_action: str = None):
+        """Passe dans ``phase`` ; ``timeout_action`` sera déclenchée après ``timeout`` secondes."""
+        self.phase = phase
+        self.disarm()
+        if timeout is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(timeout, self._fire, phase, timeout_action)
+            self._deadline = time.time() + timeout
+            self._timeout_action = timeout_action
+        game_journal.mark(self)
+
+    def disarm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._deadline = None
+        self._timeout_action = None
+
+    def _fire(self, phase: str, action: str):
+        self._timer = None
+        if self.phase != phase:
+            return
+        task = asyncio.get_running_loop().create_task(self.dispatch(None, action))
+        _timer_tasks.add(task)
+        task.add_done_callback(_timer_done)
+
+    def finish(self):
+        if self.phase != "done":
+            kind = type(self).__name__
+            metrics.inc("games_finished_total", game=kind)
+            metrics.observe("game_duration_seconds", time.time() - self.started_at, DURATION_BUCKETS, game=kind)
+        self.phase = "done"
+        self.disarm()
+        if self.reservation is not None:
+            self.reservation.release()
+        active_games.pop(self.game_id, None)
+        game_journal.mark(self)
+
+    # -- instantanés -------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """État JSON de la partie ; les sous-classes y ajoutent le leur."""
+        reservation = self.reservation
+        return {
+            "kind": type(self).__name__,
+            "game_id": self.game_id,
+            "phase": self.phase,
+            "guild_id": self.guild_id,
+            "channel_id": self.channel.id,
+            "message_id": id_of(self.message),
+            "token": reservation.token if reservation is not None else None,
+            "user_ids": sorted(reservation.user_ids) if reservation is not None else [],
+            "started_at": self.started_at,
+            "deadline": self._deadline,
+            "timeout_action": self._timeout_action,
+        }
+
+    async def load(self, state: dict, member):
+        """Recharge l'état propre au jeu ; ``await member(user_id)`` renvoie le membre."""
+
+    def partial_message(self, message_id):
+        return None if message_id is None else self.channel.get_partial_message(message_id)
+
+    # -- messages ----------------------------------------------------------
+
+    def view(self, *items) -> discord.ui.View:
+        """Composants d'un message de la partie.
+
+        La vue est arrêtée avant l'envoi : discord.py ne la garde donc pas en
+        mémoire. Les clics reviennent par :class:`GameComponent`, qui retrouve
+        la partie grâce au ``custom_id``.
+        """
+        view = discord.ui.View(timeout=None)
+        for item in items:
+            item.custom_id = component_id(self.game_id, item.action, item.arg)
+            view.add_item(item)
+        view.stop()
+        return view
+
+    def in_background(self, coro):
+        """Lance ``coro`` sans l'attendre : annonces et ménage qui ne doivent retarder aucune transition."""
+        task = asyncio.get_running_loop().create_task(coro)
+        task.game_id = self.game_id
+        _background_tasks.add(task)
+        task.add_done_callback(_background_done)
+        return task
+
+    async def send(self, content: str = None, priority: int = NORMAL, **kwargs):
+        if "view" in kwargs and kwargs["view"] is None:
+            del kwargs["view"]  # rien à retirer d'un nouveau message, et followup.send refuse None
+        action, interaction = self.transport.sender()
+        message = await outbound.submit(self.channel.id, action, priority, content=content, **kwargs)
+        self.transport.remember(message, interaction)
+        return message
+
+    async def edit(self, message, priority: int = CRITICAL, **kwargs):
+        """Édite ``message`` ; deux éditions en attente du même message n'en font qu'une."""
+        handle = self.transport.handle(message)
+        return await outbound.submit(self.channel.id, handle.edit, priority, key=("edit", message.id), **kwargs)
+
+    async def delete(self, message, priority: int = COSMETIC):
+        handle = self.transport.handle(message)
+        return await outbound.submit(self.channel.id, handle.delete, priority, key=("delete", message.id))
+
+
+async def restore_games(client) -> int:
+    """Recrée les parties du journal et réarme leurs timers ; renvoie le nombre de parties reprises.
+
+    Les boutons des messages existants refonctionnent d'eux-mêmes : ils sont
+    routés par ``custom_id`` vers :data:`active_games`. Les verrous persistés
+    qu'aucune partie reprise ne détient (partie finie ou lancée moins de
+    ``SNAPSHOT_INTERVAL`` secondes avant l'arrêt) sont libérés ensuite, sans
+    quoi leurs joueurs resteraient bloqués jusqu'à l'expiration du verrou.
+    """
+    persisted = duel_locks.tokens()
+    restored = 0
+    for state in game_journal.load():
+        game_id = state["game_id"]
+        if game_id in active_games:
+            continue
+        try:
+            game = await _restore(client, state)
+        except Exception as e:
+            log.warning("could not restore game", extra={"game_id": game_id, "error": repr(e)})
+            game = None
+        if game is None:
+            # Coupée en pleine transition ou salon/joueur disparu : on rend les joueurs.
+            if state["token"]:
+                Reservation(duel_locks, state["guild_id"] or 0, state["user_ids"], state["token"]).release()
+            game_journal.forget(game_id)
+            continue
+
+        active_games[game_id] = game
+        if state["deadline"] is not None:
+            game.enter(game.phase, max(0.0, state["deadline"] - time.time()), state["timeout_action"])
+        restored += 1
+    held = {game.reservation.token for game in active_games.values() if game.reservation is not None}
+    orphaned = duel_locks.release_tokens(persisted - held)
+    log.info("games restored from the journal", extra={"count": restored, "orphaned_locks": orphaned})
+    return restored
+
+
+async def _restore(client, state: dict):
+    if state["kind"] not in game_types:
+        game_registry.load_kind(state["kind"])  # les modules de jeu sont chargés à la demande
+    cls = game_types[state["kind"]]
+    if state["phase"] not in cls.ACTIONS:
+        return None
+
+    channel = client.get_channel(state["channel_id"]) or await client.fetch_channel(state["channel_id"])
+    game = cls.__new__(cls)
+    game.game_id = state["game_id"]
+    game.phase = state["phase"]
+    game.guild_id = state["guild_id"]
+    game.channel = channel
+    game.transport = MessageTransport(channel)
+    game.reservation = None
+    if state["token"]:
+        game.reservation = Reservation(duel_locks, state["guild_id"] or 0, state["user_ids"], state["token"])
+    game.started_at = state.get("started_at") or time.time()
+    game._timer = None
+    game._deadline = None
+    game._timeout_action = None
+    game.message = game.partial_message(state["message_id"])
+
+    async def member(user_id):
+        return None if user_id is None else await member_cache.resolve(channel.guild, user_id)
+
+    await game.load(state, member)
+    return game
+
+
+def _timer_done(task: asyncio.Task):
+    _timer_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("game timer failed", exc_info=task.exception())
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("background send failed", extra={"game_id": task.game_id, "error": repr(task.exception())})
+
+
+# custom_id des composants de jeu : "g:<game_id>:<action>:<arg>" (100 caractères max).
+COMPONENT_TEMPLATE = re.compile(r"g:(?P<game_id>[0-9a-f]+):(?P<action>[a-z_]+):(?P<arg>[^:]*)")
+
+
+def component_id(game_id: str, action: str, arg=None) -> str:
+    return f"g:{game_id}:{action}:{'' if arg is None else arg}"
+
+
+class ActionButton(discord.ui.Button):
+    """Bouton qui déclenche ``action`` (avec ``arg``) sur la partie du message."""
+
+    def __init__(self, action: str, arg=None, **kwargs):
+        super().__init__(**kwargs)
+        self.action = action
+        self.arg = arg
+
+
+class ActionSelect(discord.ui.Select):
+    """Menu qui déclenche ``action`` avec l'option choisie comme argument."""
+
+    def __init__(self, action: str, **kwargs):
+        super().__init__(**kwargs)
+        self.action = action
+        self.arg = None
+
+
+class GameComponent(discord.ui.DynamicItem[discord.ui.Item], template=COMPONENT_TEMPLATE):
+    """Routeur unique des clics de jeu, enregistré une fois via ``bot.add_dynamic_items``.
+
+    Aucun objet ``View`` n'est conservé par message : le ``custom_id`` dit
+    quelle partie et quelle action sont visées, et l'état vit dans
+    :data:`active_games`.
+    """
+
+    def __init__(self, item: discord.ui.Item, game_id: str, action: str, arg: str):
+        super().__init__(item)
+        self.game_id = game_id
+        self.action = action
+        self.arg = arg
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Item, match: re.Match):
+        return cls(item, match["game_id"], match["action"], match["arg"])
+
+    async def callback(self, interaction: discord.Interaction):
+        member_cache.remember(interaction.user)
+        game = active_games.get(self.game_id)
+        interaction = guard_ack(interaction, f"{type(game).__name__ if game is not None else 'ended'}.on_{self.action}")
+        if game is None:
+            await interaction.response.send_message("Cette partie est terminée.", ephemeral=True)
+            return
+        values = interaction.data.get("values")  # menus : l'option choisie sert d'argument
+        arg = values[0] if values else self.arg or None
+        await game.dispatch(interaction, self.action, arg)
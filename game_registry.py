@@ -0,0 +1,99 @@
+import importlib
+import logging
+import sys
+import time
+
+import discord
+
+# Budget (secondes) pour importer les modules du bot au démarrage ; les jeux sont chargés plus tard.
+COLD_START_BUDGET = 0.5
+
+log = logging.getLogger(__name__)
+
+
+class GameEntry:
+    """Ce que ``/duel`` doit savoir d'un jeu sans importer son module."""
+
+    __slots__ = ("key", "label", "emoji", "style", "prompt", "module", "setup_view", "kinds")
+
+    def __init__(self, key, label, emoji, style, prompt, module, setup_view, kinds=()):
+        self.key = key
+        self.label = label
+        self.emoji = emoji
+        self.style = style
+        self.prompt = prompt  # texte du message quand le jeu est choisi
+        self.module = module  # importé au premier choix du jeu
+        self.setup_view = setup_view  # nom de la vue de setup dans ce module
+        self.kinds = tuple(kinds)  # classes de partie du module, pour la reprise après redémarrage
+
+
+# clé -> GameEntry, dans l'ordre des boutons de /duel
+games = {}
+
+
+def register_game(key, label, emoji, style, prompt, module, setup_view, kinds=()):
+    games[key] = GameEntry(key, label, emoji, style, prompt, module, setup_view, kinds)
+
+
+def unregister_game(key):
+    """Retire le jeu de ``/duel`` (``teardown`` d'une extension) ; ses parties en cours continuent."""
+    games.pop(key, None)
+
+
+def load_game(entry: GameEntry):
+    """Importe le module du jeu (une seule fois) et le renvoie."""
+    module = sys.modules.get(entry.module)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(entry.module)
+    log.info("game loaded", extra={"game": entry.key, "ms": round((time.perf_counter() - started) * 1000, 1)})
+    return module
+
+
+def setup_view(key, user) -> discord.ui.View:
+    entry = games[key]
+    return getattr(load_game(entry), entry.setup_view)(user)
+
+
+def reload_game(key):
+    """Recharge le code d'un jeu à chaud.
+
+    Les nouvelles parties (et celles reprises du journal) utilisent la
+    nouvelle version ; les parties en cours gardent leur classe et finissent
+    avec l'ancien code.
+    """
+    entry = games[key]
+    module = sys.modules.get(entry.module)
+    if module is None:
+        return load_game(entry)
+    started = time.perf_counter()
+    module = importlib.reload(module)
+    log.info("game reloaded", extra={"game": key, "ms": round((time.perf_counter() - started) * 1000, 1)})
+    return module
+
+
+def load_kind(kind: str) -> bool:
+    """Importe le jeu qui définit la classe de partie ``kind`` ; ``False`` si inconnue."""
+    for entry in games.values():
+        if kind in entry.kinds:
+            load_game(entry)
+            return True
+    return False
+
+
+register_game(
+    "rps", "Pierre-Papier-Ciseaux", "🪨", discord.ButtonStyle.primary,
+    "**⚔️ Pierre-Papier-Ciseaux**\nChoisis ton adversaire :",
+    "rps_game", "RPSSetupView", kinds=("RPSMatch",),
+)
+register_game(
+    "roulette", "Roulette Russe", "🔫", discord.ButtonStyle.danger,
+    "**🔫 Roulette Russe**\nSélectionne les joueurs :",
+    "roulette_game", "RouletteSetupView", kinds=("RouletteMatch",),
+)
+register_game(
+    "minesweeper", "Démineur", "💣", discord.ButtonStyle.success,
+    "**💣 Démineur**\nChoisis ton adversaire :",
+    "minesweeper_game", "MinesweeperSetupView", kinds=("MinesweeperMatch",),
+)
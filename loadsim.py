@@ -0,0 +1,451 @@
+"""Simulateur de charge : des milliers de duels joués en mémoire, sans connexion à Discord.
+
+    python loadsim.py --duels 2000 --games rps,minesweeper,roulette --latency 0.05
+
+Les interactions, réponses, followups, salons et membres sont des doublures
+(``timeout()`` est enregistré, pas envoyé) ; tout le reste est le vrai code :
+commande ``/duel``, ``GameSelectView``, vues de setup, modals, routeur
+``GameComponent``, scheduler REST, exécuteur de sanctions, journal.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+# À régler avant les imports du bot, qui lisent leur config dans l'environnement.
+os.environ.setdefault("DUEL_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="duel-loadsim-"), "state.db"))
+os.environ.setdefault("DUEL_LOG_LEVEL", "WARNING")
+os.environ.setdefault("DUEL_METRICS_PORT", "0")
+
+import discord
+from discord.utils import MISSING
+
+import bot
+import game_registry
+from duel_flow import HIGH_STAKES_MINUTES
+from game_flow import COMPONENT_TEMPLATE, GameComponent, active_games
+from punishments import punishments
+from rest_scheduler import outbound
+from state import duel_locks, game_journal
+
+POLL = 0.01  # secondes entre deux regards des joueurs simulés sur une partie qui attend un timer
+LAG_INTERVAL = 0.01
+
+_snowflakes = itertools.count(1 << 40)
+
+
+# -- doublures -------------------------------------------------------------------
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = next(_snowflakes)
+        self.members = {}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id):
+        member = self.members.get(user_id)
+        if member is None:
+            raise LookupError(f"member {user_id} not found")
+        return member
+
+
+class FakeMember:
+    """Membre du serveur simulé : ``timeout()`` est enregistré, pas envoyé."""
+
+    __slots__ = ("id", "name", "display_name", "mention", "bot", "guild", "sim", "timed_out_until")
+
+    def __init__(self, sim, guild):
+        self.id = next(_snowflakes)
+        self.name = self.display_name = f"joueur{self.id % 100000}"
+        self.mention = f"<@{self.id}>"
+        self.bot = False
+        self.guild = guild
+        self.sim = sim
+        self.timed_out_until = None
+        guild.members[self.id] = self
+
+    async def timeout(self, until, *, reason=None):
+        await self.sim.rest("timeout")
+        self.timed_out_until = until
+
+
+class FakeMessage:
+    __slots__ = ("id", "channel", "content", "view", "ephemeral")
+
+    def __init__(self, channel, message_id=None, content=None, view=None, ephemeral=False):
+        self.id = next(_snowflakes) if message_id is None else message_id
+        self.channel = channel
+        self.content = content
+        self.view = view
+        self.ephemeral = ephemeral
+
+    def update(self, content=MISSING, view=MISSING):
+        if content is not MISSING:
+            self.content = content
+        if view is not MISSING:
+            self.view = view
+
+    async def edit(self, *, content=MISSING, view=MISSING, **kwargs):
+        await self.channel.sim.rest("edit")
+        self.update(content, view)
+        return self
+
+    async def delete(self):
+        await self.channel.sim.rest("delete")
+        self.channel.messages.pop(self.id, None)
+
+
+class FakeChannel:
+    def __init__(self, sim, guild):
+        self.id = next(_snowflakes)
+        self.guild = guild
+        self.sim = sim
+        self.messages = {}  # id -> FakeMessage, dans l'ordre d'envoi
+
+    def post(self, content=None, view=None, ephemeral=False) -> FakeMessage:
+        message = FakeMessage(self, content=content, view=None if view is MISSING else view, ephemeral=ephemeral)
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content=None, *, view=MISSING, **kwargs):
+        await self.sim.rest("channel_send")
+        return self.post(content, view)
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(message_id) or FakeMessage(self, message_id)
+
+
+class FakeFollowup:
+    __slots__ = ("_interaction",)
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, *, view=MISSING, ephemeral=False, **kwargs):
+        await self._interaction.sim.rest("followup_send")
+        return self._interaction.channel.post(content, view, ephemeral)
+
+
+class FakeResponse:
+    """Comme ``discord.InteractionResponse`` : une seule réponse par interaction."""
+
+    __slots__ = ("_interaction", "_done")
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction.sim.rest("response")
+
+    async def send_message(self, content=None, *, view=MISSING, ephemeral=False, **kwargs):
+        await self._respond()
+        self._interaction.original = self._interaction.channel.post(content, view, ephemeral)
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def edit_message(self, *, content=MISSING, view=MISSING, **kwargs):
+        await self._respond()
+        self._interaction.message.update(content, view)
+
+    async def send_modal(self, modal):
+        await self._respond()
+        self._interaction.modal = modal
+
+
+class FakeInteraction:
+    def __init__(self, sim, user, channel, message=None, data=None):
+        self.id = next(_snowflakes)
+        self.sim = sim
+        self.user = user
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.channel = channel
+        self.message = message  # message du composant cliqué
+        self.data = data or {}
+        self.created_at = discord.utils.utcnow()
+        self.followup = FakeFollowup(self)
+        self.original = None  # message envoyé en réponse
+        self.modal = None  # modal ouvert en réponse
+        self.response = FakeResponse(self)
+
+    async def edit_original_response(self, *, content=MISSING, view=MISSING, **kwargs):
+        await self.sim.rest("edit")
+        (self.original or self.message).update(content, view)
+
+
+# -- simulateur --------------------------------------------------------------------
+
+
+class LoadSim:
+    """Joue des duels complets avec des joueurs simulés et mesure ce que ça coûte."""
+
+    def __init__(self, latency: float = 0.0, think: float = 0.0, revenge: float = 0.5, rng=random):
+        self.latency = latency  # délai de chaque appel REST simulé
+        self.think = think  # temps de réflexion moyen d'un joueur avant chaque clic
+        self.revenge = revenge  # probabilité de demander (et d'accepter) une revanche
+        self.rng = rng
+        self.guild = FakeGuild()
+        self.rest_calls = Counter()
+        self.interactions = 0
+        self.lag = []
+
+    async def rest(self, kind: str):
+        self.rest_calls[kind] += 1
+        await asyncio.sleep(self.latency)
+
+    def member(self) -> FakeMember:
+        return FakeMember(self, self.guild)
+
+    async def pause(self):
+        await asyncio.sleep(self.rng.expovariate(1 / self.think) if self.think else 0)
+
+    # -- interactions -------------------------------------------------------------
+
+    async def use(self, user, channel, message, item, values=None) -> FakeInteraction:
+        """Clic sur l'item d'une vue enregistrée, comme le ``ViewStore`` de discord.py."""
+        interaction = FakeInteraction(self, user, channel, message, {"custom_id": item.custom_id})
+        if values is not None:
+            item._values = values
+        self.interactions += 1
+        if await item.view.interaction_check(interaction):
+            await item.callback(interaction)
+        return interaction
+
+    async def submit(self, user, channel, message, modal, value: str) -> FakeInteraction:
+        modal.timeout_input._value = value
+        interaction = FakeInteraction(self, user, channel, message, {"custom_id": modal.custom_id})
+        self.interactions += 1
+        if await modal.interaction_check(interaction):
+            await modal.on_submit(interaction)
+        return interaction
+
+    def components(self, channel, game_id: str, action: str):
+        """``(message, item)`` des composants actifs de la partie pour ``action``, du plus récent au plus ancien."""
+        found = []
+        for message in reversed(channel.messages.values()):
+            if message.view is None:
+                continue
+            for item in message.view.children:
+                match = COMPONENT_TEMPLATE.fullmatch(getattr(item, "custom_id", None) or "")
+                if match and match["game_id"] == game_id and match["action"] == action and not item.disabled:
+                    found.append((message, item))
+        return found
+
+    async def press(self, user, channel, game, action: str, pick=None, value=None) -> bool:
+        """Clic routé par ``GameComponent`` ; ``pick`` choisit parmi plusieurs composants (cases)."""
+        found = self.components(channel, game.game_id, action)
+        if not found:
+            return False
+        message, item = pick(found) if pick else found[0]
+        data = {"custom_id": item.custom_id}
+        if value is not None:
+            data["values"] = [value]
+        interaction = FakeInteraction(self, user, channel, message, data)
+        self.interactions += 1
+        component = await GameComponent.from_custom_id(interaction, item, COMPONENT_TEMPLATE.fullmatch(item.custom_id))
+        await component.callback(interaction)
+        return True
+
+    def game_in(self, channel):
+        for message in reversed(channel.messages.values()):
+            for item in message.view.children if message.view is not None else ():
+                match = COMPONENT_TEMPLATE.fullmatch(getattr(item, "custom_id", None) or "")
+                if match and match["game_id"] in active_games:
+                    return active_games[match["game_id"]]
+        return None
+
+    async def setup(self, key: str, host, channel, chosen, minutes: int):
+        """``/duel`` → bouton du jeu → choix des joueurs → lancer → modal ; renvoie la partie créée."""
+        slash = FakeInteraction(self, host, channel)
+        self.interactions += 1
+        await bot.duel.callback(slash)
+        menu = slash.original
+        label = game_registry.games[key].label
+        await self.use(host, channel, menu, next(i for i in menu.view.children if i.label == label))
+
+        setup = menu.view
+        select = next(i for i in setup.children if isinstance(i, discord.ui.UserSelect))
+        await self.use(host, channel, menu, select, values=chosen)
+        start = next(i for i in setup.children if isinstance(i, discord.ui.Button) and i.label.startswith("Lancer"))
+        started = await self.use(host, channel, menu, start)
+        if started.modal is None:
+            raise RuntimeError(f"setup refused: {started.original.content if started.original else '?'}")
+        await self.submit(host, channel, menu, started.modal, str(minutes))
+        return self.game_in(channel)
+
+    # -- scénarios ----------------------------------------------------------------
+
+    async def play_duel(self, key: str):
+        """PPC ou Démineur : défi, partie, revanche éventuelle, sanction."""
+        channel = FakeChannel(self, self.guild)
+        host, guest = self.member(), self.member()
+        minutes = self.rng.choice((5, 30, HIGH_STAKES_MINUTES + 60))
+        game = await self.setup(key, host, channel, [guest], minutes)
+
+        await self.pause()
+        await self.press(guest, channel, game, "accept")
+        if game.phase == "confirm":
+            await self.press(guest, channel, game, "confirm")
+
+        while game.phase != "done":
+            await self.pause()
+            if game.phase == "playing":
+                if key == "rps":
+                    await self.press(host, channel, game, "choose", pick=self.rng.choice)
+                    await self.press(guest, channel, game, "choose", pick=self.rng.choice)
+                else:
+                    await self.press(game.current_player, channel, game, "cell", pick=self.rng.choice)
+            elif game.phase == "revenge_offer":
+                wants = self.rng.random() < self.revenge
+                await self.press(game.loser, channel, game, "revenge" if wants else "abandon")
+            elif game.phase == "revenge_pending":
+                accepts = self.rng.random() < self.revenge
+                await self.press(game.winner, channel, game, "accept_revenge" if accepts else "refuse_revenge")
+            else:
+                await asyncio.sleep(POLL)
+
+    async def play_roulette(self):
+        channel = FakeChannel(self, self.guild)
+        host = self.member()
+        invited = [self.member() for _ in range(self.rng.randint(1, 5))]
+        game = await self.setup("roulette", host, channel, invited, self.rng.randint(1, 30))
+
+        for player in invited:
+            await self.pause()
+            await self.press(player, channel, game, "join")
+
+        while game.phase != "done":
+            if game.phase != "turn":
+                await asyncio.sleep(POLL)
+                continue
+            await self.pause()
+            shooter = game.current_player
+            if self.rng.random() < 0.5:
+                await self.press(shooter, channel, game, "shoot_self")
+                continue
+            found = self.components(channel, game.game_id, "shoot_other")
+            if found:
+                target = self.rng.choice(found[0][1].options).value
+                await self.press(shooter, channel, game, "shoot_other", value=target)
+
+    async def watch_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lag.append(loop.time() - started - LAG_INTERVAL)
+
+    async def run(self, duels: int, games, concurrency: int, duel_timeout: float) -> dict:
+        roulette = game_registry.load_game(game_registry.games["roulette"])
+        roulette.INTRO_DELAY = roulette.SUSPENSE_DELAY = POLL  # pas de mise en scène pendant une simulation
+        game_journal.start()
+        watcher = asyncio.get_running_loop().create_task(self.watch_lag())
+        limit = asyncio.Semaphore(concurrency)
+        outcome = Counter()
+        errors = []
+
+        async def one(key):
+            async with limit:
+                scenario = self.play_roulette() if key == "roulette" else self.play_duel(key)
+                try:
+                    await asyncio.wait_for(scenario, duel_timeout)
+                except asyncio.TimeoutError:
+                    outcome["stuck"] += 1
+                except Exception as e:
+                    outcome["errors"] += 1
+                    if len(errors) < 5:
+                        errors.append(repr(e))
+                else:
+                    outcome["completed"] += 1
+                    outcome[key] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(self.rng.choice(games)) for _ in range(duels)))
+        elapsed = time.perf_counter() - started
+
+        # Les sanctions partent en arrière-plan : on les laisse finir avant de chercher des fuites.
+        while punishments.metrics()["inflight"] or outbound.metrics()["queued"]:
+            await asyncio.sleep(POLL)
+        watcher.cancel()
+        game_journal.flush()
+
+        lag = sorted(self.lag) or [0.0]
+        return {
+            "duels": duels,
+            **outcome,
+            "error_samples": errors,
+            "seconds": round(elapsed, 3),
+            "duels_per_second": round(outcome["completed"] / elapsed, 1),
+            "interactions_per_second": round(self.interactions / elapsed, 1),
+            "loop_lag_ms": {
+                "p50": round(lag[len(lag) // 2] * 1000, 2),
+                "p99": round(lag[int(len(lag) * 0.99)] * 1000, 2),
+                "max": round(lag[-1] * 1000, 2),
+            },
+            "rest_calls": dict(self.rest_calls),
+            "rest_calls_per_duel": round(sum(self.rest_calls.values()) / max(1, outcome["completed"]), 1),
+            "leaks": {
+                "active_games": len(active_games),
+                "duel_locks": len(duel_locks),
+                "outbound_queued": outbound.metrics()["queued"],
+                "punishments_inflight": punishments.metrics()["inflight"],
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulateur de charge des duels, sans Discord.")
+    parser.add_argument("--duels", type=int, default=1000)
+    parser.add_argument("--games", default="rps,minesweeper,roulette", help="jeux tirés au hasard, séparés par des virgules")
+    parser.add_argument("--concurrency", type=int, default=0, help="duels simultanés (0 : tous)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence de chaque appel REST simulé (s)")
+    parser.add_argument("--think", type=float, default=0.0, help="temps de réflexion moyen des joueurs (s)")
+    parser.add_argument("--revenge", type=float, default=0.5, help="probabilité de revanche")
+    parser.add_argument("--timeout", type=float, default=120.0, help="au-delà, un duel est compté bloqué (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--trace-memory", action="store_true", help="pic mémoire Python via tracemalloc (plus lent)")
+    parser.add_argument("--json", action="store_true", help="rapport en JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    games = [key.strip() for key in args.games.split(",") if key.strip()]
+    unknown = set(games) - game_registry.games.keys()
+    if unknown:
+        parser.error(f"jeux inconnus : {', '.join(sorted(unknown))}")
+
+    if args.trace_memory:
+        tracemalloc.start()
+    sim = LoadSim(latency=args.latency, think=args.think, revenge=args.revenge)
+    report = asyncio.run(sim.run(args.duels, games, args.concurrency or args.duels, args.timeout))
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if args.trace_memory:
+        report["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
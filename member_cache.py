@@ -0,0 +1,61 @@
+import time
+from collections import Counter, OrderedDict
+
+import discord
+
+MEMBER_CACHE_SIZE = 2048
+MEMBER_CACHE_TTL = 15 * 60  # secondes : pseudo/rôles peuvent changer entre deux parties
+
+
+class MemberCache:
+    """Cache LRU borné des membres vus par le bot, avec expiration.
+
+    Sans l'intent ``members``, discord.py ne garde plus tout le serveur en
+    mémoire : les membres arrivent avec les interactions (auteur du clic,
+    valeurs d'un ``UserSelect``) et sont retenus ici. Un membre absent est
+    demandé à l'API avec ``fetch_member``, puis mis en cache.
+    """
+
+    def __init__(self, maxsize: int = MEMBER_CACHE_SIZE, ttl: float = MEMBER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = Counter()
+        self._entries = OrderedDict()  # (guild_id, user_id) -> (expires_at, member)
+
+    def remember(self, member):
+        if not isinstance(member, discord.Member):
+            return  # MP ou utilisateur hors serveur : rien à timeout
+        key = (member.guild.id, member.id)
+        self._entries[key] = (time.monotonic() + self.ttl, member)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def get(self, guild_id: int, user_id: int):
+        key = (guild_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def resolve(self, guild: discord.Guild, user_id: int):
+        member = self.get(guild.id, user_id) or guild.get_member(user_id)
+        if member is not None:
+            self.stats["hits"] += 1
+            return member
+        self.stats["fetches"] += 1
+        member = await guild.fetch_member(user_id)
+        self.remember(member)
+        return member
+
+    def __len__(self):
+        return len(self._entries)
+
+
+member_cache = MemberCache()
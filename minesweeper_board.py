@@ -0,0 +1,155 @@
+import random
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def neighbor_masks(rows: int, cols: int) -> tuple:
+    """Pour chaque case (index ``row * cols + col``), le bitboard de ses voisines."""
+    masks = []
+    for r in range(rows):
+        for c in range(cols):
+            mask = 0
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    nr, nc = r + dr, c + dc
+                    if (dr, dc) != (0, 0) and 0 <= nr < rows and 0 <= nc < cols:
+                        mask |= 1 << (nr * cols + nc)
+            masks.append(mask)
+    return tuple(masks)
+
+
+def iter_bits(mask: int):
+    """Index des bits à 1 de ``mask``, du plus faible au plus fort."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class MinesweeperBoard:
+    """Grille de démineur sans dépendance à discord.
+
+    Mines et cases révélées sont des entiers utilisés comme bitboards ; les
+    voisinages sont précalculés une fois par taille de grille. Révéler une
+    case et tenir le compte des cases sûres coûte O(1).
+
+    Les zones de zéros sont indexées à la création : ``regions[i]`` donne la
+    zone d'une case sans mine voisine (-1 sinon) et ``region_masks[z]`` la
+    zone avec sa bordure, c'est-à-dire tout ce qu'une cascade découvre.
+    """
+
+    __slots__ = (
+        "rows", "cols", "mine_count", "safe_count",
+        "mines", "revealed", "safe_revealed", "adjacency",
+        "regions", "region_masks",
+    )
+
+    def __init__(self, rows: int, cols: int, mine_count: int, rng=random, safe_cell: int = None):
+        if not 0 < mine_count < rows * cols:
+            raise ValueError(f"mine_count doit être entre 1 et {rows * cols - 1}")
+        self.rows = rows
+        self.cols = cols
+        self.mine_count = mine_count
+        self.safe_count = rows * cols - mine_count
+
+        cells = range(rows * cols)
+        if safe_cell is not None:
+            # Premier coup garanti : les mines sont tirées parmi les autres cases.
+            cells = [i for i in cells if i != safe_cell]
+        self.mines = 0
+        for i in rng.sample(cells, mine_count):
+            self.mines |= 1 << i
+        self.revealed = 0
+        self.safe_revealed = 0
+        self._index()
+
+    @classmethod
+    def from_masks(cls, rows: int, cols: int, mines: int, revealed: int = 0) -> "MinesweeperBoard":
+        """Recrée une grille depuis ses bitboards (reprise d'une partie sauvegardée)."""
+        board = cls.__new__(cls)
+        board.rows = rows
+        board.cols = cols
+        board.mine_count = mines.bit_count()
+        board.safe_count = rows * cols - board.mine_count
+        board.mines = mines
+        board.revealed = revealed
+        board.safe_revealed = (revealed & ~mines).bit_count()
+        board._index()
+        return board
+
+    def _index(self):
+        mines = self.mines
+        self.adjacency = [(mines & mask).bit_count() for mask in neighbor_masks(self.rows, self.cols)]
+        self._index_regions()
+
+    def _index_regions(self):
+        neighbors = neighbor_masks(self.rows, self.cols)
+        zeros = 0
+        for i, adj in enumerate(self.adjacency):
+            if adj == 0 and not self.mines >> i & 1:
+                zeros |= 1 << i
+
+        self.regions = [-1] * (self.rows * self.cols)
+        self.region_masks = []
+        unvisited = zeros
+        while unvisited:
+            seed = unvisited & -unvisited
+            region = seed
+            frontier = seed
+            while frontier:
+                grown = 0
+                for i in iter_bits(frontier):
+                    grown |= neighbors[i]
+                frontier = grown & zeros & ~region
+                region |= frontier
+            unvisited &= ~region
+
+            region_id = len(self.region_masks)
+            border = region
+            for i in iter_bits(region):
+                self.regions[i] = region_id
+                border |= neighbors[i]
+            self.region_masks.append(border)
+
+    def index(self, row: int, col: int) -> int:
+        return row * self.cols + col
+
+    def position(self, index: int) -> tuple:
+        return divmod(index, self.cols)
+
+    def is_mine(self, index: int) -> bool:
+        return bool(self.mines >> index & 1)
+
+    def is_revealed(self, index: int) -> bool:
+        return bool(self.revealed >> index & 1)
+
+    def reveal(self, index: int) -> bool:
+        """Révèle une case ; renvoie ``True`` si c'était une mine."""
+        bit = 1 << index
+        if self.revealed & bit:
+            return bool(self.mines & bit)
+        self.revealed |= bit
+        if self.mines & bit:
+            return True
+        self.safe_revealed += 1
+        return False
+
+    def reveal_cascade(self, index: int):
+        """Comme :meth:`reveal`, mais une case à 0 découvre toute sa zone.
+
+        Renvoie ``(mine_touchée, bitboard des cases nouvellement révélées)``.
+        """
+        region_id = self.regions[index]
+        if region_id < 0:
+            was_revealed = self.is_revealed(index)
+            hit = self.reveal(index)
+            return hit, 0 if was_revealed else 1 << index
+
+        new = self.region_masks[region_id] & ~self.revealed
+        self.revealed |= new
+        self.safe_revealed += new.bit_count()
+        return False, new
+
+    @property
+    def cleared(self) -> bool:
+        return self.safe_revealed == self.safe_count
@@ -0,0 +1,89 @@
+import random
+
+from minesweeper_board import MinesweeperBoard
+
+# Résultats de MinesweeperEngine.play
+NOT_YOUR_TURN = 0
+ALREADY_REVEALED = 1
+SAFE = 2  # case sûre, la main passe à l'autre joueur
+MINE = 3  # le joueur courant a perdu
+CLEARED = 4  # toutes les cases sûres sont révélées : match nul
+
+
+class MinesweeperEngine:
+    """Duel de Démineur sans dépendance à discord : deux joueurs jouent à tour de rôle sur une grille.
+
+    Toucher une mine fait perdre le joueur courant. Si toutes les cases
+    sûres sont révélées, c'est un match nul. Un coup fait un seul tour,
+    même quand une cascade découvre toute une zone.
+
+    ``new_board(rows, cols, mine_count, safe_cell=None)`` fournit les
+    grilles : le constructeur de :class:`MinesweeperBoard` par défaut, la
+    réserve pré-générée côté bot. Avec ``safe_first``, si le tout premier
+    coup tombe sur une mine, la grille est remplacée par une autre où
+    cette case est sûre ; rien n'a encore été montré aux joueurs.
+    """
+
+    __slots__ = ("players", "current", "board", "cascade", "safe_first", "last_revealed", "new_board")
+
+    def __init__(
+        self, player1, player2, rows: int, cols: int, mine_count: int,
+        cascade: bool = False, safe_first: bool = False, rng=random, new_board=None, board=None,
+    ):
+        self.players = (player1, player2)
+        self.current = rng.choice(self.players)
+        self.cascade = cascade
+        self.safe_first = safe_first
+        self.new_board = new_board or MinesweeperBoard
+        self.board = board if board is not None else self.new_board(rows, cols, mine_count)
+        self.last_revealed = 0  # bitboard des cases découvertes par le dernier coup
+
+    @property
+    def opponent(self):
+        return self.players[1] if self.current == self.players[0] else self.players[0]
+
+    def play(self, player, index: int) -> int:
+        """Joue la case ``index`` pour ``player`` ; renvoie l'un des résultats du module."""
+        if player != self.current:
+            return NOT_YOUR_TURN
+        board = self.board
+        if board.is_revealed(index):
+            return ALREADY_REVEALED
+
+        if self.safe_first and not board.revealed and board.is_mine(index):
+            board = self.board = self.new_board(board.rows, board.cols, board.mine_count, safe_cell=index)
+
+        if self.cascade:
+            hit, self.last_revealed = board.reveal_cascade(index)
+        else:
+            hit, self.last_revealed = board.reveal(index), 1 << index
+
+        if hit:
+            return MINE
+        if board.cleared:
+            return CLEARED
+        self.current = self.opponent
+        return SAFE
+
+    def to_state(self) -> dict:
+        board = self.board
+        return {
+            "players": list(self.players),
+            "current": self.current,
+            "size": [board.rows, board.cols],
+            "mines": board.mines,
+            "revealed": board.revealed,
+            "cascade": self.cascade,
+            "safe_first": self.safe_first,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, new_board=None) -> "MinesweeperEngine":
+        rows, cols = state["size"]
+        board = MinesweeperBoard.from_masks(rows, cols, state["mines"], state["revealed"])
+        engine = cls(
+            *state["players"], rows, cols, board.mine_count,
+            cascade=state["cascade"], safe_first=state["safe_first"], new_board=new_board, board=board,
+        )
+        engine.current = state["current"]
+        return engine
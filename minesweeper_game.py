@@ -1,367 +1,289 @@
+import logging
+
 import discord
-import asyncio
-import random
-from datetime import timedelta
-from state import active_duels
-from rps_game import DuelView, AcceptRevengeView
+from state import duel_locks, RESERVATION_TTL
+from game_flow import ActionButton, ActionSelect
+from duel_flow import DuelMatch
+from rest_scheduler import CRITICAL
+from ack_guard import GuardedModal, GuardedView
+from minesweeper_board import iter_bits
+from minesweeper_engine import MinesweeperEngine, NOT_YOUR_TURN, ALREADY_REVEALED, MINE, CLEARED
+from minesweeper_pool import board_pool
+import minesweeper_render
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
 
 GRID_SIZE = 5
 MINE_COUNT = 5
 SAFE_COUNT = GRID_SIZE * GRID_SIZE - MINE_COUNT  # 20
 
+# Taille de grille -> nombre de mines. Au-delà de 5×5 (limite de 25 boutons),
+# la grille est rendue en image et la case se choisit avec deux menus.
+BOARD_SIZES = {
+    GRID_SIZE: MINE_COUNT,
+    10: 15,
+    16: 40,
+}
 
-class MinesweeperButton(discord.ui.Button):
-    def __init__(self, grid_row: int, grid_col: int):
-        super().__init__(
-            style=discord.ButtonStyle.secondary,
-            label="⬜",
-            row=grid_row,
-        )
-        self.grid_row = grid_row
-        self.grid_col = grid_col
 
-    async def callback(self, interaction: discord.Interaction):
-        await self.view.handle_click(interaction, self.grid_row, self.grid_col)
-
-
-class MinesweeperView(discord.ui.View):
-    def __init__(self, player1, player2):
-        super().__init__(timeout=300)
-        self.player1 = player1
-        self.player2 = player2
-        self.current_player = random.choice([player1, player2])
-        self.loser = None
-        self.draw = False
-
-        all_cells = [(r, c) for r in range(GRID_SIZE) for c in range(GRID_SIZE)]
-        self.mines: set = set(map(tuple, random.sample(all_cells, MINE_COUNT)))
-        self.revealed: set = set()
-
-        self.adjacency: dict = {}
-        for r in range(GRID_SIZE):
-            for c in range(GRID_SIZE):
-                if (r, c) not in self.mines:
-                    self.adjacency[(r, c)] = sum(
-                        1
-                        for dr in (-1, 0, 1)
-                        for dc in (-1, 0, 1)
-                        if (dr, dc) != (0, 0) and (r + dr, c + dc) in self.mines
-                    )
-
-        for r in range(GRID_SIZE):
-            for c in range(GRID_SIZE):
-                self.add_item(MinesweeperButton(r, c))
-
-    def _btn(self, row: int, col: int):
-        for item in self.children:
-            if isinstance(item, MinesweeperButton) and item.grid_row == row and item.grid_col == col:
-                return item
-        return None
+# Le module n'est importé qu'au premier Démineur : la réserve de grilles démarre alors.
+board_pool.warm((size, size, mines) for size, mines in BOARD_SIZES.items())
+metrics.gauge("board_pool", lambda: board_pool.stats)
 
-    def get_status_text(self) -> str:
-        safe_revealed = sum(1 for c in self.revealed if c not in self.mines)
-        return (
-            f"💣 **Démineur** — {safe_revealed}/{SAFE_COUNT} cases sûres révélées\n"
-            f"Tour de {self.current_player.mention}"
-        )
 
-    def _reveal_cell(self, row: int, col: int):
-        btn = self._btn(row, col)
-        if btn is None:
-            return
-        adj = self.adjacency.get((row, col), 0)
-        btn.label = str(adj) if adj > 0 else "·"
-        btn.style = discord.ButtonStyle.secondary
-        btn.disabled = True
-
-    def _freeze_grid(self, hit_mine: tuple = None):
-        """Disable everything and reveal all mines at game end."""
-        for item in self.children:
-            if not isinstance(item, MinesweeperButton):
-                continue
-            r, c = item.grid_row, item.grid_col
-            if (r, c) in self.mines:
-                item.style = discord.ButtonStyle.danger
-                item.label = "💥" if (r, c) == hit_mine else "💣"
-            elif (r, c) in self.revealed:
-                adj = self.adjacency.get((r, c), 0)
-                item.label = str(adj) if adj > 0 else "·"
-                item.style = discord.ButtonStyle.secondary
-            item.disabled = True
-
-    async def handle_click(self, interaction: discord.Interaction, row: int, col: int):
-        if interaction.user.id != self.current_player.id:
-            await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
-            return
+class MinesweeperRules:
+    """Réglages d'une partie, choisis au setup et conservés pour la revanche."""
 
-        if (row, col) in self.revealed:
-            await interaction.response.send_message("Cette case est déjà révélée !", ephemeral=True)
-            return
+    __slots__ = ("size", "cascade", "safe_first")
 
-        self.revealed.add((row, col))
-
-        if (row, col) in self.mines:
-            self.loser = self.current_player
-            self._freeze_grid(hit_mine=(row, col))
-            await interaction.response.edit_message(
-                content=(
-                    f"💣 **Démineur**\n"
-                    f"💥 **{self.current_player.mention} a déclenché une mine !**"
-                ),
-                view=self,
-            )
-            self.stop()
-            return
+    def __init__(self, size: int = GRID_SIZE, cascade: bool = False, safe_first: bool = False):
+        self.size = size
+        self.cascade = cascade  # une case à 0 découvre toute sa zone en un coup
+        self.safe_first = safe_first  # le tout premier clic ne tombe jamais sur une mine
 
-        safe_revealed = sum(1 for c in self.revealed if c not in self.mines)
-
-        if safe_revealed == SAFE_COUNT:
-            self.draw = True
-            self._freeze_grid()
-            await interaction.response.edit_message(
-                content=(
-                    f"💣 **Démineur** — {safe_revealed}/{SAFE_COUNT} cases sûres révélées\n"
-                    f"🎉 **Match nul ! Toutes les cases sûres ont été révélées.**"
-                ),
-                view=self,
-            )
-            self.stop()
-            return
+    @property
+    def mine_count(self) -> int:
+        return BOARD_SIZES[self.size]
 
-        self._reveal_cell(row, col)
-        self.current_player = (
-            self.player2 if self.current_player.id == self.player1.id else self.player1
-        )
-        await interaction.response.edit_message(
-            content=self.get_status_text(),
-            view=self,
-        )
+    def describe(self) -> str:
+        options = [name for name, on in (("cascade", self.cascade), ("1er coup sûr", self.safe_first)) if on]
+        text = f"Grille {self.size}×{self.size}, {self.mine_count} mines"
+        return f"{text} ({', '.join(options)})" if options else text
 
-    async def on_timeout(self):
-        self.stop()
 
+MOVE_TIMEOUT = 300
 
-class MinesweeperRevengeView(discord.ui.View):
-    def __init__(self, loser, winner, timeout_minutes, guild):
-        super().__init__(timeout=30)
-        self.loser = loser
-        self.winner = winner
-        self.timeout_minutes = timeout_minutes
-        self.guild = guild
-        self.revenge_requested = False
-        self.abandoned = False
-
-    @discord.ui.button(label="Revanche ! (Quitte ou double)", style=discord.ButtonStyle.danger, emoji="🔥")
-    async def revenge_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.loser.id:
-            await interaction.response.send_message("Seul le perdant peut demander une revanche !", ephemeral=True)
-            return
 
-        self.revenge_requested = True
-        doubled_timeout = min(self.timeout_minutes * 2, 10080)
+def _cell_label(board, index: int) -> str:
+    adj = board.adjacency[index]
+    return str(adj) if adj > 0 else "·"
 
-        button.disabled = True
-        await interaction.response.edit_message(view=self)
 
-        accept_view = AcceptRevengeView(self.loser, self.winner)
-        revenge_msg = await interaction.followup.send(
-            f"💀 **{self.loser.mention} demande une REVANCHE !**\n"
-            f"🔥 **Quitte ou Double** :\n"
-            f"• Si {self.loser.mention} **perd** → timeout de **{doubled_timeout} minutes** !\n"
-            f"• Si {self.loser.mention} **gagne** → il est libéré, aucune sanction !\n"
-            f"• {self.winner.mention} ne risque **RIEN** !\n\n"
-            f"{self.winner.mention}, acceptes-tu ?",
-            view=accept_view,
-        )
+class MinesweeperMatch(DuelMatch):
+    """Duel de Démineur : chaque coup est une transition de la phase ``playing``.
 
-        await accept_view.wait()
-
-        if accept_view.accepted:
-            if self.loser.id in active_duels:
-                del active_duels[self.loser.id]
-            if self.winner.id in active_duels:
-                del active_duels[self.winner.id]
-            try:
-                await revenge_msg.delete()
-            except Exception:
-                pass
-            await start_minesweeper_game(
-                interaction, self.loser, self.winner, doubled_timeout,
-                is_revenge=True, original_loser=self.loser,
-            )
-        else:
-            try:
-                await self.loser.timeout(
-                    timedelta(minutes=self.timeout_minutes),
-                    reason=f"A perdu contre {self.winner.display_name}",
-                )
-                await interaction.followup.send(
-                    f"{self.loser.mention} reste timeout pour {self.timeout_minutes} minute(s). 👋"
-                )
-            except discord.Forbidden:
-                await interaction.followup.send(f"Je ne peux pas timeout {self.loser.mention}.")
-
-    @discord.ui.button(label="Abandonner", style=discord.ButtonStyle.secondary, emoji="🏳️")
-    async def abandon_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.loser.id:
-            await interaction.response.send_message("Seul le perdant peut abandonner !", ephemeral=True)
-            return
+    Tours, mines et cascades sont gérés par
+    :class:`minesweeper_engine.MinesweeperEngine`. En 5×5 la grille est
+    faite de 25 boutons reconstruits depuis le plateau à chaque édition ;
+    au-delà elle est rendue en image et la case se choisit avec deux menus
+    puis « Révéler ».
+    """
 
-        self.abandoned = True
-        self.stop()
+    __slots__ = ("rules", "engine", "renderer", "selected")
 
-        button.disabled = True
-        await interaction.response.edit_message(view=self)
+    ACTIONS = {
+        **DuelMatch.ACTIONS,
+        "playing": {"cell", "pick_row", "pick_col", "reveal", "move_timeout"},
+    }
 
-        try:
-            await self.loser.timeout(
-                timedelta(minutes=self.timeout_minutes),
-                reason=f"A perdu contre {self.winner.display_name}",
-            )
-            await interaction.followup.send(
-                f"{self.loser.mention} accepte sa défaite. Timeout de {self.timeout_minutes} minute(s) appliqué. 👋"
-            )
-        except discord.Forbidden:
-            await interaction.followup.send(
-                f"{self.loser.mention} accepte sa défaite mais je ne peux pas le timeout."
-            )
+    EMOJI = "💣"
+    WIN_TITLE = "GAGNE !"
+    NO_ANSWER_TEXT = "{opponent} n'a pas répondu au défi, bébé cadum !"
+    NO_PERMS_TEXT = "⚠️ Je peux pas timeout {loser}. Faut me mettre les perms."
+    REASON = "A perdu au Démineur contre {winner}"
+    REVENGE_REASON = "A perdu la revanche au Démineur contre {winner}"
+
+    def __init__(self, interaction, challenger, challenged, timeout_minutes: int, reservation, rules):
+        super().__init__(interaction, challenger, challenged, timeout_minutes, reservation)
+        self.rules = rules
+        self.engine = None
+        self.renderer = None
+        self.selected = [None, None]  # [ligne, colonne] en mode image
 
+    def snapshot(self) -> dict:
+        state = super().snapshot()
+        rules = self.rules
+        state.update(
+            rules=[rules.size, rules.cascade, rules.safe_first],
+            engine=self.engine.to_state() if self.engine is not None else None,
+            selected=self.selected,
+        )
+        return state
+
+    async def load(self, state: dict, member):
+        await super().load(state, member)
+        self.rules = MinesweeperRules(*state["rules"])
+        self.engine = None
+        self.renderer = None
+        if state["engine"] is not None:
+            self.engine = MinesweeperEngine.from_state(state["engine"], new_board=board_pool.take)
+            if self.image_mode:
+                self.renderer = minesweeper_render.BoardRenderer(self.engine.board)
+        self.selected = state["selected"]
+
+    def challenge_text(self) -> str:
+        return (
+            f"💣 **DÉMINEUR CHALLENGE** 💣\n"
+            f"{self.challenger.mention} défie {self.challenged.mention} au Démineur !\n"
+            f"**Enjeu :** Le perdant se fait timeout pour **{self.timeout_minutes} minute(s)**\n"
+            f"**Format :** {self.rules.describe()}"
+        )
 
-async def start_minesweeper_game(
-    interaction, player1, player2, timeout, is_revenge=False, original_loser=None
-):
-    active_duels[player1.id] = True
-    active_duels[player2.id] = True
+    # -- affichage -------------------------------------------------------------
 
-    game_view = MinesweeperView(player1, player2)
+    @property
+    def board(self):
+        return self.engine.board
 
-    await interaction.followup.send(
-        content=game_view.get_status_text(),
-        view=game_view,
-    )
+    @property
+    def current_player(self):
+        return self.player(self.engine.current)
 
-    print(f"[DEBUG] Minesweeper started: {player1.name} vs {player2.name}")
-    await game_view.wait()
+    @property
+    def image_mode(self) -> bool:
+        return self.rules.size != GRID_SIZE
 
-    # Timeout sans résultat (partie abandonnée)
-    if game_view.loser is None and not game_view.draw:
-        await interaction.followup.send(
-            "⏰ Partie abandonnée (personne n'a joué). Aucun timeout appliqué."
+    def get_status_text(self) -> str:
+        return (
+            f"💣 **Démineur** — {self.board.safe_revealed}/{self.board.safe_count} cases sûres révélées\n"
+            f"Tour de {self.current_player.mention}"
         )
-        if player1.id in active_duels:
-            del active_duels[player1.id]
-        if player2.id in active_duels:
-            del active_duels[player2.id]
-        return
-
-    if game_view.draw:
-        await interaction.followup.send(
-            "🎉 **Match nul !** Toutes les cases sûres ont été révélées. Personne n'est timeout."
+
+    def _grid_items(self, frozen: bool = False, hit_mine: int = None):
+        board = self.board
+        if self.image_mode:
+            rows = [discord.SelectOption(label=str(i + 1), value=str(i)) for i in range(board.rows)]
+            cols = [
+                discord.SelectOption(label=minesweeper_render.column_label(i), value=str(i))
+                for i in range(board.cols)
+            ]
+            return (
+                ActionSelect("pick_row", placeholder="Ligne...", options=rows, row=0, disabled=frozen),
+                ActionSelect("pick_col", placeholder="Colonne...", options=cols, row=1, disabled=frozen),
+                ActionButton("reveal", label="Révéler", style=discord.ButtonStyle.danger,
+                             emoji="⛏️", row=2, disabled=frozen),
+            )
+
+        items = []
+        for index in range(board.rows * board.cols):
+            if frozen and board.is_mine(index):
+                label, style = ("💥" if index == hit_mine else "💣"), discord.ButtonStyle.danger
+            elif board.is_revealed(index):
+                label, style = _cell_label(board, index), discord.ButtonStyle.secondary
+            else:
+                label, style = "⬜", discord.ButtonStyle.secondary
+            items.append(ActionButton(
+                "cell", str(index), label=label, style=style,
+                row=index // board.cols, disabled=frozen or board.is_revealed(index),
+            ))
+        return items
+
+    def _board_file(self) -> discord.File:
+        return discord.File(self.renderer.render(), filename="demineur.png")
+
+    async def _edit(self, interaction, content: str, frozen: bool = False, hit_mine: int = None):
+        view = self.view(*self._grid_items(frozen, hit_mine))
+        kwargs = {"attachments": [self._board_file()]} if self.image_mode else {}
+        await interaction.response.edit_message(content=content, view=view, **kwargs)
+
+    # -- partie ------------------------------------------------------------------
+
+    async def start_game(self):
+        rules = self.rules
+        self.engine = MinesweeperEngine(
+            self.player1.id, self.player2.id, rules.size, rules.size, rules.mine_count,
+            cascade=rules.cascade, safe_first=rules.safe_first, new_board=board_pool.take,
         )
-        del active_duels[player1.id]
-        del active_duels[player2.id]
-        return
-
-    loser = game_view.loser
-    winner = player2 if loser.id == player1.id else player1
-
-    print(f"[DEBUG] Minesweeper over. Winner: {winner.name}, Loser: {loser.name}")
-
-    if not is_revenge:
-        revenge_view = MinesweeperRevengeView(loser, winner, timeout, interaction.guild)
-        await interaction.followup.send(
-            f"💣 **{winner.mention} GAGNE !** 💣\n\n"
-            f"💀 {loser.mention} va être timeout pour **{timeout} minute(s)** !\n"
-            f"Dernière chance... 🔥",
-            view=revenge_view,
+        self.renderer = minesweeper_render.BoardRenderer(self.engine.board) if self.image_mode else None
+        self.selected = [None, None]
+        self.enter("playing", MOVE_TIMEOUT, "move_timeout")
+
+        kwargs = {"file": self._board_file()} if self.image_mode else {}
+        self.message = await self.send(
+            self.get_status_text(), CRITICAL, view=self.view(*self._grid_items()), **kwargs
         )
+        log.debug("minesweeper board sent", extra={"game_id": self.game_id, "image_mode": self.image_mode})
 
-        await revenge_view.wait()
-
-        if not revenge_view.revenge_requested:
-            try:
-                await loser.timeout(
-                    timedelta(minutes=timeout),
-                    reason=f"A perdu au Démineur contre {winner.display_name}",
-                )
-                await interaction.followup.send(f"C'est ciao {loser.mention} ! 👋")
-                print(f"[DEBUG] {loser.name} timed out (no revenge)")
-            except discord.Forbidden:
-                await interaction.followup.send(
-                    f"⚠️ Je peux pas timeout {loser.mention}. Faut me mettre les perms."
-                )
-    else:
-        if winner.id == original_loser.id:
-            await interaction.followup.send(
-                f"💣 **{winner.mention} GAGNE LA REVANCHE !** 💣\n\n"
-                f"🎉 {winner.mention} s'est racheté ! Personne n'est timeout !\n"
-                f"Respect ! 💪"
-            )
-            print(f"[DEBUG] {winner.name} won minesweeper revenge - no timeout")
-        else:
-            try:
-                await loser.timeout(
-                    timedelta(minutes=timeout),
-                    reason=f"A perdu la revanche au Démineur contre {winner.display_name}",
-                )
-                await interaction.followup.send(
-                    f"💣 **{winner.mention} GAGNE LA REVANCHE !** 💣\n\n"
-                    f"💀 {loser.mention} a été timeout pour **{timeout} minute(s)** !\n"
-                    f"Pas de seconde chance cette fois ! 👋"
-                )
-                print(f"[DEBUG] {loser.name} timed out (revenge lost)")
-            except discord.Forbidden:
-                await interaction.followup.send(
-                    f"💣 **{winner.mention} GAGNE LA REVANCHE !** 💣\n\n"
-                    f"⚠️ Je peux pas timeout {loser.mention}. Faut me mettre les perms."
-                )
-
-    if player1.id in active_duels:
-        del active_duels[player1.id]
-    if player2.id in active_duels:
-        del active_duels[player2.id]
-    print("[DEBUG] Minesweeper cleaned up")
-
-
-async def start_minesweeper_challenge(interaction, challenger, opponent, timeout_minutes):
-    if challenger.id in active_duels or opponent.id in active_duels:
-        await interaction.followup.send("L'un de vous est déjà en duel !", ephemeral=True)
-        return
-
-    active_duels[challenger.id] = True
-    active_duels[opponent.id] = True
-
-    view = DuelView(challenger, opponent, timeout_minutes)
-    await interaction.followup.send(
-        f"💣 **DÉMINEUR CHALLENGE** 💣\n"
-        f"{challenger.mention} défie {opponent.mention} au Démineur !\n"
-        f"**Enjeu :** Le perdant se fait timeout pour **{timeout_minutes} minute(s)**\n"
-        f"**Format :** Grille 5×5, 5 mines",
-        view=view,
-    )
+    async def _check_turn(self, interaction) -> bool:
+        if interaction.user.id != self.engine.current:
+            await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
+            return False
+        return True
 
-    await view.wait()
+    async def on_cell(self, interaction, arg):
+        await self.play(interaction, int(arg))
 
-    if view.refused:
-        del active_duels[challenger.id]
-        del active_duels[opponent.id]
-        return
+    async def on_pick_row(self, interaction, arg):
+        if await self._check_turn(interaction):
+            self.selected[0] = int(arg)
+            await interaction.response.defer()
 
-    if view.cancelled:
-        del active_duels[challenger.id]
-        del active_duels[opponent.id]
-        return
+    async def on_pick_col(self, interaction, arg):
+        if await self._check_turn(interaction):
+            self.selected[1] = int(arg)
+            await interaction.response.defer()
 
-    if not view.accepted:
-        await interaction.followup.send(f"{opponent.mention} n'a pas répondu au défi, bébé cadum !")
-        del active_duels[challenger.id]
-        del active_duels[opponent.id]
-        return
+    async def on_reveal(self, interaction, arg):
+        if not await self._check_turn(interaction):
+            return
+        row, col = self.selected
+        if row is None or col is None:
+            await interaction.response.send_message("Choisis une ligne et une colonne !", ephemeral=True)
+            return
+        self.selected = [None, None]
+        await self.play(interaction, self.board.index(row, col))
 
-    await start_minesweeper_game(interaction, challenger, opponent, timeout_minutes)
+    async def play(self, interaction, index: int):
+        engine = self.engine
+        result = engine.play(interaction.user.id, index)
+        if result == NOT_YOUR_TURN:
+            await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
+            return
+        if result == ALREADY_REVEALED:
+            await interaction.response.send_message("Cette case est déjà révélée !", ephemeral=True)
+            return
 
+        board = engine.board
+        renderer = self.renderer
+        if renderer is not None and renderer.board is not board:
+            renderer.board = board  # grille échangée par le premier coup sûr
+
+        if result == MINE:
+            loser = self.current_player
+            winner = self.player(engine.opponent)
+            self.enter("ending")
+            if renderer is not None:
+                renderer.mark_mines(hit_mine=index)
+            await self._edit(
+                interaction,
+                f"💣 **Démineur**\n"
+                f"💥 **{loser.mention} a déclenché une mine !**",
+                frozen=True, hit_mine=index,
+            )
+            await self.conclude(winner, loser)
+            return
+
+        if renderer is not None:
+            for i in iter_bits(engine.last_revealed):
+                renderer.mark_dirty(i)
+
+        if result == CLEARED:
+            self.finish()
+            if renderer is not None:
+                renderer.mark_mines()
+            await self._edit(
+                interaction,
+                f"💣 **Démineur** — {board.safe_revealed}/{board.safe_count} cases sûres révélées\n"
+                f"🎉 **Match nul ! Toutes les cases sûres ont été révélées.**",
+                frozen=True,
+            )
+            await self.send("🎉 **Match nul !** Toutes les cases sûres ont été révélées. Personne n'est timeout.")
+            return
+
+        self.enter("playing", MOVE_TIMEOUT, "move_timeout")
+        content = self.get_status_text()
+        revealed_count = engine.last_revealed.bit_count()
+        if revealed_count > 1:
+            content += f"\n🌊 Cascade : **{revealed_count}** cases découvertes d'un coup !"
+        await self._edit(interaction, content)
 
-class MinesweeperTimeoutModal(discord.ui.Modal, title="💣 Durée du timeout"):
+    async def on_move_timeout(self, interaction, arg):
+        self.finish()
+        await self.send("⏰ Partie abandonnée (personne n'a joué). Aucun timeout appliqué.")
+
+
+class MinesweeperTimeoutModal(GuardedModal, title="💣 Durée du timeout"):
     timeout_input = discord.ui.TextInput(
         label="Durée du timeout (en minutes)",
         placeholder="Ex: 5, 10, 60...  (max 10080 = 1 semaine)",
@@ -369,11 +291,12 @@ class MinesweeperTimeoutModal(discord.ui.Modal, title="💣 Durée du timeout"):
         max_length=5,
     )
 
-    def __init__(self, organizer, opponent, setup_message):
-        super().__init__()
+    def __init__(self, organizer, opponent, setup_message, rules):
+        super().__init__(timeout=RESERVATION_TTL)
         self.organizer = organizer
         self.opponent = opponent
         self.setup_message = setup_message
+        self.rules = rules
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
@@ -390,19 +313,52 @@ class MinesweeperTimeoutModal(discord.ui.Modal, title="💣 Durée du timeout"):
             )
             return
 
+        # Verrou posé à la validation, pas à l'ouverture du modal.
+        reservation = duel_locks.reserve(interaction.guild_id, (self.organizer.id, self.opponent.id))
+        if reservation is None:
+            await interaction.response.send_message("L'un de vous est déjà en duel !", ephemeral=True)
+            return
+
         await interaction.response.defer()
         try:
             await self.setup_message.edit(content="💣 **Démineur en cours...**", view=None)
         except Exception:
             pass
-        await start_minesweeper_challenge(interaction, self.organizer, self.opponent, timeout_minutes)
+        match = MinesweeperMatch(
+            interaction, self.organizer, self.opponent, timeout_minutes, reservation, self.rules
+        )
+        await match.open()
 
 
-class MinesweeperSetupView(discord.ui.View):
+class MinesweeperSizeSelect(discord.ui.Select):
+    def __init__(self):
+        options = [
+            discord.SelectOption(
+                label=f"{size}×{size} — {mines} mines", value=str(size), default=size == GRID_SIZE
+            )
+            for size, mines in BOARD_SIZES.items()
+        ]
+        super().__init__(placeholder="Taille de la grille...", options=options, row=1)
+
+    async def callback(self, interaction: discord.Interaction):
+        if interaction.user.id != self.view.organizer.id:
+            await interaction.response.send_message("C'est pas ton duel !", ephemeral=True)
+            return
+        self.view.rules.size = int(self.values[0])
+        for option in self.options:
+            option.default = option.value == self.values[0]
+        await interaction.response.defer()
+
+
+class MinesweeperSetupView(GuardedView):
     def __init__(self, organizer):
         super().__init__(timeout=60)
         self.organizer = organizer
         self.opponent = None
+        self.rules = MinesweeperRules()
+        # Les grandes grilles sont rendues en image : proposées seulement si Pillow est là.
+        if minesweeper_render.available():
+            self.add_item(MinesweeperSizeSelect())
 
     @discord.ui.select(
         cls=discord.ui.UserSelect,
@@ -418,7 +374,32 @@ class MinesweeperSetupView(discord.ui.View):
         self.opponent = select.values[0]
         await interaction.response.defer()
 
-    @discord.ui.button(label="Lancer le Démineur 💣", style=discord.ButtonStyle.success, row=1)
+    @discord.ui.button(label="Cascade : non", style=discord.ButtonStyle.secondary, emoji="🌊", row=2)
+    async def cascade_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.organizer.id:
+            await interaction.response.send_message("C'est pas ton duel !", ephemeral=True)
+            return
+        self.rules.cascade = not self.rules.cascade
+        button.label = "Cascade : oui" if self.rules.cascade else "Cascade : non"
+        button.style = discord.ButtonStyle.primary if self.rules.cascade else discord.ButtonStyle.secondary
+        if self.opponent is not None:
+            # L'édition du message vide les menus : on réaffiche l'adversaire choisi.
+            self.select_opponent.default_values = [self.opponent]
+        await interaction.response.edit_message(view=self)
+
+    @discord.ui.button(label="1er coup sûr : non", style=discord.ButtonStyle.secondary, emoji="🛡️", row=2)
+    async def safe_first_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.organizer.id:
+            await interaction.response.send_message("C'est pas ton duel !", ephemeral=True)
+            return
+        self.rules.safe_first = not self.rules.safe_first
+        button.label = "1er coup sûr : oui" if self.rules.safe_first else "1er coup sûr : non"
+        button.style = discord.ButtonStyle.primary if self.rules.safe_first else discord.ButtonStyle.secondary
+        if self.opponent is not None:
+            self.select_opponent.default_values = [self.opponent]
+        await interaction.response.edit_message(view=self)
+
+    @discord.ui.button(label="Lancer le Démineur 💣", style=discord.ButtonStyle.success, row=2)
     async def start_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user.id != self.organizer.id:
             await interaction.response.send_message("C'est pas ton duel !", ephemeral=True)
@@ -436,7 +417,11 @@ class MinesweeperSetupView(discord.ui.View):
             await interaction.response.send_message("C'est un bot hein...", ephemeral=True)
             return
 
+        if any(duel_locks.is_locked(interaction.guild_id, uid) for uid in (self.organizer.id, self.opponent.id)):
+            await interaction.response.send_message("L'un de vous est déjà en duel !", ephemeral=True)
+            return
+
         self.stop()
         await interaction.response.send_modal(
-            MinesweeperTimeoutModal(self.organizer, self.opponent, interaction.message)
+            MinesweeperTimeoutModal(self.organizer, self.opponent, interaction.message, self.rules)
         )
@@ -0,0 +1,80 @@
+import asyncio
+from collections import deque
+
+from minesweeper_board import MinesweeperBoard
+
+POOL_SIZE = 16  # grilles d'avance par configuration
+REFILL_BATCH = 4  # grilles générées entre deux rendus de main à la boucle
+
+
+class BoardPool:
+    """Réserve de grilles pré-générées (mines, voisinages, zones de zéros).
+
+    :meth:`take` sert une grille en O(1) hors du chemin de l'interaction ; la
+    réserve est complétée en tâche de fond par petits lots. Pour le mode
+    « premier coup sûr », on sert la première grille de la file dont la case
+    demandée n'est pas minée : avec une densité de mines d, il faut en
+    moyenne 1 / (1 - d) essais, soit moins de 2 pour toutes nos grilles.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self._pools: dict[tuple, deque] = {}
+        self._refill_task = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def warm(self, configs):
+        """Déclare des configurations ``(rows, cols, mine_count)`` à garder en réserve."""
+        for config in configs:
+            self._pools.setdefault(tuple(config), deque())
+        self._schedule_refill()
+
+    def take(self, rows: int, cols: int, mine_count: int, safe_cell: int = None) -> MinesweeperBoard:
+        key = (rows, cols, mine_count)
+        pool = self._pools.setdefault(key, deque())
+        board = None
+        if safe_cell is None:
+            if pool:
+                board = pool.popleft()
+        else:
+            for _ in range(len(pool)):
+                candidate = pool.popleft()
+                if not candidate.is_mine(safe_cell):
+                    board = candidate
+                    break
+                pool.append(candidate)
+
+        if board is None:
+            self.stats["misses"] += 1
+            board = MinesweeperBoard(rows, cols, mine_count, safe_cell=safe_cell)
+        else:
+            self.stats["hits"] += 1
+        self._schedule_refill()
+        return board
+
+    def _schedule_refill(self):
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # hors boucle (scripts) : la réserve se remplira plus tard
+            return
+        self._refill_task = loop.create_task(self._refill())
+
+    async def _refill(self):
+        while True:
+            missing = [
+                (key, pool) for key, pool in self._pools.items() if len(pool) < self.pool_size
+            ]
+            if not missing:
+                return
+            for (rows, cols, mine_count), pool in missing:
+                for _ in range(min(REFILL_BATCH, self.pool_size - len(pool))):
+                    pool.append(MinesweeperBoard(rows, cols, mine_count))
+                await asyncio.sleep(0)
+
+    def __len__(self):
+        return sum(len(pool) for pool in self._pools.values())
+
+
+board_pool = BoardPool()
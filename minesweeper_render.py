@@ -0,0 +1,120 @@
+import io
+from functools import lru_cache
+
+from minesweeper_board import iter_bits
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow est optionnel : sans lui, seul le 5×5 à boutons est proposé
+    Image = ImageDraw = ImageFont = None
+
+TILE_SIZE = 32
+BACKGROUND = (47, 49, 54)
+LABEL_COLOR = (220, 221, 222)
+NUMBER_COLORS = {
+    1: (25, 118, 210), 2: (56, 142, 60), 3: (211, 47, 47), 4: (123, 31, 162),
+    5: (255, 143, 0), 6: (0, 151, 167), 7: (66, 66, 66), 8: (158, 158, 158),
+}
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def column_label(col: int) -> str:
+    return chr(ord("A") + col)
+
+
+@lru_cache(maxsize=None)
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=None)
+def _sprite(key, size: int):
+    """Une tuile, dessinée une seule fois par (type, taille) puis réutilisée.
+
+    ``key`` vaut "hidden", "mine", "boom" ou le nombre de mines voisines.
+    """
+    tile = Image.new("RGB", (size, size), BACKGROUND)
+    draw = ImageDraw.Draw(tile)
+    inner = (1, 1, size - 2, size - 2)
+    if key == "hidden":
+        draw.rectangle(inner, fill=(114, 137, 218))
+        draw.line((1, 1, size - 2, 1), fill=(160, 178, 236))
+        draw.line((1, 1, 1, size - 2), fill=(160, 178, 236))
+    elif key in ("mine", "boom"):
+        draw.rectangle(inner, fill=(240, 71, 71) if key == "boom" else (185, 187, 190))
+        pad = size // 4
+        draw.ellipse((pad, pad, size - pad - 1, size - pad - 1), fill=(20, 20, 20))
+    else:
+        draw.rectangle(inner, fill=(220, 221, 222))
+        if key:
+            draw.text(
+                (size / 2, size / 2), str(key),
+                fill=NUMBER_COLORS[key], font=_font(size * 2 // 3), anchor="mm",
+            )
+    return tile
+
+
+class BoardRenderer:
+    """Rendu PNG d'un :class:`~minesweeper_board.MinesweeperBoard`.
+
+    Le canevas est conservé entre deux coups : seules les tuiles marquées
+    sales sont recollées avant l'encodage.
+    """
+
+    def __init__(self, board, tile_size: int = TILE_SIZE):
+        if not available():
+            raise RuntimeError("Pillow est requis pour les grandes grilles de Démineur")
+        self.board = board
+        self.tile_size = tile_size
+        self.hit_mine = None
+        self.show_mines = False
+
+        self._canvas = Image.new(
+            "RGB", ((board.cols + 1) * tile_size, (board.rows + 1) * tile_size), BACKGROUND
+        )
+        draw = ImageDraw.Draw(self._canvas)
+        font = _font(tile_size // 2)
+        half = tile_size / 2
+        for c in range(board.cols):
+            draw.text(((c + 1) * tile_size + half, half), column_label(c),
+                      fill=LABEL_COLOR, font=font, anchor="mm")
+        for r in range(board.rows):
+            draw.text((half, (r + 1) * tile_size + half), str(r + 1),
+                      fill=LABEL_COLOR, font=font, anchor="mm")
+        self._dirty = set(range(board.rows * board.cols))
+
+    def mark_dirty(self, index: int):
+        self._dirty.add(index)
+
+    def mark_mines(self, hit_mine: int = None):
+        """Fin de partie : toutes les mines deviennent visibles."""
+        self.show_mines = True
+        self.hit_mine = hit_mine
+        self._dirty.update(iter_bits(self.board.mines))
+
+    def _key(self, index: int):
+        board = self.board
+        if board.is_mine(index) and (self.show_mines or board.is_revealed(index)):
+            return "boom" if index == self.hit_mine else "mine"
+        if board.is_revealed(index):
+            return board.adjacency[index]
+        return "hidden"
+
+    def render(self) -> io.BytesIO:
+        size = self.tile_size
+        cols = self.board.cols
+        for index in self._dirty:
+            r, c = divmod(index, cols)
+            self._canvas.paste(_sprite(self._key(index), size), ((c + 1) * size, (r + 1) * size))
+        self._dirty.clear()
+
+        buffer = io.BytesIO()
+        self._canvas.save(buffer, "PNG", compress_level=1)
+        buffer.seek(0)
+        return buffer
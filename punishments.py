@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import logging
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import discord
+
+from state import DB_PATH
+from member_cache import member_cache
+from rest_scheduler import CRITICAL, outbound
+
+log = logging.getLogger(__name__)
+
+WORKERS = 4
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0  # secondes, doublé à chaque nouvel essai
+LEDGER_RETENTION = 30 * 24 * 60 * 60  # les sanctions terminées sont gardées 30 jours
+
+# Issues d'une sanction, aussi statuts du registre
+APPLIED = "applied"
+FORBIDDEN = "forbidden"  # permissions manquantes
+FAILED = "failed"  # autre erreur Discord, ou essais épuisés
+
+
+class _Punishment:
+    __slots__ = ("row_id", "duplicates", "member", "until", "reason", "future", "decided_at")
+
+    def __init__(self, row_id, member, until, reason, future, decided_at):
+        self.row_id = row_id
+        self.duplicates = []  # lignes du registre fusionnées dans celle-ci : même issue
+        self.member = member
+        self.until = until  # timestamp UNIX de fin du timeout
+        self.reason = reason
+        self.future = future
+        self.decided_at = decided_at
+
+
+class PunishmentExecutor:
+    """Seul point d'application des timeouts.
+
+    Chaque sanction est d'abord écrite dans un registre SQLite (statut
+    ``pending``), puis appliquée par un petit pool de workers via le
+    scheduler REST, avec nouvel essai et backoff exponentiel sur 429 et 5xx.
+    Une sanction déjà en attente pour le même membre n'est pas dupliquée :
+    on garde la fin la plus tardive et les appelants partagent le résultat.
+    Si la fin recule pendant l'appel en cours, elle est réappliquée avant
+    que la sanction ne soit marquée ``applied``.
+    Au démarrage, :meth:`resume` réapplique les sanctions restées
+    ``pending`` (process tué entre la décision et l'appel), avec la même
+    heure de fin.
+    """
+
+    def __init__(self, path: str = DB_PATH, workers: int = WORKERS):
+        self.workers = workers
+        self.stats = Counter()
+        self.latency = [0, 0.0, 0.0]  # nombre, total, max (s) entre décision et timeout appliqué
+        self._queue = None
+        self._tasks = []
+        self._inflight = {}  # (guild_id, user_id) -> _Punishment
+
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS punishments ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " guild_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " until REAL NOT NULL,"
+            " reason TEXT NOT NULL,"
+            " status TEXT NOT NULL,"  # pending, applied, forbidden, failed, expired
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " applied_at REAL)"
+        )
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        loop = asyncio.get_running_loop()
+        while len(self._tasks) < self.workers:
+            self._tasks.append(loop.create_task(self._worker()))
+
+    def punish(self, member, minutes: int, reason: str) -> asyncio.Future:
+        """Planifie un timeout ; le futur renvoie son issue (:data:`APPLIED`, :data:`FORBIDDEN`, :data:`FAILED`)."""
+        return self._submit(member, time.time() + minutes * 60, reason)
+
+    def _submit(self, member, until: float, reason: str, row_id: int = None) -> asyncio.Future:
+        self._start()
+        key = (member.guild.id, member.id)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["deduplicated"] += 1
+            if until > pending.until:
+                pending.until = until
+                self._db.execute("UPDATE punishments SET until = ? WHERE id = ?", (until, pending.row_id))
+            if row_id is not None and row_id != pending.row_id:
+                pending.duplicates.append(row_id)  # couvert par la sanction en cours, statut fixé à son issue
+            return pending.future
+
+        if row_id is None:
+            row_id = self._db.execute(
+                "INSERT INTO punishments (guild_id, user_id, until, reason, status, created_at)"
+                " VALUES (?, ?, ?, ?, 'pending', ?)",
+                (member.guild.id, member.id, until, reason, time.time()),
+            ).lastrowid
+        job = _Punishment(row_id, member, until, reason, asyncio.get_running_loop().create_future(), time.monotonic())
+        self._inflight[key] = job
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        return job.future
+
+    def _set_status(self, row_id: int, status: str, attempts: int = None):
+        self._db.execute(
+            "UPDATE punishments SET status = ?, attempts = COALESCE(?, attempts),"
+            " applied_at = CASE WHEN ? = 'applied' THEN ? ELSE applied_at END WHERE id = ?",
+            (status, attempts, status, time.time(), row_id),
+        )
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                outcome = await self._apply(job)
+            except Exception:  # le worker ne doit jamais mourir
+                log.exception("punishment worker error", extra={"row_id": job.row_id})
+                outcome = FAILED
+            self._inflight.pop((job.member.guild.id, job.member.id), None)
+            if not job.future.done():
+                job.future.set_result(outcome)
+
+    def _settle(self, job: _Punishment, status: str, attempts: int):
+        for row_id in (job.row_id, *job.duplicates):
+            self._set_status(row_id, status, attempts)
+
+    async def _apply(self, job: _Punishment) -> str:
+        member = job.member
+        attempt = failures = 0
+        while True:
+            attempt += 1
+            target = job.until
+            until = datetime.fromtimestamp(target, tz=timezone.utc)
+            try:
+                await outbound.submit(
+                    ("guild", member.guild.id), functools.partial(member.timeout, until, reason=job.reason), CRITICAL
+                )
+            except discord.Forbidden:
+                self._settle(job, FORBIDDEN, attempt)
+                self.stats["forbidden"] += 1
+                log.info("timeout forbidden", extra={"user_id": member.id, "guild_id": member.guild.id})
+                return FORBIDDEN
+            except discord.HTTPException as e:
+                failures += 1
+                if (e.status == 429 or e.status >= 500) and failures < MAX_ATTEMPTS:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (failures - 1))
+                    continue
+                self._settle(job, FAILED, attempt)
+                self.stats["failed"] += 1
+                log.warning(
+                    "timeout failed", extra={"user_id": member.id, "status": e.status, "attempts": attempt}
+                )
+                return FAILED
+
+            if job.until > target:
+                # Sanction fusionnée plus longue arrivée pendant l'appel : Discord a l'ancienne fin.
+                self.stats["extended"] += 1
+                continue
+            self._settle(job, APPLIED, attempt)
+            self.stats["applied"] += 1
+            elapsed = time.monotonic() - job.decided_at
+            self.latency[0] += 1
+            self.latency[1] += elapsed
+            self.latency[2] = max(self.latency[2], elapsed)
+            minutes = max(0, round((job.until - time.time()) / 60))
+            log.info(
+                "timeout applied",
+                extra={"user_id": member.id, "minutes": minutes, "attempts": attempt, "latency": round(elapsed, 3)},
+            )
+            return APPLIED
+
+    async def resume(self, client) -> int:
+        """Réapplique les sanctions interrompues par un redémarrage ; renvoie leur nombre."""
+        now = time.time()
+        self._db.execute("UPDATE punishments SET status = 'expired' WHERE status = 'pending' AND until <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM punishments WHERE status != 'pending' AND created_at < ?", (now - LEDGER_RETENTION,)
+        )
+        rows = self._db.execute(
+            "SELECT id, guild_id, user_id, until, reason FROM punishments WHERE status = 'pending'"
+        ).fetchall()
+        for row_id, guild_id, user_id, until, reason in rows:
+            guild = client.get_guild(guild_id)
+            try:
+                if guild is None:
+                    raise LookupError(f"guild {guild_id} not available")
+                member = await member_cache.resolve(guild, user_id)
+            except (LookupError, discord.HTTPException) as e:  # serveur quitté, membre parti
+                log.warning("cannot resume punishment", extra={"row_id": row_id, "error": repr(e)})
+                self._set_status(row_id, FAILED)
+                continue
+            self._submit(member, until, reason, row_id=row_id)
+        if rows:
+            log.info("pending punishments resumed", extra={"count": len(rows)})
+        return len(rows)
+
+    def metrics(self) -> dict:
+        count, total, worst = self.latency
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "inflight": len(self._inflight),
+            **self.stats,
+            "latency": {"count": count, "avg": total / count if count else 0.0, "max": worst},
+        }
+
+
+punishments = PunishmentExecutor()
+
+
+async def punish(member, minutes: int, reason: str) -> str:
+    """Timeout ``member`` ; renvoie :data:`APPLIED`, :data:`FORBIDDEN` ou :data:`FAILED`."""
+    return await punishments.punish(member, minutes, reason)
@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+
+from telemetry import metrics
+
+# Priorités : plus petit = plus urgent
+CRITICAL = 0  # état de jeu (plateau, verdict) et timeouts
+NORMAL = 1  # messages de déroulement (défi, revanche...)
+COSMETIC = 2  # ambiance, nettoyage
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "key", "action", "kwargs", "future", "queued_at")
+
+    def __init__(self, priority, seq, key, action, kwargs, future):
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.action = action
+        self.kwargs = kwargs
+        self.future = future
+        self.queued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler:
+    """File d'attente des appels REST sortants, par salon (ou serveur pour les timeouts).
+
+    Un seul appel à la fois par bucket : une rafale de messages d'un salon
+    n'entre pas en concurrence avec elle-même pour le même rate limit, et
+    discord.py gère les 429 de cet appel sans que les suivants ne s'empilent
+    derrière. À chaque tour, la tâche la plus prioritaire passe d'abord.
+
+    Deux éditions du même message en attente (même ``key``) sont fusionnées :
+    leurs arguments sont combinés, un seul appel part, et tous les
+    appelants reçoivent son résultat.
+    """
+
+    def __init__(self):
+        self._queues = {}  # bucket -> tas de _Job
+        self._pending = {}  # key -> _Job pas encore parti
+        self._workers = {}  # bucket -> tâche
+        self._seq = itertools.count()
+        self.stats = Counter()
+        self.waits = {p: [0, 0.0, 0.0] for p in (CRITICAL, NORMAL, COSMETIC)}  # nombre, total, max (s)
+
+    def submit(self, bucket, action, priority: int = NORMAL, key=None, **kwargs) -> asyncio.Future:
+        """Planifie ``action(**kwargs)`` ; le futur renvoyé donne son résultat."""
+        self.stats["submitted"] += 1
+        if key is not None:
+            job = self._pending.get(key)
+            if job is not None:
+                job.kwargs.update(kwargs)
+                self.stats["coalesced"] += 1
+                return job.future
+
+        loop = asyncio.get_running_loop()
+        job = _Job(priority, next(self._seq), key, action, kwargs, loop.create_future())
+        heapq.heappush(self._queues.setdefault(bucket, []), job)
+        if key is not None:
+            self._pending[key] = job
+        if bucket not in self._workers:
+            self._workers[bucket] = loop.create_task(self._run(bucket))
+        return job.future
+
+    async def _run(self, bucket):
+        queue = self._queues[bucket]
+        job = None
+        try:
+            while queue:
+                job = heapq.heappop(queue)
+                if job.key is not None:
+                    self._pending.pop(job.key, None)
+                if job.future.done():  # appelant annulé entre-temps : rien à envoyer
+                    self.stats["dropped"] += 1
+                    continue
+
+                waited = time.monotonic() - job.queued_at
+                wait = self.waits[job.priority]
+                wait[0] += 1
+                wait[1] += waited
+                wait[2] = max(wait[2], waited)
+
+                started = time.monotonic()
+                try:
+                    result = await job.action(**job.kwargs)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                metrics.observe("rest_seconds", time.monotonic() - started, action=_action_name(job.action))
+        finally:
+            # Sortie normale (file vide) ou worker annulé à l'arrêt : dans les deux cas le
+            # bucket est libéré, et le prochain submit relance un worker.
+            for left in ([job] if job is not None else []) + queue:
+                if left.key is not None and self._pending.get(left.key) is left:
+                    del self._pending[left.key]
+                left.future.cancel()
+            del self._queues[bucket]
+            del self._workers[bucket]
+
+    def depth(self) -> dict:
+        """Nombre d'appels en attente par bucket."""
+        return {bucket: len(queue) for bucket, queue in self._queues.items()}
+
+    def metrics(self) -> dict:
+        names = {CRITICAL: "critical", NORMAL: "normal", COSMETIC: "cosmetic"}
+        return {
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "busy_buckets": len(self._workers),
+            **self.stats,
+            **{
+                f"wait_{names[p]}": {"count": n, "avg": total / n if n else 0.0, "max": worst}
+                for p, (n, total, worst) in self.waits.items()
+            },
+        }
+
+
+def _action_name(action) -> str:
+    """``edit``, ``send``, ``timeout``... : label des métriques de latence REST."""
+    action = getattr(action, "func", action)  # functools.partial
+    return getattr(action, "__name__", type(action).__name__)
+
+
+outbound = OutboundScheduler()
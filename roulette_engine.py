@@ -0,0 +1,72 @@
+import random
+
+CHAMBERS = 6
+
+
+class RouletteEngine:
+    """Roulette russe sans dépendance à discord : un barillet, une balle, des identifiants de joueurs.
+
+    Le joueur courant tire sur lui-même ou vise quelqu'un. Chaque tir a une
+    chance sur le nombre de chambres restantes de partir ; la dernière
+    chambre tue à coup sûr. Survivre à son propre tir garde la main ;
+    rater sa cible la lui donne.
+    """
+
+    __slots__ = ("players", "chambers", "current", "target", "shots_fired", "victim", "rng")
+
+    def __init__(self, players, rng=random, first=None, chambers: int = CHAMBERS):
+        if len(players) < 2:
+            raise ValueError("il faut au moins 2 joueurs")
+        self.players = tuple(players)
+        self.chambers = chambers
+        self.rng = rng
+        self.current = rng.choice(self.players) if first is None else first
+        self.target = None  # None : le joueur courant se tire dessus
+        self.shots_fired = 0
+        self.victim = None
+
+    @property
+    def remaining(self) -> int:
+        """Chambres pas encore tirées : la probabilité du prochain tir est ``1 / remaining``."""
+        return self.chambers - self.shots_fired
+
+    @property
+    def over(self) -> bool:
+        return self.victim is not None
+
+    def aim(self, target=None):
+        """Choisit la cible du prochain tir (``None`` : soi-même)."""
+        if target is not None and (target == self.current or target not in self.players):
+            raise ValueError(f"cible invalide : {target!r}")
+        self.target = target
+
+    def fire(self):
+        """Tire ; renvoie l'identifiant du mort, ou ``None`` si la chambre était vide."""
+        hit = self.rng.randrange(self.remaining) == 0
+        self.shots_fired += 1
+        target = self.target
+        self.target = None
+        if hit:
+            self.victim = self.current if target is None else target
+            return self.victim
+        if target is not None:
+            self.current = target
+        return None
+
+    def to_state(self) -> dict:
+        return {
+            "players": list(self.players),
+            "chambers": self.chambers,
+            "current": self.current,
+            "target": self.target,
+            "shots_fired": self.shots_fired,
+            "victim": self.victim,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, rng=random) -> "RouletteEngine":
+        engine = cls(state["players"], rng, first=state["current"], chambers=state.get("chambers", CHAMBERS))
+        engine.target = state["target"]
+        engine.shots_fired = state["shots_fired"]
+        engine.victim = state["victim"]
+        return engine
@@ -1,20 +1,142 @@
+import logging
+
 import discord
-import asyncio
-import random
-from datetime import timedelta
-from state import active_duels
+from state import duel_locks, RESERVATION_TTL
+from game_flow import GameMachine, ActionButton, ActionSelect
+from punishments import FAILED, FORBIDDEN, punish
+from rest_scheduler import CRITICAL
+from ack_guard import GuardedModal, GuardedView
+from roulette_engine import CHAMBERS, RouletteEngine
 
+log = logging.getLogger(__name__)
 
-class RouletteJoinView(discord.ui.View):
-    def __init__(self, organizer, invited_players):
-        super().__init__(timeout=60)
+
+JOIN_TIMEOUT = 60
+INTRO_DELAY = 3
+TURN_TIMEOUT = 60
+SUSPENSE_DELAY = 1.5
+
+
+def _cylinder_display(shots_fired: int) -> str:
+    """💨 = chambre vide (déjà tirée), 🔘 = chambre restante."""
+    return "💨" * shots_fired + "🔘" * (CHAMBERS - shots_fired)
+
+
+HISTORY_LINES = 5
+
+
+class RouletteBoard:
+    """Contenu du message unique de la partie : en-tête, barillet, historique, action en cours."""
+
+    def __init__(self, players, timeout_minutes):
+        self.header = (
+            f"🔫 **ROULETTE RUSSE** 🔫\n"
+            f"**Joueurs :** {' | '.join(p.mention for p in players)}\n"
+            f"**Timeout du perdant :** {timeout_minutes} minute(s)"
+        )
+        self.history = []
+
+    def log(self, line: str):
+        self.history.append(line)
+
+    def render(self, shots_fired: int, body: str) -> str:
+        parts = [self.header, f"**Barillet :** {_cylinder_display(shots_fired)}"]
+        if self.history:
+            parts.append("\n".join(self.history[-HISTORY_LINES:]))
+        parts.append(body)
+        return "\n\n".join(parts)
+
+
+def _death_text(victim, timeout_minutes) -> str:
+    return (
+        f"💥 **BANG !!** 💥\n\n"
+        f"💀 {victim.mention} a pris la balle !\n"
+        f"Timeout de **{timeout_minutes} minute(s)**... RIP 👋"
+    )
+
+
+class RouletteMatch(GameMachine):
+    """Roulette russe : inscriptions → intro → tours (choix puis suspense) → mort.
+
+    Chaque étape est une phase ; les délais (intro, suspense, joueur qui ne
+    joue pas) sont des timers de la machine, pas des ``sleep`` dans une
+    coroutine qui tiendrait toute la partie.
+    """
+
+    __slots__ = ("organizer", "invited_ids", "joined", "timeout_minutes", "engine", "board")
+
+    ACTIONS = {
+        "joining": {"join", "cancel_join", "join_timeout"},
+        "intro": {"first_turn"},
+        "turn": {"shoot_self", "shoot_other", "turn_timeout"},
+        "suspense": {"resolve_shot"},
+    }
+
+    def __init__(self, interaction, organizer, invited_players, timeout_minutes: int, reservation):
+        super().__init__(interaction, reservation)
         self.organizer = organizer
         self.invited_ids = {p.id for p in invited_players}
         self.joined = {organizer.id: organizer}
-        self.cancelled = False
+        self.timeout_minutes = timeout_minutes
+        self.engine = None  # règles du tir : roulette_engine.RouletteEngine, sur les ids des joueurs
+        self.board = None
+
+    def snapshot(self) -> dict:
+        state = super().snapshot()
+        state.update(
+            organizer=self.organizer.id,
+            invited_ids=sorted(self.invited_ids),
+            joined=list(self.joined),
+            timeout_minutes=self.timeout_minutes,
+            engine=self.engine.to_state() if self.engine is not None else None,
+            history=self.board.history[-HISTORY_LINES:] if self.board is not None else [],
+        )
+        return state
+
+    async def load(self, state: dict, member):
+        self.organizer = await member(state["organizer"])
+        self.invited_ids = set(state["invited_ids"])
+        self.joined = {uid: await member(uid) for uid in state["joined"]}
+        self.timeout_minutes = state["timeout_minutes"]
+        self.engine = None
+        self.board = None
+        if state["engine"] is not None:
+            self.engine = RouletteEngine.from_state(state["engine"])
+            self.board = RouletteBoard(self.players, self.timeout_minutes)
+            self.board.history = state["history"]
+
+    @property
+    def players(self):
+        return [self.joined[uid] for uid in self.engine.players]
+
+    @property
+    def current_player(self):
+        return self.joined[self.engine.current]
+
+    @property
+    def target(self):
+        target = self.engine.target
+        return None if target is None else self.joined[target]
+
+    # -- inscriptions ------------------------------------------------------------
+
+    async def open(self, invited_players):
+        self.enter("joining", JOIN_TIMEOUT, "join_timeout")
+        mentions = " ".join(p.mention for p in invited_players)
+        await self.send(
+            f"🔫 **ROULETTE RUSSE !**\n\n"
+            f"{self.organizer.mention} lance une partie de Roulette Russe !\n"
+            f"**Joueurs invités :** {mentions}\n"
+            f"**Timeout du perdant :** {self.timeout_minutes} minute(s)\n\n"
+            f"Vous avez **60 secondes** pour rejoindre ✅\n"
+            f"*(Les absents ne jouent pas — minimum 2 joueurs pour démarrer)*",
+            view=self.view(
+                ActionButton("join", label="Rejoindre la partie", style=discord.ButtonStyle.success, emoji="✅"),
+                ActionButton("cancel_join", label="Annuler", style=discord.ButtonStyle.secondary, emoji="🚫"),
+            ),
+        )
 
-    @discord.ui.button(label="Rejoindre la partie", style=discord.ButtonStyle.success, emoji="✅", row=0)
-    async def join_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def on_join(self, interaction, arg):
         uid = interaction.user.id
 
         if uid not in self.invited_ids and uid != self.organizer.id:
@@ -26,236 +148,157 @@ class RouletteJoinView(discord.ui.View):
             return
 
         self.joined[uid] = interaction.user
+        everyone_in = self.joined.keys() >= self.invited_ids
+        if everyone_in:
+            self.enter("starting")
         await interaction.response.send_message(
             f"✅ {interaction.user.mention} a chargé le revolver...",
             ephemeral=False,
         )
+        if everyone_in:
+            await self.start_game()
 
-        all_ids = self.invited_ids | {self.organizer.id}
-        if set(self.joined.keys()) >= all_ids:
-            self.stop()
-
-    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.secondary, emoji="🚫", row=0)
-    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def on_cancel_join(self, interaction, arg):
         if interaction.user.id != self.organizer.id:
             await interaction.response.send_message(
                 "Seul l'organisateur peut annuler la partie !", ephemeral=True
             )
             return
-        self.cancelled = True
-        self.stop()
+        self.finish()
         await interaction.response.send_message("🚫 La Roulette Russe a été annulée.")
 
-    async def on_timeout(self):
-        self.stop()
+    async def on_join_timeout(self, interaction, arg):
+        if len(self.joined) < 2:
+            self.finish()
+            await self.send("Pas assez de joueurs (minimum 2). Roulette annulée !")
+            return
+        self.enter("starting")
+        await self.start_game()
+
+    # -- partie ------------------------------------------------------------------
+
+    async def start_game(self):
+        # Les invités qui n'ont pas rejoint redeviennent libres.
+        self.reservation.release(self.reservation.user_ids - self.joined.keys())
+        self.reservation.commit()
+
+        self.engine = RouletteEngine(list(self.joined))
+
+        # Toute la partie se joue dans ce message, édité à chaque étape.
+        # On reste en "starting" tant qu'il n'est pas posté : l'intro ne
+        # doit pas passer au premier tour avant qu'il existe.
+        self.board = RouletteBoard(self.players, self.timeout_minutes)
+        self.message = await self.send(
+            self.board.render(
+                self.engine.shots_fired,
+                f"Le revolver a **{CHAMBERS} chambres**, une seule balle.\n"
+                f"Plus on survit, plus le risque augmente.\n\n"
+                f"Le premier joueur désigné est... {self.current_player.mention} ! 🎯",
+            ),
+            CRITICAL,
+        )
+        self.enter("intro", INTRO_DELAY, "first_turn")
 
+    async def on_first_turn(self, interaction, arg):
+        await self.next_turn()
 
-class RouletteGameView(discord.ui.View):
-    """Vue principale d'un tour : le joueur courant choisit sa cible."""
+    async def next_turn(self):
+        self.enter("turn", TURN_TIMEOUT, "turn_timeout")
+        self.engine.aim(None)
+        current = self.current_player
+        remaining = self.engine.remaining
+        is_last = remaining == 1
 
-    def __init__(self, current_player, all_players):
-        super().__init__(timeout=60)
-        self.current_player = current_player
-        self.all_players = all_players
-        self.action = None   # "self" ou "other"
-        self.target = None
+        warning = "☠️ **DERNIÈRE CHAMBRE.** La balle est forcément là... quelqu'un va mourir.\n" if is_last else ""
+        targets = [
+            discord.SelectOption(label=p.display_name, value=str(p.id))
+            for p in self.players
+            if p.id != current.id
+        ]
+        await self.edit(
+            self.message,
+            content=self.board.render(
+                self.engine.shots_fired,
+                f"{warning}"
+                f"🎯 **{current.mention}**, c'est ton tour !\n"
+                f"Probabilité : **1/{remaining}**{'  ☠️' if is_last else ''}\n\n"
+                f"Que fais-tu ?",
+            ),
+            view=self.view(
+                ActionButton("shoot_self", label="Se tirer dessus", style=discord.ButtonStyle.danger,
+                             emoji="🔫", row=0),
+                ActionSelect("shoot_other", placeholder="🎯 Tirer sur quelqu'un...", options=targets, row=1),
+            ),
+        )
 
-    @discord.ui.button(label="Se tirer dessus", style=discord.ButtonStyle.danger, emoji="🔫", row=0)
-    async def shoot_self_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def on_shoot_self(self, interaction, arg):
         if interaction.user.id != self.current_player.id:
             await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
             return
-        self.action = "self"
-        self.stop()
-        await interaction.response.defer()
+        await self.pull_trigger(interaction, f"🔫 *{self.current_player.display_name} appuie sur la gâchette...*")
 
-    @discord.ui.button(label="Tirer sur quelqu'un", style=discord.ButtonStyle.secondary, emoji="🎯", row=0)
-    async def shoot_other_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def on_shoot_other(self, interaction, target_id):
         if interaction.user.id != self.current_player.id:
             await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
             return
-
-        others = [p for p in self.all_players if p.id != self.current_player.id]
-        target_view = RouletteTargetView(self.current_player, others)
-        await interaction.response.send_message(
-            "🎯 Qui vises-tu ?",
-            view=target_view,
-            ephemeral=True,
+        self.engine.aim(int(target_id))
+        await self.pull_trigger(
+            interaction, f"🎯 *{self.current_player.display_name} vise {self.target.display_name}...*"
         )
 
-        await target_view.wait()
-
-        if target_view.selected is not None:
-            self.action = "other"
-            self.target = target_view.selected
-            self.stop()
-
-    async def on_timeout(self):
-        self.stop()
-
-
-class RouletteTargetSelect(discord.ui.Select):
-    def __init__(self, shooter, targets):
-        self.shooter = shooter
-        self.targets_map = {str(t.id): t for t in targets}
-        options = [
-            discord.SelectOption(label=t.display_name, value=str(t.id))
-            for t in targets
-        ]
-        super().__init__(placeholder="Choisir une cible...", options=options, min_values=1, max_values=1)
-
-    async def callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.shooter.id:
-            await interaction.response.send_message("C'est pas ton tour !", ephemeral=True)
-            return
-        self.view.selected = self.targets_map[self.values[0]]
-        self.view.stop()
-        await interaction.response.defer()
-
-
-class RouletteTargetView(discord.ui.View):
-    def __init__(self, shooter, targets):
-        super().__init__(timeout=30)
-        self.selected = None
-        self.add_item(RouletteTargetSelect(shooter, targets))
-
-    async def on_timeout(self):
-        self.stop()
-
-
-def _cylinder_display(shots_fired: int) -> str:
-    """💨 = chambre vide (déjà tirée), 🔘 = chambre restante."""
-    return "💨" * shots_fired + "🔘" * (6 - shots_fired)
-
-
-async def _apply_death(interaction, victim, timeout_minutes):
-    await interaction.followup.send(
-        f"💥 **BANG !!** 💥\n\n"
-        f"💀 {victim.mention} a pris la balle !\n"
-        f"Timeout de **{timeout_minutes} minute(s)** appliqué... RIP 👋"
-    )
-    try:
-        await victim.timeout(timedelta(minutes=timeout_minutes), reason="Éliminé à la Roulette Russe")
-        print(f"[DEBUG] {victim.name} timed out via Russian Roulette")
-    except discord.Forbidden:
-        await interaction.followup.send(f"⚠️ Je peux pas timeout {victim.mention}, faut me donner les perms.")
-        print(f"[DEBUG] Failed to timeout {victim.name} - missing permissions")
-
-
-async def start_roulette_game(interaction, organizer, joined: dict, timeout_minutes: int):
-    players = list(joined.values())
-
-    for p in players:
-        active_duels[p.id] = True
-
-    current_player = random.choice(players)
-    shots_fired = 0  # probabilité du prochain tir = 1 / (6 - shots_fired)
-
-    player_list = " | ".join(p.mention for p in players)
-    await interaction.followup.send(
-        f"🔫 **LA ROULETTE RUSSE COMMENCE !** 🔫\n\n"
-        f"**Joueurs :** {player_list}\n"
-        f"**Timeout du perdant :** {timeout_minutes} minute(s)\n\n"
-        f"Le revolver a **6 chambres**, une seule balle.\n"
-        f"Plus on survit, plus le risque augmente.\n\n"
-        f"Le premier joueur désigné est... {current_player.mention} ! 🎯"
-    )
-
-    await asyncio.sleep(3)
-
-    victim = None
-
-    while victim is None:
-        remaining = 6 - shots_fired
-        is_last = remaining == 1
-
-        if is_last:
-            await interaction.followup.send(
-                f"☠️ **DERNIÈRE CHAMBRE.** La balle est forcément là... quelqu'un va mourir."
-            )
-            await asyncio.sleep(2)
-
-        game_view = RouletteGameView(current_player, players)
-        msg = await interaction.followup.send(
-            f"**Barillet :** {_cylinder_display(shots_fired)}\n"
-            f"🎯 **{current_player.mention}**, c'est ton tour !\n"
-            f"Probabilité : **1/{remaining}**{'  ☠️' if is_last else ''}\n\n"
-            f"Que fais-tu ?",
-            view=game_view,
-        )
-
-        await game_view.wait()
-
-        # Message de suspense (enlève les boutons, crée de la tension)
-        if game_view.action is None or game_view.action == "self":
-            suspense = f"🔫 *{current_player.display_name} appuie sur la gâchette...*"
+    async def on_turn_timeout(self, interaction, arg):
+        # Pas de choix à temps → tir forcé sur soi
+        self.board.log(f"⏰ {self.current_player.mention} hésite trop... **le revolver part tout seul !**")
+        await self.pull_trigger(None, f"🔫 *Le revolver de {self.current_player.display_name} part tout seul...*")
+
+    async def pull_trigger(self, interaction, suspense: str):
+        self.enter("suspense", SUSPENSE_DELAY, "resolve_shot")
+        # Temps de suspense : un seul edit qui retire les boutons, en réponse au clic s'il y en a un.
+        content = self.board.render(self.engine.shots_fired, suspense)
+        if interaction is not None:
+            await interaction.response.edit_message(content=content, view=None)
         else:
-            suspense = f"🎯 *{current_player.display_name} vise...*"
-
-        try:
-            await msg.edit(content=suspense, view=None)
-        except Exception:
-            pass
-
-        await asyncio.sleep(1.5)
-
-        try:
-            await msg.delete()
-        except Exception:
-            pass
+            await self.edit(self.message, content=content, view=None)
 
-        # Timeout → tir forcé sur soi
-        if game_view.action is None:
-            await interaction.followup.send(
-                f"⏰ {current_player.mention} hésite trop... **le revolver part tout seul !**"
-            )
-            game_view.action = "self"
+    async def on_resolve_shot(self, interaction, arg):
+        engine = self.engine
+        shooter, target = self.current_player, self.target
+        victim_id = engine.fire()
 
-        shots_fired += 1
-        hit = random.randint(1, remaining) == 1
-
-        if shots_fired < 6:
-            next_prob = f"**1/{6 - shots_fired}**"
+        if engine.remaining:
+            next_prob = f"**1/{engine.remaining}**"
         else:
             next_prob = "**1/1** ☠️ (mort certaine)"
 
-        if game_view.action == "self":
-            if hit:
-                victim = current_player
-                await _apply_death(interaction, victim, timeout_minutes)
-            else:
-                await interaction.followup.send(
-                    f"*click* 😮‍💨 {current_player.mention} a survécu...\n"
-                    f"{_cylinder_display(shots_fired)}  →  prochain tir : {next_prob}"
-                )
-                await asyncio.sleep(1.5)
-
-        else:  # "other"
-            target = game_view.target
-            if hit:
-                victim = target
-                await interaction.followup.send(
-                    f"💥 **{current_player.mention}** tire sur **{target.mention}** !"
-                )
-                await asyncio.sleep(1)
-                await _apply_death(interaction, victim, timeout_minutes)
+        if victim_id is None:
+            if target is None:
+                self.board.log(f"*click* 😮‍💨 {shooter.mention} a survécu... prochain tir : {next_prob}")
             else:
-                await interaction.followup.send(
-                    f"*click* 😮‍💨 **{current_player.mention}** tire sur **{target.mention}**... et le rate !\n"
-                    f"{_cylinder_display(shots_fired)}  →  prochain tir : {next_prob}\n"
-                    f"C'est maintenant au tour de {target.mention} 🎯"
+                self.board.log(
+                    f"*click* 😮‍💨 **{shooter.mention}** tire sur **{target.mention}**... et le rate ! "
+                    f"Prochain tir : {next_prob}, au tour de {target.mention} 🎯"
                 )
-                await asyncio.sleep(1.5)
-                current_player = target
-
-    for p in players:
-        if p.id in active_duels:
-            del active_duels[p.id]
+            await self.next_turn()
+            return
 
-    print(f"[DEBUG] Russian Roulette done. Victim: {victim.name}")
+        if target is not None:
+            self.board.log(f"💥 **{shooter.mention}** tire sur **{target.mention}** !")
+        victim = self.joined[victim_id]
+        self.finish()
+        # Le plateau annonce la mort tout de suite ; le timeout (et ses
+        # éventuels nouveaux essais) ne passe qu'après.
+        await self.edit(
+            self.message, content=self.board.render(engine.shots_fired, _death_text(victim, self.timeout_minutes)), view=None
+        )
+        log.info("roulette finished", extra={"game_id": self.game_id, "victim_id": victim.id, "shots": engine.shots_fired})
+        outcome = await punish(victim, self.timeout_minutes, "Éliminé à la Roulette Russe")
+        if outcome == FORBIDDEN:
+            await self.send(f"⚠️ Je peux pas timeout {victim.mention}, faut me donner les perms.")
+        elif outcome == FAILED:
+            await self.send(f"⚠️ Discord a refusé le timeout de {victim.mention}, la balle a fait long feu.")
 
 
-class RouletteTimeoutModal(discord.ui.Modal, title="🔫 Timeout du perdant"):
+class RouletteTimeoutModal(GuardedModal, title="🔫 Timeout du perdant"):
     timeout_input = discord.ui.TextInput(
         label="Durée du timeout (1–30 minutes)",
         placeholder="Ex: 5, 10, 15...",
@@ -264,7 +307,7 @@ class RouletteTimeoutModal(discord.ui.Modal, title="🔫 Timeout du perdant"):
     )
 
     def __init__(self, organizer, valid_players, setup_message):
-        super().__init__()
+        super().__init__(timeout=RESERVATION_TTL)
         self.organizer = organizer
         self.valid_players = valid_players
         self.setup_message = setup_message
@@ -284,38 +327,27 @@ class RouletteTimeoutModal(discord.ui.Modal, title="🔫 Timeout du perdant"):
             )
             return
 
+        # Tous les joueurs sont verrouillés d'un coup, à la validation seulement.
+        participants = self.valid_players + [self.organizer]
+        reservation = duel_locks.reserve(interaction.guild_id, (p.id for p in participants))
+        if reservation is None:
+            busy = next(p for p in participants if duel_locks.is_locked(interaction.guild_id, p.id))
+            await interaction.response.send_message(f"{busy.mention} est déjà en duel !", ephemeral=True)
+            return
+
         await interaction.response.defer()
         try:
             await self.setup_message.edit(content="🔫 **Roulette Russe en cours...**", view=None)
         except Exception:
             pass
 
-        mentions = " ".join(p.mention for p in self.valid_players)
-        join_view = RouletteJoinView(self.organizer, self.valid_players)
-        await interaction.followup.send(
-            f"🔫 **ROULETTE RUSSE !**\n\n"
-            f"{self.organizer.mention} lance une partie de Roulette Russe !\n"
-            f"**Joueurs invités :** {mentions}\n"
-            f"**Timeout du perdant :** {timeout_minutes} minute(s)\n\n"
-            f"Vous avez **60 secondes** pour rejoindre ✅\n"
-            f"*(Les absents ne jouent pas — minimum 2 joueurs pour démarrer)*",
-            view=join_view,
+        match = RouletteMatch(
+            interaction, self.organizer, self.valid_players, timeout_minutes, reservation
         )
+        await match.open(self.valid_players)
 
-        await join_view.wait()
-
-        if join_view.cancelled:
-            return
-
-        joined_players = join_view.joined
-        if len(joined_players) < 2:
-            await interaction.followup.send("Pas assez de joueurs (minimum 2). Roulette annulée !")
-            return
-
-        await start_roulette_game(interaction, self.organizer, joined_players, timeout_minutes)
 
-
-class RouletteSetupView(discord.ui.View):
+class RouletteSetupView(GuardedView):
     def __init__(self, organizer):
         super().__init__(timeout=60)
         self.organizer = organizer
@@ -353,12 +385,12 @@ class RouletteSetupView(discord.ui.View):
             return
 
         all_participants = valid_players + [self.organizer]
-        for p in all_participants:
-            if p.id in active_duels:
-                await interaction.response.send_message(
-                    f"{p.mention} est déjà en duel !", ephemeral=True
-                )
-                return
+        busy = next((p for p in all_participants if duel_locks.is_locked(interaction.guild_id, p.id)), None)
+        if busy is not None:
+            await interaction.response.send_message(
+                f"{busy.mention} est déjà en duel !", ephemeral=True
+            )
+            return
 
         self.stop()
         await interaction.response.send_modal(
@@ -0,0 +1,114 @@
+CHOICES = ("Pierre", "Papier", "Ciseaux")
+BEATS = {"Pierre": "Ciseaux", "Papier": "Pierre", "Ciseaux": "Papier"}
+
+# Résultats de RPSEngine.choose
+NOT_PLAYER = 0  # l'identifiant ne joue pas ce match
+ALREADY_CHOSEN = 1  # coup déjà joué ce round
+WAITING = 2  # coup enregistré, on attend l'autre joueur
+ROUND_OVER = 3  # les deux coups sont joués, le match continue
+MATCH_OVER = 4  # le round a donné le match à quelqu'un
+
+
+def determine_winner(choice1: str, choice2: str) -> int:
+    """0 : égalité, 1 : ``choice1`` gagne, 2 : ``choice2`` gagne."""
+    if choice1 == choice2:
+        return 0
+    return 1 if BEATS[choice1] == choice2 else 2
+
+
+class RPSEngine:
+    """Match de PPC en best-of-N, sans dépendance à discord.
+
+    Le premier à ``best_of // 2 + 1`` rounds gagnés l'emporte. Les joueurs
+    sont de simples identifiants (ids Discord côté bot) : le moteur se joue
+    aussi bien depuis un simulateur ou un benchmark.
+
+    Une égalité rejoue le même round (son numéro ne change pas). Chaque
+    round résolu est gardé comme ``(numéro, coup 1, coup 2, gagnant)`` avec
+    ``gagnant`` l'index du joueur (0 ou 1), ou ``None`` en cas d'égalité.
+    """
+
+    __slots__ = ("players", "best_of", "scores", "round_num", "pending", "rounds")
+
+    def __init__(self, player1, player2, best_of: int = 3):
+        if best_of < 1 or best_of % 2 == 0:
+            raise ValueError("best_of doit être impair")
+        self.players = (player1, player2)
+        self.best_of = best_of
+        self.scores = [0, 0]
+        self.round_num = 1
+        self.pending = [None, None]  # coups du round en cours
+        self.rounds = []
+
+    @property
+    def wins_needed(self) -> int:
+        return self.best_of // 2 + 1
+
+    @property
+    def over(self) -> bool:
+        return max(self.scores) >= self.wins_needed
+
+    @property
+    def winner(self):
+        """Identifiant du vainqueur du match, ou ``None`` s'il n'est pas fini."""
+        if not self.over:
+            return None
+        return self.players[0] if self.scores[0] > self.scores[1] else self.players[1]
+
+    @property
+    def loser(self):
+        winner = self.winner
+        if winner is None:
+            return None
+        return self.players[1] if winner == self.players[0] else self.players[0]
+
+    def score_of(self, player) -> int:
+        return self.scores[self.players.index(player)]
+
+    def choose(self, player, choice: str) -> int:
+        """Enregistre le coup de ``player`` et résout le round dès que les deux sont connus."""
+        if choice not in BEATS:
+            raise ValueError(f"coup inconnu : {choice!r}")
+        if player == self.players[0]:
+            slot = 0
+        elif player == self.players[1]:
+            slot = 1
+        else:
+            return NOT_PLAYER
+        pending = self.pending
+        if pending[slot] is not None:
+            return ALREADY_CHOSEN
+        pending[slot] = choice
+        if pending[1 - slot] is None:
+            return WAITING
+
+        choice1, choice2 = pending
+        pending[0] = pending[1] = None
+        result = determine_winner(choice1, choice2)
+        if result == 0:
+            self.rounds.append((self.round_num, choice1, choice2, None))
+            return ROUND_OVER
+        self.scores[result - 1] += 1
+        self.rounds.append((self.round_num, choice1, choice2, result - 1))
+        self.round_num += 1
+        return MATCH_OVER if self.over else ROUND_OVER
+
+    def to_state(self, history: int = 3) -> dict:
+        """État JSON ; seuls les ``history`` derniers rounds sont gardés."""
+        return {
+            "players": list(self.players),
+            "best_of": self.best_of,
+            "scores": self.scores,
+            "round_num": self.round_num,
+            "pending": self.pending,
+            "rounds": self.rounds[-history:],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RPSEngine":
+        engine = cls(*state["players"], best_of=state["best_of"])
+        engine.scores = list(state["scores"])
+        engine.round_num = state["round_num"]
+        engine.pending = list(state["pending"])
+        engine.rounds = [tuple(r) for r in state["rounds"]]
+        return engine
@@ -1 +1,291 @@
-active_duels = {}
+import asyncio
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import time
+from collections import Counter
+
+DB_PATH = os.getenv("DUEL_DB_PATH", "duel_state.db")
+DEFAULT_LOCK_TTL = 3 * 60 * 60  # secondes : au-delà, un verrou est considéré orphelin
+RESERVATION_TTL = 10 * 60  # modal validé, attente d'acceptation avant que la partie ne démarre
+REAP_INTERVAL = 60
+SNAPSHOT_INTERVAL = 5  # secondes entre deux écritures du journal des parties
+COMPACT_EVERY = 500  # lignes ajoutées au journal avant compaction
+
+log = logging.getLogger(__name__)
+
+
+class Reservation:
+    """Jeton rendu par :meth:`DuelLockStore.reserve` pour un groupe de joueurs."""
+
+    __slots__ = ("store", "guild_id", "user_ids", "token")
+
+    def __init__(self, store, guild_id: int, user_ids, token: str):
+        self.store = store
+        self.guild_id = guild_id
+        self.user_ids = set(user_ids)
+        self.token = token
+
+    def commit(self, ttl: float = None):
+        """La partie démarre : les verrous passent à la durée d'une partie."""
+        self.store._commit(self, self.store.default_ttl if ttl is None else ttl)
+
+    def release(self, user_ids=None):
+        """Libère tout le groupe, ou seulement ``user_ids`` (ex. les absents de la roulette)."""
+        ids = self.user_ids if user_ids is None else self.user_ids & set(user_ids)
+        self.store._release(self, ids)
+        self.user_ids -= ids
+
+
+class DuelLockStore:
+    """Verrous « joueur déjà en duel », rangés par serveur.
+
+    Chaque serveur a son propre shard ``{user_id: (expires_at, token)}`` : les
+    lookups restent O(1) quel que soit le nombre de serveurs. Les joueurs
+    d'une partie sont réservés ensemble via :meth:`reserve`, sans ``await``
+    entre la vérification et la pose des verrous, donc deux organisateurs ne
+    peuvent pas embarquer le même joueur. Chaque écriture est répercutée dans
+    SQLite (WAL) pour survivre à un redémarrage, et un verrou expiré est
+    ignoré puis nettoyé par le reaper.
+    """
+
+    def __init__(self, path: str = DB_PATH, default_ttl: float = DEFAULT_LOCK_TTL):
+        self.default_ttl = default_ttl
+        self.stats = Counter()
+        self._shards: dict[int, dict[int, tuple[float, str]]] = {}
+        self._reaper_task = None
+
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS duel_locks ("
+            " guild_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " token TEXT NOT NULL,"
+            " PRIMARY KEY (guild_id, user_id))"
+        )
+        self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute("DELETE FROM duel_locks WHERE expires_at <= ?", (now,))
+        for guild_id, user_id, expires_at, token in self._db.execute(
+            "SELECT guild_id, user_id, expires_at, token FROM duel_locks"
+        ):
+            self._shards.setdefault(guild_id, {})[user_id] = (expires_at, token)
+
+    def is_locked(self, guild_id: int, user_id: int) -> bool:
+        guild_id = guild_id or 0  # hors serveur (MP) : shard commun
+        shard = self._shards.get(guild_id)
+        if not shard:
+            return False
+        entry = shard.get(user_id)
+        if entry is None:
+            return False
+        if entry[0] <= time.time():
+            self._drop(guild_id, [user_id])
+            self.stats["expired"] += 1
+            return False
+        return True
+
+    def reserve(self, guild_id: int, user_ids, ttl: float = RESERVATION_TTL):
+        """Réserve tous les joueurs ou aucun. Renvoie ``None`` si l'un d'eux est pris."""
+        guild_id = guild_id or 0
+        user_ids = set(user_ids)
+        if any(self.is_locked(guild_id, uid) for uid in user_ids):
+            self.stats["contended"] += 1
+            return None
+
+        token = secrets.token_hex(8)
+        expires_at = time.time() + ttl
+        shard = self._shards.setdefault(guild_id, {})
+        for uid in user_ids:
+            shard[uid] = (expires_at, token)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO duel_locks (guild_id, user_id, expires_at, token) VALUES (?, ?, ?, ?)",
+            [(guild_id, uid, expires_at, token) for uid in user_ids],
+        )
+        self.stats["reserved"] += 1
+        return Reservation(self, guild_id, user_ids, token)
+
+    def _owned(self, reservation: Reservation, user_ids):
+        shard = self._shards.get(reservation.guild_id, {})
+        return [
+            uid for uid in user_ids
+            if uid in shard and shard[uid][1] == reservation.token
+        ]
+
+    def _commit(self, reservation: Reservation, ttl: float):
+        owned = self._owned(reservation, reservation.user_ids)
+        if not owned:
+            return
+        expires_at = time.time() + ttl
+        shard = self._shards[reservation.guild_id]
+        for uid in owned:
+            shard[uid] = (expires_at, reservation.token)
+        self._db.execute(
+            "UPDATE duel_locks SET expires_at = ? WHERE guild_id = ? AND token = ?",
+            (expires_at, reservation.guild_id, reservation.token),
+        )
+        self.stats["committed"] += 1
+
+    def _release(self, reservation: Reservation, user_ids):
+        # Un verrou expiré puis repris par une autre partie n'est pas à nous.
+        owned = self._owned(reservation, user_ids)
+        if owned:
+            self._drop(reservation.guild_id, owned)
+            self.stats["released"] += 1
+
+    def _drop(self, guild_id: int, user_ids):
+        shard = self._shards.get(guild_id)
+        if shard is None:
+            return
+        for uid in user_ids:
+            shard.pop(uid, None)
+        if not shard:
+            del self._shards[guild_id]
+        self._db.executemany(
+            "DELETE FROM duel_locks WHERE guild_id = ? AND user_id = ?",
+            [(guild_id, uid) for uid in user_ids],
+        )
+
+    def tokens(self) -> set:
+        return {token for shard in self._shards.values() for _, token in shard.values()}
+
+    def release_tokens(self, tokens) -> int:
+        """Libère tous les verrous posés sous ``tokens`` ; renvoie le nombre de joueurs rendus."""
+        tokens = set(tokens)
+        released = 0
+        for guild_id in list(self._shards):
+            owned = [uid for uid, (_, token) in self._shards[guild_id].items() if token in tokens]
+            if owned:
+                self._drop(guild_id, owned)
+                released += len(owned)
+        self.stats["orphaned"] += released
+        return released
+
+    def reap(self) -> int:
+        """Supprime les verrous expirés (partie plantée, process tué...)."""
+        now = time.time()
+        reaped = 0
+        for guild_id in list(self._shards):
+            shard = self._shards[guild_id]
+            expired = [uid for uid, (expires_at, _) in shard.items() if expires_at <= now]
+            for uid in expired:
+                del shard[uid]
+            if not shard:
+                del self._shards[guild_id]
+            reaped += len(expired)
+        if reaped:
+            self._db.execute("DELETE FROM duel_locks WHERE expires_at <= ?", (now,))
+            self.stats["expired"] += reaped
+        return reaped
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards.values())
+
+    async def _reaper_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            reaped = self.reap()
+            if reaped:
+                log.info("orphan locks reaped", extra={"count": reaped})
+
+    def start_reaper(self, interval: float = REAP_INTERVAL):
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.get_running_loop().create_task(self._reaper_loop(interval))
+
+
+class GameJournal:
+    """Journal append-only des parties en cours, pour reprendre après un redémarrage.
+
+    Une partie modifiée est marquée via :meth:`mark` ; toutes les
+    ``SNAPSHOT_INTERVAL`` secondes, l'instantané JSON de chaque partie
+    marquée (ou une pierre tombale si elle est finie) est ajouté en fin de
+    journal, en une seule transaction. :meth:`compact` ne garde que la
+    dernière ligne des parties encore en cours.
+    """
+
+    def __init__(self, path: str = DB_PATH, interval: float = SNAPSHOT_INTERVAL):
+        self.interval = interval
+        self.stats = Counter()
+        self._dirty = {}  # game_id -> partie
+        self._appended = 0
+        self._flush_task = None
+
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS game_journal ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " game_id TEXT NOT NULL,"
+            " state TEXT)"  # NULL : partie terminée
+        )
+
+    def mark(self, game):
+        self._dirty[game.game_id] = game
+
+    def flush(self) -> int:
+        if not self._dirty:
+            return 0
+        rows = []
+        for game_id, game in self._dirty.items():
+            try:
+                state = None if game.phase == "done" else json.dumps(game.snapshot(), separators=(",", ":"))
+            except Exception:  # une partie mal sérialisable ne bloque pas les autres
+                log.exception("game snapshot failed", extra={"game_id": game_id})
+                continue
+            rows.append((game_id, state))
+        self._dirty.clear()
+        if not rows:
+            return 0
+        self._append(rows)
+        self.stats["snapshots"] += len(rows)
+        if self._appended >= COMPACT_EVERY:
+            self.compact()
+        return len(rows)
+
+    def forget(self, game_id: str):
+        """Enterre tout de suite une partie (reprise impossible, par exemple)."""
+        self._dirty.pop(game_id, None)
+        self._append([(game_id, None)])
+
+    def _append(self, rows):
+        self._db.execute("BEGIN")
+        self._db.executemany("INSERT INTO game_journal (game_id, state) VALUES (?, ?)", rows)
+        self._db.execute("COMMIT")
+        self._appended += len(rows)
+
+    def compact(self):
+        self._db.execute("BEGIN")
+        self._db.execute(
+            "DELETE FROM game_journal WHERE seq NOT IN"
+            " (SELECT MAX(seq) FROM game_journal GROUP BY game_id)"
+        )
+        self._db.execute("DELETE FROM game_journal WHERE state IS NULL")
+        self._db.execute("COMMIT")
+        self._appended = 0
+        self.stats["compactions"] += 1
+
+    def load(self) -> list:
+        """Derniers instantanés des parties en cours, dans l'ordre du journal."""
+        self.compact()
+        return [json.loads(state) for (state,) in self._db.execute("SELECT state FROM game_journal ORDER BY seq")]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def start(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+
+duel_locks = DuelLockStore()
+game_journal = GameJournal()
@@ -0,0 +1,199 @@
+import asyncio
+import atexit
+import bisect
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from collections import Counter
+
+LOG_LEVEL = os.getenv("DUEL_LOG_LEVEL", "INFO").upper()
+METRICS_HOST = os.getenv("DUEL_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("DUEL_METRICS_PORT", "9108"))  # 0 : pas d'endpoint
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 3.0, 5.0, 10.0)
+DURATION_BUCKETS = (30, 60, 120, 300, 600, 900, 1800, 3600)
+
+log = logging.getLogger(__name__)
+
+# Attributs posés par logging lui-même : tout le reste vient de ``extra=`` et part en champ.
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _quote(value) -> str:
+    """Valeur telle quelle si elle tient en un mot, sinon entre guillemets (échappée comme en JSON)."""
+    text = str(value)
+    if text and not any(c.isspace() or c in '="\'' for c in text):
+        return text
+    return json.dumps(text, ensure_ascii=False)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Une ligne ``clé=valeur`` par événement, avec les champs passés via ``extra=``.
+
+    Une trace d'exception suit sur les lignes suivantes, indentées : la
+    première ligne reste analysable seule.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={_quote(record.getMessage())}",
+        ]
+        parts.extend(f"{key}={_quote(value)}" for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        line = " ".join(parts)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + "\n".join("    " + trace for trace in record.exc_text.splitlines())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """``QueueHandler`` qui garde la trace à part du message.
+
+    Celui de la bibliothèque formate la trace dans ``msg`` et efface
+    ``exc_info`` ; ici elle est rendue dans ``exc_text`` (sans garder les
+    frames vivantes dans la file) et le formateur la place sous la ligne.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _TRACE_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_TRACE_FORMATTER = logging.Formatter()
+
+
+def setup_logging(level: str = LOG_LEVEL):
+    """Journalisation non bloquante : les handlers écrivent depuis un thread dédié.
+
+    Le code des jeux ne fait que poser l'enregistrement dans une file ;
+    l'écriture sur stdout ne bloque jamais la boucle asyncio.
+    """
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(KeyValueFormatter())
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_QueueHandler(records))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # dernière case : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Compteurs et histogrammes en mémoire, rendus au format texte Prometheus.
+
+    Les modules qui tiennent déjà leurs propres statistiques (scheduler
+    REST, punitions, verrous...) sont branchés via :meth:`gauge` et lus
+    seulement au moment du rendu.
+    """
+
+    def __init__(self):
+        self.counters = Counter()  # (nom, labels) -> valeur
+        self.histograms = {}  # (nom, labels) -> Histogram
+        self.gauges = {}  # préfixe -> fonction renvoyant un dict (éventuellement imbriqué) de nombres
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def gauge(self, prefix: str, read):
+        self.gauges[prefix] = read
+
+    def render(self) -> str:
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"duel_{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"duel_{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"duel_{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"duel_{name}_count{_labels(labels)} {histogram.count}")
+        for prefix, read in self.gauges.items():
+            try:
+                values = read()
+            except Exception as e:
+                log.warning("gauge read failed", extra={"gauge": prefix, "error": repr(e)})
+                continue
+            lines.extend(_flatten(f"duel_{prefix}", values))
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(name: str, value):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            yield from _flatten(f"{name}_{key}", inner)
+    elif isinstance(value, (int, float)):
+        yield f"{name} {value}"
+
+
+metrics = MetricsRegistry()
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        await reader.readline()  # ligne de requête : un seul chemin, on l'ignore
+        body = metrics.render().encode()
+        writer.write(
+            b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_serve_metrics, host, port)
+    except OSError as e:
+        log.warning("metrics endpoint not started", extra={"host": host, "port": port, "error": repr(e)})
+        return None
+    log.info("metrics endpoint listening", extra={"host": host, "port": port})
+    return server
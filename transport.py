@@ -0,0 +1,63 @@
+from collections import Counter
+
+import discord
+
+TOKEN_LIFETIME = 15 * 60  # durée de validité d'un jeton d'interaction (secondes)
+TOKEN_MARGIN = 60  # on bascule sur le salon une minute avant l'expiration
+
+transport_stats = Counter()
+
+
+def token_fresh(interaction) -> bool:
+    age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    return age < TOKEN_LIFETIME - TOKEN_MARGIN
+
+
+class MessageTransport:
+    """Choisit par où passent les messages d'une partie.
+
+    Tant que le jeton de la dernière interaction est valide, on passe par
+    son webhook (followups) ; ensuite, ou pour une partie reprise après
+    redémarrage, par le salon avec le jeton du bot. Les messages envoyés
+    sont gardés avec le jeton qui les a créés : :meth:`handle` renvoie de
+    quoi les éditer même quand ce jeton a expiré.
+    """
+
+    __slots__ = ("channel", "interaction", "_handles")
+
+    def __init__(self, channel, interaction=None):
+        self.channel = channel
+        self.interaction = interaction  # la plus récente
+        self._handles = {}  # message_id -> (message, interaction qui l'a envoyé ou None)
+
+    def use(self, interaction):
+        self.interaction = interaction
+
+    def sender(self):
+        """``(fonction d'envoi, interaction utilisée ou None)``."""
+        interaction = self.interaction
+        if interaction is not None and token_fresh(interaction):
+            transport_stats["followup_sends"] += 1
+            return interaction.followup.send, interaction
+        transport_stats["channel_sends"] += 1
+        return self.channel.send, None
+
+    def remember(self, message, interaction=None):
+        if message is not None:
+            self._handles[message.id] = (message, interaction)
+
+    def handle(self, message):
+        """L'objet sur lequel appeler ``edit``/``delete`` pour ``message``."""
+        message_id = message.id
+        entry = self._handles.get(message_id)
+        if entry is not None:
+            handle, interaction = entry
+            if interaction is None or token_fresh(interaction):
+                return handle
+        elif not isinstance(message, discord.WebhookMessage):
+            return message
+        # Message d'un webhook expiré (ou inconnu) : le bot peut l'éditer par le salon.
+        transport_stats["channel_rebinds"] += 1
+        handle = self.channel.get_partial_message(message_id)
+        self._handles[message_id] = (handle, None)
+        return handle
@@ -0,0 +1,1060 @@
+"""Stand-in local de Discord (gateway + API REST) pour faire tourner le vrai ``bot.py`` de bout en bout.
+
+    python wiresim.py --duels 100 --concurrency 10 --latency 0.05 --bucket 5/5 --rate-limit 0.02
+
+Le bot est lancé dans un sous-process, ``DUEL_API_BASE`` et
+``DUEL_GATEWAY_URL`` pointés sur le stand-in : même code, mêmes requêtes
+HTTP, même websocket qu'en production. Des joueurs scriptés cliquent comme
+de vrais clients, d'après le texte et
+les ``custom_id`` des messages qu'ils voient ; une partie est finie quand
+le journal du bot l'a enterrée.
+
+Le rapport donne les délais clic → accusé et clic → premier changement
+visible, les 429 servis (bucket par salon, 429 aléatoires, tempête
+globale), les routes inconnues du stand-in, et les messages envoyés par
+partie : ``--max-messages`` fait échouer le run au-delà d'un budget.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+# À régler avant les imports du bot, qui lisent leur config dans l'environnement ;
+# le sous-process du bot hérite du même fichier d'état.
+os.environ.setdefault("DUEL_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="duel-wiresim-"), "state.db"))
+
+import aiohttp
+from aiohttp import web
+
+import game_registry
+from duel_flow import HIGH_STAKES_MINUTES
+from game_flow import COMPONENT_TEMPLATE
+from state import DB_PATH
+
+API_VERSION = 10
+API_PREFIX = f"/api/v{API_VERSION}"
+HEARTBEAT_MS = 41250
+HEARTBEAT_ACK_DELAY = 0.05
+EPHEMERAL = 1 << 6
+LOADING = 1 << 7
+ALL_PERMISSIONS = str((1 << 50) - 1)
+
+# Types d'interaction et de composant de l'API
+APPLICATION_COMMAND = 2
+MESSAGE_COMPONENT = 3
+MODAL_SUBMIT = 5
+USER_SELECT = 5
+
+POLL = 0.05  # secondes entre deux regards des joueurs sur un salon sans changement
+# Un humain ne clique pas dans la milliseconde où le message s'affiche : plus tôt,
+# le bot n'a peut-être pas encore lu la réponse HTTP qui enregistre la vue.
+REACTION = 0.1
+QUIET = 1.0  # secondes sans requête sur le salon d'une partie finie avant d'en faire le compte
+READY_TIMEOUT = 60
+PENDING_TTL = 30  # au-delà, un clic sans effet visible n'est plus attribué
+
+# Qui doit cliquer, lu dans le texte du message comme le ferait un joueur.
+ACTOR = {
+    "cell": re.compile(r"Tour de <@(\d+)>"),
+    "shoot_self": re.compile(r"<@(\d+)>\*\*, c'est ton tour"),
+    "shoot_other": re.compile(r"<@(\d+)>\*\*, c'est ton tour"),
+    "revenge": re.compile(r"💀 <@(\d+)> va être timeout"),
+    "abandon": re.compile(r"💀 <@(\d+)> va être timeout"),
+    "accept_revenge": re.compile(r"<@(\d+)>, acceptes-tu"),
+    "refuse_revenge": re.compile(r"<@(\d+)>, acceptes-tu"),
+}
+
+DISCORD_EPOCH = 1420070400000
+_increments = itertools.count()
+
+
+def snowflake() -> int:
+    """Id horodaté comme ceux de Discord : discord.py en tire ``created_at`` (âge des jetons, latence d'ack)."""
+    return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (next(_increments) & 0x3FFFFF)
+
+
+def _iso(timestamp: float = None) -> str:
+    return datetime.fromtimestamp(timestamp or time.time(), timezone.utc).isoformat()
+
+
+def _json(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py ne décode que "application/json" tout court, sans charset.
+    return web.Response(
+        body=json.dumps(data).encode(), status=status, headers={**(headers or {}), "Content-Type": "application/json"}
+    )
+
+
+def _error(status: int, code: int, message: str) -> web.Response:
+    return _json({"code": code, "message": message}, status)
+
+
+async def _body(request) -> dict:
+    """Corps JSON, ou ``payload_json`` d'un envoi multipart (fichiers joints)."""
+    if request.content_type.startswith("multipart/"):
+        form = await request.post()
+        return json.loads(form.get("payload_json") or "{}")
+    if request.can_read_body:
+        return await request.json()
+    return {}
+
+
+def percentiles(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1)
+    return {"n": len(values), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1] * 1000, 1)}
+
+
+class Bucket:
+    """Fenêtre fixe de ``limit`` requêtes toutes les ``per`` secondes, annoncée comme un bucket de l'API."""
+
+    __slots__ = ("name", "limit", "per", "remaining", "reset_at")
+
+    def __init__(self, name: str, limit: int, per: float):
+        self.name = name
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.reset_at = now + self.per
+            self.remaining = self.limit
+        if self.remaining == 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def headers(self, now: float) -> dict:
+        reset_after = max(0.0, self.reset_at - now)
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": self.name,
+        }
+
+
+class StoredMessage:
+    __slots__ = ("id", "channel_id", "payload", "visible_to", "version")
+
+    def __init__(self, message_id, channel_id, payload, visible_to=None):
+        self.id = message_id
+        self.channel_id = channel_id
+        self.payload = payload
+        self.visible_to = visible_to  # éphémère : seul cet utilisateur le voit
+        self.version = 0  # incrémenté à chaque édition
+
+
+class Click:
+    """Une interaction envoyée au bot et ses horodatages (``time.perf_counter``)."""
+
+    __slots__ = (
+        "id", "token", "channel_id", "user_id", "message_id", "action",
+        "sent_at", "acked_at", "visible_at", "response_type", "original_id", "modal",
+    )
+
+    def __init__(self, channel_id, user_id, message_id=None, action=None):
+        self.id = snowflake()
+        self.token = f"standin.{self.id}"
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.message_id = message_id  # message du composant cliqué
+        self.action = action
+        self.sent_at = self.acked_at = self.visible_at = None
+        self.response_type = None
+        self.original_id = None  # message visé par "@original"
+        self.modal = None  # modal ouvert en réponse
+
+
+class FakeDiscord:
+    """Un serveur, des salons, des membres, et juste assez de l'API pour ce que fait le bot.
+
+    ``latency`` (+ jusqu'à ``jitter``) retarde chaque requête REST. Les
+    routes de messages passent par un :class:`Bucket` par salon ou par
+    webhook ; ``rate_limit`` ajoute des 429 aléatoires et ``storm``
+    (début, durée en secondes) une fenêtre de 429 globaux. Les réponses
+    aux interactions ne sont jamais limitées, comme chez Discord.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=0.0, bucket=None, storm=None, rng=random):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.bucket = bucket  # (limite, période) ou None
+        self.storm = storm  # (début, durée) ou None
+        self.rng = rng
+        self.started = time.monotonic()
+
+        self.app_id = snowflake()
+        self.guild_id = snowflake()
+        self.command_id = snowflake()
+        self.bot_user = self.user_payload(self.app_id, "DuelBot", bot=True)
+        self.users = {}  # id -> payload
+        self.channels = []
+        self.messages = {}  # id -> StoredMessage
+        self.by_channel = defaultdict(list)  # channel_id -> [StoredMessage], dans l'ordre d'envoi
+        self.clicks = {}  # token -> Click
+        self.commands = []
+
+        self.ws = None
+        self.seq = 0
+        self.identified = asyncio.Event()
+        self._buckets = {}
+        self._pending = defaultdict(list)  # channel_id -> clics sans effet visible, du plus ancien au plus récent
+        self._waiters = {}  # channel_id -> Event réveillé au prochain changement
+
+        self.rest_calls = Counter()  # "MÉTHODE /route" -> nombre
+        self.rate_limited = Counter()  # cause -> 429 servis
+        self.unhandled = Counter()
+        self.per_channel = defaultdict(Counter)  # channel_id -> messages, éphémères, éditions...
+        self.last_activity = {}  # channel_id -> perf_counter de la dernière requête
+        self.timeouts = Counter()  # user_id -> timeouts reçus
+
+    # -- entités -----------------------------------------------------------------
+
+    @staticmethod
+    def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+        return {
+            "id": str(user_id), "username": name, "global_name": name, "discriminator": "0",
+            "avatar": None, "bot": bot, "public_flags": 0,
+        }
+
+    def member_payload(self, user_id: int, with_user: bool = True) -> dict:
+        payload = {
+            "nick": None, "avatar": None, "roles": [], "joined_at": _iso(self.started), "deaf": False, "mute": False,
+            "flags": 0, "pending": False, "communication_disabled_until": None, "permissions": ALL_PERMISSIONS,
+        }
+        if with_user:
+            payload["user"] = self.users[user_id]
+        return payload
+
+    def channel_payload(self, channel_id: int) -> dict:
+        return {
+            "id": str(channel_id), "type": 0, "guild_id": str(self.guild_id), "name": f"duel-{channel_id % 10000}",
+            "position": self.channels.index(channel_id), "permission_overwrites": [], "nsfw": False,
+            "parent_id": None, "topic": None, "last_message_id": None, "rate_limit_per_user": 0,
+        }
+
+    def add_user(self) -> int:
+        user_id = snowflake()
+        self.users[user_id] = self.user_payload(user_id, f"joueur{user_id % 100000}")
+        return user_id
+
+    def add_channel(self) -> int:
+        channel_id = snowflake()
+        self.channels.append(channel_id)
+        return channel_id
+
+    def guild_payload(self) -> dict:
+        return {
+            "id": str(self.guild_id), "name": "Stand-in", "icon": None, "splash": None, "discovery_splash": None,
+            "banner": None, "description": None, "owner_id": str(next(iter(self.users), self.app_id)),
+            "region": "europe", "afk_channel_id": None, "afk_timeout": 300, "verification_level": 0,
+            "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0, "nsfw_level": 0,
+            "premium_tier": 0, "preferred_locale": "fr", "system_channel_id": None, "system_channel_flags": 0,
+            "vanity_url_code": None, "features": [], "emojis": [], "stickers": [], "large": False,
+            "unavailable": False, "joined_at": _iso(self.started), "member_count": len(self.users) + 1,
+            "roles": [{
+                "id": str(self.guild_id), "name": "@everyone", "permissions": ALL_PERMISSIONS, "position": 0,
+                "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+            }],
+            "members": [], "channels": [self.channel_payload(c) for c in self.channels], "threads": [],
+            "voice_states": [], "presences": [], "stage_instances": [], "guild_scheduled_events": [],
+        }
+
+    # -- messages ----------------------------------------------------------------
+
+    def _attachments(self, existing, data) -> list:
+        kept = {attachment["id"]: attachment for attachment in existing}
+        attachments = []
+        for entry in data.get("attachments") or ():
+            previous = kept.get(str(entry.get("id")))
+            if previous is not None:
+                attachments.append(previous)
+                continue
+            # Nouveau fichier : discord.py l'annonce par son index dans l'envoi multipart.
+            attachment_id = snowflake()
+            filename = entry.get("filename") or "file"
+            url = f"https://cdn.standin/attachments/{attachment_id}/{filename}"
+            attachments.append({"id": str(attachment_id), "filename": filename, "size": 0, "url": url, "proxy_url": url})
+        return attachments
+
+    def post(self, channel_id: int, data: dict, click: Click = None) -> StoredMessage:
+        message_id = snowflake()
+        flags = data.get("flags") or 0
+        payload = {
+            "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(self.guild_id),
+            "author": self.bot_user, "content": data.get("content") or "", "timestamp": _iso(),
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": self._attachments((), data), "embeds": data.get("embeds") or [], "pinned": False,
+            "type": 0, "flags": flags, "components": data.get("components") or [],
+        }
+        if click is not None:
+            payload["webhook_id"] = payload["application_id"] = str(self.app_id)
+        visible_to = click.user_id if click is not None and flags & EPHEMERAL else None
+        message = StoredMessage(message_id, channel_id, payload, visible_to)
+        self.messages[message_id] = message
+        self.by_channel[channel_id].append(message)
+        self.per_channel[channel_id]["ephemeral" if visible_to else "messages"] += 1
+        return message
+
+    def edit(self, message: StoredMessage, data: dict):
+        payload = message.payload
+        for key, empty in (("content", ""), ("components", []), ("embeds", []), ("flags", 0)):
+            if key in data:
+                payload[key] = data[key] if data[key] is not None else empty
+        if "attachments" in data:
+            payload["attachments"] = self._attachments(payload["attachments"], data)
+        payload["edited_timestamp"] = _iso()
+        message.version += 1
+        self.per_channel[message.channel_id]["edits"] += 1
+
+    def delete(self, message: StoredMessage):
+        self.messages.pop(message.id, None)
+        self.by_channel[message.channel_id].remove(message)
+        self.per_channel[message.channel_id]["deletes"] += 1
+
+    def _changed(self, channel_id: int, click: Click = None):
+        """Quelque chose de visible a changé dans le salon : date les clics concernés, réveille les joueurs."""
+        now = time.perf_counter()
+        pending = self._pending[channel_id]
+        if click is None:
+            # Requête avec le jeton du bot : on l'attribue au clic le plus récent encore sans effet.
+            while pending and now - pending[-1].sent_at > PENDING_TTL:
+                pending.pop()
+            click = pending[-1] if pending else None
+        if click is not None and click.visible_at is None:
+            click.visible_at = now
+            if click in pending:
+                pending.remove(click)
+        waiter = self._waiters.pop(channel_id, None)
+        if waiter is not None:
+            waiter.set()
+
+    async def wait_change(self, channel_id: int, timeout: float):
+        waiter = self._waiters.setdefault(channel_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # -- gateway -----------------------------------------------------------------
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.ws = ws
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_MS}, "s": None, "t": None})
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            op = json.loads(msg.data)["op"]
+            if op == 1:
+                asyncio.get_running_loop().create_task(self._heartbeat_ack(ws))
+            elif op == 2:
+                await self.dispatch("READY", {
+                    "v": API_VERSION, "user": self.bot_user, "guilds": [{"id": str(self.guild_id), "unavailable": True}],
+                    "session_id": "standin", "resume_gateway_url": str(request.url.with_query(None)),
+                    "application": {"id": str(self.app_id), "flags": 0}, "private_channels": [], "relationships": [],
+                })
+                await self.dispatch("GUILD_CREATE", self.guild_payload())
+                self.identified.set()
+            elif op == 6:
+                await ws.send_json({"op": 9, "d": False, "s": None, "t": None})  # pas de reprise : nouvelle session
+        self.ws = None
+        return ws
+
+    @staticmethod
+    async def _heartbeat_ack(ws):
+        # discord.py date son heartbeat une fois écrit : un ack dans la même
+        # milliseconde serait compté contre le heartbeat précédent.
+        await asyncio.sleep(HEARTBEAT_ACK_DELAY)
+        if not ws.closed:
+            await ws.send_json({"op": 11, "d": None, "s": None, "t": None})
+
+    async def dispatch(self, event: str, data: dict):
+        self.seq += 1
+        await self.ws.send_json({"op": 0, "t": event, "s": self.seq, "d": data})
+
+    async def interact(self, kind: int, user_id: int, channel_id: int, data: dict,
+                       message: StoredMessage = None, action: str = None) -> Click:
+        click = Click(channel_id, user_id, message.id if message is not None else None, action)
+        self.clicks[click.token] = click
+        payload = {
+            "id": str(click.id), "application_id": str(self.app_id), "type": kind, "token": click.token,
+            "version": 1, "guild_id": str(self.guild_id), "channel_id": str(channel_id),
+            "channel": self.channel_payload(channel_id), "member": self.member_payload(user_id), "data": data,
+            "locale": "fr", "guild_locale": "fr", "app_permissions": ALL_PERMISSIONS, "entitlements": [],
+            "authorizing_integration_owners": {"0": str(self.guild_id)}, "context": 0,
+            "attachment_size_limit": 8 * 2**20,
+        }
+        if message is not None:
+            payload["message"] = message.payload
+        self._pending[channel_id].append(click)
+        click.sent_at = time.perf_counter()
+        await self.dispatch("INTERACTION_CREATE", payload)
+        return click
+
+    # -- REST --------------------------------------------------------------------
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._rest])
+        add = app.router.add_route
+        add("GET", "/gateway", self.gateway)
+        add("GET", API_PREFIX + "/gateway/bot", self.get_gateway)
+        add("GET", API_PREFIX + "/users/@me", self.get_me)
+        add("GET", API_PREFIX + "/oauth2/applications/@me", self.get_application)
+        add("PUT", API_PREFIX + "/applications/{app_id}/commands", self.put_commands)
+        add("PUT", API_PREFIX + "/applications/{app_id}/guilds/{guild_id}/commands", self.put_commands)
+        add("POST", API_PREFIX + "/interactions/{interaction_id}/{token}/callback", self.interaction_callback)
+        add("POST", API_PREFIX + "/webhooks/{app_id}/{token}", self.followup_send)
+        add("*", API_PREFIX + "/webhooks/{app_id}/{token}/messages/{message_id}", self.webhook_message)
+        add("POST", API_PREFIX + "/channels/{channel_id}/messages", self.channel_send)
+        add("*", API_PREFIX + "/channels/{channel_id}/messages/{message_id}", self.channel_message)
+        add("GET", API_PREFIX + "/channels/{channel_id}", self.get_channel)
+        add("*", API_PREFIX + "/guilds/{guild_id}/members/{user_id}", self.member)
+        return app
+
+    def _channel_of(self, request):
+        info = request.match_info
+        if "channel_id" in info:
+            return int(info["channel_id"])
+        click = self.clicks.get(info.get("token"))
+        return click.channel_id if click is not None else None
+
+    @web.middleware
+    async def _rest(self, request, handler):
+        if request.path == "/gateway":
+            return await handler(request)
+        if request.match_info.http_exception is not None:
+            self.unhandled[f"{request.method} {request.path.removeprefix(API_PREFIX)}"] += 1
+            return _error(404, 0, "404: Not Found")
+
+        route = request.match_info.route.resource.canonical.removeprefix(API_PREFIX)
+        self.rest_calls[f"{request.method} {route}"] += 1
+        channel_id = self._channel_of(request)
+        if channel_id is not None:
+            self.per_channel[channel_id]["rest"] += 1
+            self.last_activity[channel_id] = time.perf_counter()
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rng.random() * self.jitter)
+
+        headers = {}
+        if not route.endswith("/callback"):
+            limited, headers = self._limit(request, channel_id)
+            if limited is not None:
+                return limited
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    def _limit(self, request, channel_id):
+        """``(réponse 429 ou None, en-têtes de bucket à ajouter)``."""
+        now = time.monotonic()
+        if self.storm is not None:
+            start, duration = self.storm
+            left = self.started + start + duration - now
+            if 0 < left <= duration:
+                self.rate_limited["storm"] += 1
+                return self._too_many(left, "global"), {}
+        if self.rate_limit and self.rng.random() < self.rate_limit:
+            self.rate_limited["random"] += 1
+            return self._too_many(self.rng.uniform(0.1, 1.0), "shared"), {}
+
+        info = request.match_info
+        if self.bucket is None or "message" not in request.path and "token" not in info:
+            return None, {}
+        key = f"channel:{channel_id}" if "channel_id" in info else f"webhook:{info.get('token')}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Bucket(key, *self.bucket)
+        if not bucket.take(now):
+            self.rate_limited["bucket"] += 1
+            return self._too_many(bucket.reset_at - now, "user", bucket.headers(now)), {}
+        return None, bucket.headers(now)
+
+    @staticmethod
+    def _too_many(retry_after: float, scope: str, headers: dict = None) -> web.Response:
+        headers = {
+            **(headers or {}), "Retry-After": str(math.ceil(retry_after)), "X-RateLimit-Scope": scope,
+            "Via": "1.1 standin",  # sans lui, discord.py croit à un ban Cloudflare
+        }
+        if scope == "global":
+            headers["X-RateLimit-Global"] = "true"
+        body = {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": scope == "global"}
+        return _json(body, 429, headers)
+
+    async def get_gateway(self, request):
+        return _json({
+            "url": f"ws://{request.host}/gateway", "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def get_me(self, request):
+        return _json(self.bot_user)
+
+    async def get_application(self, request):
+        return _json({
+            "id": str(self.app_id), "name": "DuelBot", "icon": None, "description": "", "bot_public": True,
+            "bot_require_code_grant": False, "owner": self.bot_user, "verify_key": "standin", "flags": 0,
+            "team": None, "summary": "", "rpc_origins": [], "interactions_endpoint_url": None,
+        })
+
+    async def put_commands(self, request):
+        commands = await _body(request)
+        self.commands = [
+            {
+                "type": 1, "options": [], "default_member_permissions": None, "dm_permission": True, "nsfw": False,
+                **command, "id": str(self.command_id if command["name"] == "duel" else snowflake()),
+                "application_id": str(self.app_id), "version": str(snowflake()),
+            }
+            for command in commands
+        ]
+        return _json(self.commands)
+
+    async def interaction_callback(self, request):
+        click = self.clicks.get(request.match_info["token"])
+        if click is None or str(click.id) != request.match_info["interaction_id"]:
+            return _error(404, 10062, "Unknown interaction")
+        if click.response_type is not None:
+            return _error(400, 40060, "Interaction has already been acknowledged.")
+        payload = await _body(request)
+        kind = payload["type"]
+        data = payload.get("data") or {}
+        click.response_type = kind
+        click.acked_at = time.perf_counter()
+
+        resource = {"type": kind}
+        if kind in (4, 5):  # message (5 : "réfléchit...", remplacé par le premier followup)
+            if kind == 5:
+                data = {"flags": (data.get("flags") or 0) | LOADING}
+            message = self.post(click.channel_id, data, click)
+            click.original_id = message.id
+            resource["message"] = message.payload
+        elif kind in (6, 7):  # 6 : rien à montrer pour l'instant, 7 : édite le message du composant
+            click.original_id = click.message_id
+            message = self.messages.get(click.message_id)
+            if kind == 7 and message is not None:
+                self.edit(message, data)
+                resource["message"] = message.payload
+        elif kind == 9:
+            click.modal = data
+        if kind in (4, 7, 9):
+            self._changed(click.channel_id, click)
+
+        flags = resource.get("message", {}).get("flags") or 0
+        return _json({
+            "interaction": {
+                "id": str(click.id), "type": MESSAGE_COMPONENT,
+                "response_message_id": str(click.original_id) if click.original_id else None,
+                "response_message_loading": kind == 5, "response_message_ephemeral": bool(flags & EPHEMERAL),
+            },
+            "resource": resource,
+        })
+
+    def _webhook_click(self, request):
+        click = self.clicks.get(request.match_info["token"])
+        return click if click is not None and click.response_type is not None else None
+
+    async def followup_send(self, request):
+        click = self._webhook_click(request)
+        if click is None:
+            return _error(404, 10015, "Unknown Webhook")
+        data = await _body(request)
+        original = self.messages.get(click.original_id)
+        if click.response_type == 5 and original is not None and original.payload["flags"] & LOADING:
+            data["flags"] = (data.get("flags") or 0) | (original.payload["flags"] & EPHEMERAL)
+            self.edit(original, data)
+            message = original
+        else:
+            message = self.post(click.channel_id, data, click)
+        self._changed(click.channel_id, click)
+        return _json(message.payload)
+
+    async def webhook_message(self, request):
+        click = self._webhook_click(request)
+        if click is None:
+            return _error(404, 10015, "Unknown Webhook")
+        raw_id = request.match_info["message_id"]
+        message = self.messages.get(click.original_id if raw_id == "@original" else int(raw_id))
+        return await self._message_route(request, message, click)
+
+    async def channel_send(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.channels:
+            return _error(404, 10003, "Unknown Channel")
+        message = self.post(channel_id, await _body(request))
+        self._changed(channel_id)
+        return _json(message.payload)
+
+    async def channel_message(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        return await self._message_route(request, message, None)
+
+    async def _message_route(self, request, message, click):
+        if message is None:
+            return _error(404, 10008, "Unknown Message")
+        if request.method == "GET":
+            return _json(message.payload)
+        if request.method == "DELETE":
+            self.delete(message)
+            self._changed(message.channel_id, click)
+            return web.Response(status=204)
+        if request.method == "PATCH":
+            self.edit(message, await _body(request))
+            self._changed(message.channel_id, click)
+            return _json(message.payload)
+        return _error(405, 0, "405: Method Not Allowed")
+
+    async def get_channel(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.channels:
+            return _error(404, 10003, "Unknown Channel")
+        return _json(self.channel_payload(channel_id))
+
+    async def member(self, request):
+        user_id = int(request.match_info["user_id"])
+        if user_id not in self.users:
+            return _error(404, 10007, "Unknown Member")
+        payload = self.member_payload(user_id)
+        if request.method == "PATCH":
+            until = (await _body(request)).get("communication_disabled_until")
+            if until:
+                self.timeouts[user_id] += 1
+            payload["communication_disabled_until"] = until
+        elif request.method != "GET":
+            return _error(405, 0, "405: Method Not Allowed")
+        return _json(payload)
+
+
+# -- joueurs -----------------------------------------------------------------------
+
+
+class WireSim:
+    """Lance ``bot.py`` contre le stand-in et y joue des parties complètes, comme des clients Discord."""
+
+    def __init__(self, discord: FakeDiscord, think: float = 0.0, revenge: float = 0.5, rng=random):
+        self.discord = discord
+        self.think = think
+        self.revenge = revenge
+        self.rng = rng
+        self.journal = None
+        self.journaled = set()  # parties vues au moins une fois dans le journal du bot
+        self.clicks = []
+        self.per_game = defaultdict(list)  # jeu -> compteurs du salon, une entrée par partie
+
+    async def pause(self):
+        await asyncio.sleep(REACTION + (self.rng.expovariate(1 / self.think) if self.think else 0))
+
+    # -- ce que voit un joueur ---------------------------------------------------
+
+    def components(self, channel_id: int, user_id: int = None):
+        """``(message, composant)`` actifs visibles par ``user_id``, du message le plus récent au plus ancien."""
+        for message in reversed(self.discord.by_channel[channel_id]):
+            if message.visible_to is not None and message.visible_to != user_id:
+                continue
+            for row in message.payload["components"]:
+                for component in row.get("components", ()):
+                    if component.get("custom_id") and not component.get("disabled"):
+                        yield message, component
+
+    def describe(self, channel_id: int, game_id: str = None) -> str:
+        """Dernier message du salon et les actions cliquables de la partie, pour comprendre un blocage."""
+        messages = self.discord.by_channel[channel_id]
+        if not messages:
+            return "(salon vide)"
+        actions = sorted({
+            c.get("label") or c.get("placeholder") or c["custom_id"]
+            for _, c in self.components(channel_id)
+            if game_id is None or c["custom_id"].startswith(f"g:{game_id}:")
+        })
+        return f"{game_id or '-'} {messages[-1].payload['content'][:120]!r} actions={actions}"
+
+    async def wait_for(self, channel_id: int, find, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            found = find()
+            if found:
+                return found
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"nothing to click in channel {channel_id}")
+            await self.discord.wait_change(channel_id, POLL)
+
+    def first(self, channel_id: int, user_id: int, match):
+        return next(((m, c) for m, c in self.components(channel_id, user_id) if match(c)), None)
+
+    # -- ce que fait un joueur ---------------------------------------------------
+
+    async def click(self, user_id: int, message: StoredMessage, component: dict, values=None) -> Click:
+        await self.pause()
+        data = {"custom_id": component["custom_id"], "component_type": component["type"]}
+        if values is not None:
+            data["values"] = [str(v) for v in values]
+        if component["type"] == USER_SELECT:
+            data["resolved"] = {
+                "users": {str(v): self.discord.users[v] for v in values},
+                "members": {str(v): self.discord.member_payload(v, with_user=False) for v in values},
+            }
+        match = COMPONENT_TEMPLATE.fullmatch(component["custom_id"])
+        action = match["action"] if match else "setup"
+        click = await self.discord.interact(MESSAGE_COMPONENT, user_id, message.channel_id, data, message, action)
+        self.clicks.append(click)
+        return click
+
+    async def submit(self, user_id: int, opener: Click, value: str) -> Click:
+        """Remplit le seul champ du modal ouvert en réponse à ``opener``."""
+        await self.pause()
+        rows = []
+        for row in opener.modal["components"]:
+            field = row.get("component") or row["components"][0]
+            answer = {"type": field["type"], "custom_id": field["custom_id"], "value": value}
+            rows.append({"type": row["type"], "component": answer} if "component" in row else {"type": row["type"], "components": [answer]})
+        data = {"custom_id": opener.modal["custom_id"], "components": rows}
+        message = self.discord.messages.get(opener.message_id)
+        click = await self.discord.interact(MODAL_SUBMIT, user_id, opener.channel_id, data, message, "modal")
+        self.clicks.append(click)
+        return click
+
+    def game_over(self, game_id: str) -> bool:
+        """Fini quand le journal du bot a enterré la partie (ou l'a compactée après l'avoir vue)."""
+        if self.journal is None:
+            try:
+                self.journal = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+            except sqlite3.Error:
+                return False
+        try:
+            row = self.journal.execute(
+                "SELECT state IS NULL FROM game_journal WHERE game_id = ? ORDER BY seq DESC LIMIT 1", (game_id,)
+            ).fetchone()
+        except sqlite3.Error:
+            return False
+        if row is None:
+            return game_id in self.journaled
+        self.journaled.add(game_id)
+        return bool(row[0])
+
+    async def setup(self, key: str, host: int, channel_id: int, chosen, minutes: int) -> str:
+        """``/duel`` → bouton du jeu → choix des joueurs → lancer → modal ; renvoie l'id de la partie."""
+        slash = await self.discord.interact(
+            APPLICATION_COMMAND, host, channel_id,
+            {"id": str(self.discord.command_id), "name": "duel", "type": 1, "guild_id": str(self.discord.guild_id)},
+            action="duel",
+        )
+        self.clicks.append(slash)
+        label = game_registry.games[key].label
+        await self.click(host, *await self.wait_for(channel_id, lambda: self.first(channel_id, host, lambda c: c.get("label") == label)))
+
+        message, select = await self.wait_for(channel_id, lambda: self.first(channel_id, host, lambda c: c["type"] == USER_SELECT))
+        picked = await self.click(host, message, select, chosen)
+        await self.wait_for(channel_id, lambda: picked.response_type)
+        started = await self.click(host, *await self.wait_for(
+            channel_id, lambda: self.first(channel_id, host, lambda c: (c.get("label") or "").startswith("Lancer"))
+        ))
+        await self.wait_for(channel_id, lambda: started.modal or started.response_type)
+        if started.modal is None:
+            reply = self.discord.messages.get(started.original_id)
+            raise RuntimeError(f"setup refused ({key}): {reply.payload['content'] if reply else '?'}")
+        # Le salon sert à plusieurs duels d'affilée : les boutons restés actifs
+        # des parties précédentes ne comptent pas.
+        before = set(filter(None, (self.game_of(c) for _, c in self.components(channel_id))))
+        await self.submit(host, started, str(minutes))
+
+        message, component = await self.wait_for(
+            channel_id, lambda: self.first(channel_id, None, lambda c: self.game_of(c) not in (None, *before))
+        )
+        return self.game_of(component)
+
+    @staticmethod
+    def game_of(component: dict):
+        match = COMPONENT_TEMPLATE.fullmatch(component["custom_id"])
+        return match["game_id"] if match else None
+
+    def moves(self, channel_id: int, game_id: str, host: int, guests, acted: set, joined: set):
+        """Les clics à faire sur le message actif le plus récent de la partie : ``[(joueur, message, composant, valeurs)]``."""
+        newest, components = None, []
+        for message, component in self.components(channel_id):
+            match = COMPONENT_TEMPLATE.fullmatch(component["custom_id"])
+            if match is None or match["game_id"] != game_id:
+                continue
+            if newest is None:
+                newest = message
+            if message is newest:
+                components.append((match["action"], component))
+        if newest is None:
+            return []
+
+        by_action = defaultdict(list)
+        for action, component in components:
+            by_action[action].append(component)
+        content = newest.payload["content"]
+        pick = self.rng.choice
+
+        def actor(action):
+            found = ACTOR[action].search(content)
+            return int(found[1]) if found else None
+
+        moves = []
+        if "confirm" in by_action or "accept" in by_action:
+            moves.append((guests[0], (by_action["confirm"] or by_action["accept"])[0], None))
+        elif "join" in by_action:
+            for guest in guests:
+                if guest not in joined:
+                    joined.add(guest)
+                    moves.append((guest, by_action["join"][0], None))
+        elif "choose" in by_action:
+            moves.extend((player, pick(by_action["choose"]), None) for player in (host, *guests))
+        elif "cell" in by_action:
+            moves.append((actor("cell"), pick(by_action["cell"]), None))
+        elif "shoot_self" in by_action:
+            shooter = actor("shoot_self")
+            if self.rng.random() < 0.5 or "shoot_other" not in by_action:
+                moves.append((shooter, by_action["shoot_self"][0], None))
+            else:
+                select = by_action["shoot_other"][0]
+                moves.append((shooter, select, [pick(select["options"])["value"]]))
+        elif "revenge" in by_action:
+            wants = self.rng.random() < self.revenge
+            moves.append((actor("revenge"), by_action["revenge" if wants else "abandon"][0], None))
+        elif "accept_revenge" in by_action:
+            accepts = self.rng.random() < self.revenge
+            moves.append((actor("accept_revenge"), by_action["accept_revenge" if accepts else "refuse_revenge"][0], None))
+
+        todo = []
+        for player, component, values in moves:
+            key = (newest.id, newest.version, player)
+            if player is not None and key not in acted:
+                acted.add(key)
+                todo.append((player, newest, component, values))
+        return todo
+
+    async def play(self, key: str, channel_id: int, duel_timeout: float):
+        discord = self.discord
+        host = discord.add_user()
+        if key == "roulette":
+            guests = [discord.add_user() for _ in range(self.rng.randint(1, 5))]
+            minutes = self.rng.randint(1, 30)
+        else:
+            guests = [discord.add_user()]
+            minutes = self.rng.choice((5, 30, HIGH_STAKES_MINUTES + 60))
+        discord.per_channel[channel_id] = Counter()
+
+        game_id = await self.setup(key, host, channel_id, guests, minutes)
+        acted, joined = set(), set()
+        deadline = time.monotonic() + duel_timeout
+        while not self.game_over(game_id):
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError(self.describe(channel_id, game_id))
+            todo = self.moves(channel_id, game_id, host, guests, acted, joined)
+            for player, message, component, values in todo:
+                await self.click(player, message, component, values)
+            await discord.wait_change(channel_id, POLL)
+
+        # Les derniers envois (verdict, sanction) peuvent suivre la fin de la partie.
+        while time.perf_counter() - discord.last_activity.get(channel_id, 0) < QUIET:
+            await asyncio.sleep(POLL)
+        stats = discord.per_channel[channel_id]
+        stats["timeouts"] = sum(discord.timeouts[user] for user in (host, *guests))
+        self.per_game[key].append(stats)
+
+    # -- run ---------------------------------------------------------------------
+
+    async def start_bot(self, base: str, metrics_port: int, log_path: str):
+        env = {
+            **os.environ,
+            "DISCORD_BOT_TOKEN": "standin.token",
+            "DUEL_API_BASE": f"{base}{API_PREFIX}",
+            "DUEL_GATEWAY_URL": f"{base.replace('http', 'ws', 1)}/gateway",
+            "DUEL_METRICS_PORT": str(metrics_port),
+            "DUEL_DB_PATH": DB_PATH,
+        }
+        env.pop("DUEL_DEV_GUILD_ID", None)
+        log = open(log_path, "wb")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "bot.py", cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, stdout=log, stderr=asyncio.subprocess.STDOUT,
+        )
+        log.close()
+        return process
+
+    async def wait_ready(self, process, metrics_port: int) -> float:
+        """Prêt quand le bot publie ``time_to_ready_seconds`` (posé par son ``on_ready``)."""
+        url = f"http://127.0.0.1:{metrics_port}/metrics"
+        deadline = time.monotonic() + READY_TIMEOUT
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if process.returncode is not None:
+                    raise RuntimeError(f"bot exited with code {process.returncode}")
+                try:
+                    async with session.get(url) as response:
+                        for line in (await response.text()).splitlines():
+                            if line.startswith("duel_time_to_ready_seconds "):
+                                return float(line.split()[1])
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("bot not ready in time")
+
+    async def run(self, duels: int, games, concurrency: int, duel_timeout: float, log_path: str) -> dict:
+        discord = self.discord
+        channels = asyncio.Queue()
+        for _ in range(concurrency):
+            channels.put_nowait(discord.add_channel())
+
+        runner = web.AppRunner(discord.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            metrics_port = probe.getsockname()[1]
+
+        process = await self.start_bot(f"http://127.0.0.1:{port}", metrics_port, log_path)
+        outcome = Counter()
+        errors = []
+        stuck = []
+        try:
+            ready = await self.wait_ready(process, metrics_port)
+
+            async def one(key):
+                channel_id = await channels.get()
+                try:
+                    await self.play(key, channel_id, duel_timeout)
+                except asyncio.TimeoutError as e:
+                    outcome["stuck"] += 1
+                    if len(stuck) < 5:
+                        stuck.append(str(e) or self.describe(channel_id))
+                except Exception as e:
+                    outcome["errors"] += 1
+                    if len(errors) < 5:
+                        errors.append(repr(e))
+                else:
+                    outcome["completed"] += 1
+                    outcome[key] += 1
+                finally:
+                    channels.put_nowait(channel_id)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(self.rng.choice(games)) for _ in range(duels)))
+            elapsed = time.perf_counter() - started
+        finally:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+            await runner.cleanup()
+
+        with open(log_path, encoding="utf-8", errors="replace") as log:
+            bot_errors = sum("level=ERROR" in line or line.startswith("Traceback") for line in log)
+
+        by_action = defaultdict(list)
+        for click in self.clicks:
+            if click.visible_at is not None:
+                by_action[click.action].append(click.visible_at - click.sent_at)
+        return {
+            "duels": duels,
+            **outcome,
+            "error_samples": errors,
+            "stuck_samples": stuck,
+            "seconds": round(elapsed, 3),
+            "duels_per_second": round(outcome["completed"] / elapsed, 2),
+            "bot_ready_seconds": round(ready, 2),
+            "ack_ms": percentiles(c.acked_at - c.sent_at for c in self.clicks if c.acked_at is not None),
+            "click_to_update_ms": percentiles(v for values in by_action.values() for v in values),
+            "click_to_update_p95_ms": {action: percentiles(values)["p95"] for action, values in sorted(by_action.items())},
+            "clicks_without_update": dict(Counter(c.action for c in self.clicks if c.visible_at is None)),
+            "rest_calls": dict(discord.rest_calls.most_common()),
+            "rate_limited": dict(discord.rate_limited),
+            "unhandled_routes": dict(discord.unhandled),
+            "per_game": {
+                key: {
+                    field: {
+                        "mean": round(sum(s[field] for s in stats) / len(stats), 2),
+                        "max": max(s[field] for s in stats),
+                    }
+                    for field in ("messages", "ephemeral", "edits", "deletes", "rest", "timeouts")
+                }
+                for key, stats in sorted(self.per_game.items())
+            },
+            "bot_errors": bot_errors,
+            "bot_log": log_path,
+        }
+
+
+def _budgets(text: str) -> dict:
+    budgets = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        key, _, limit = part.partition("=")
+        budgets[key.strip()] = int(limit)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Le vrai bot contre un Discord local, de bout en bout.")
+    parser.add_argument("--duels", type=int, default=50)
+    parser.add_argument("--games", default="rps,minesweeper,roulette", help="jeux tirés au hasard, séparés par des virgules")
+    parser.add_argument("--concurrency", type=int, default=10, help="parties simultanées (un salon chacune)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence de chaque requête REST (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latence aléatoire ajoutée, jusqu'à (s)")
+    parser.add_argument("--bucket", default="", help="limite par salon/webhook des routes de messages, ex. 5/5")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probabilité d'un 429 sur chaque requête")
+    parser.add_argument("--storm", default="", help="429 globaux pendant DURÉE secondes après DÉBUT, ex. 10:5")
+    parser.add_argument("--think", type=float, default=0.0, help="temps de réflexion moyen des joueurs (s)")
+    parser.add_argument("--revenge", type=float, default=0.5, help="probabilité de revanche")
+    parser.add_argument("--timeout", type=float, default=180.0, help="au-delà, une partie est comptée bloquée (s)")
+    parser.add_argument("--max-messages", default="", help="budget de messages publics par partie, ex. rps=8,roulette=12")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log", default=None, help="fichier de log du bot (par défaut à côté de l'état)")
+    parser.add_argument("--json", action="store_true", help="rapport en JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    games = [key.strip() for key in args.games.split(",") if key.strip()]
+    unknown = set(games) - game_registry.games.keys()
+    if unknown:
+        parser.error(f"jeux inconnus : {', '.join(sorted(unknown))}")
+    bucket = tuple(float(x) for x in args.bucket.split("/")) if args.bucket else None
+    if bucket is not None:
+        bucket = (int(bucket[0]), bucket[1])
+    storm = tuple(float(x) for x in args.storm.split(":")) if args.storm else None
+    budgets = _budgets(args.max_messages)
+    log_path = args.log or os.path.join(os.path.dirname(DB_PATH) or ".", "bot.log")
+
+    discord = FakeDiscord(args.latency, args.jitter, args.rate_limit, bucket, storm)
+    sim = WireSim(discord, think=args.think, revenge=args.revenge)
+    report = asyncio.run(sim.run(args.duels, games, args.concurrency, args.timeout, log_path))
+
+    over = {
+        key: report["per_game"][key]["messages"]["max"]
+        for key, limit in budgets.items()
+        if key in report["per_game"] and report["per_game"][key]["messages"]["max"] > limit
+    }
+    report["over_budget"] = over
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>24}: {value}")
+    if over or report.get("stuck") or report.get("errors") or report.get("bot_errors"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()